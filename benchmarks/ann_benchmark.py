@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency benchmark for the semantic search ANN backends
+
+Generates clustered synthetic embedding catalogs, uses exact search as ground
+truth and reports recall@k and query latency of the IVF-flat index for a
+range of nprobe values.
+
+Usage: python -m benchmarks.ann_benchmark --sizes 10000 100000 --output ann.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from djangoapp.services.ann_index import ExactIndex, IVFFlatIndex
+
+
+def synthetic_catalog(size, dimensions, clusters, seed=0):
+    """Normalized vectors drawn around random cluster centres, like product embeddings"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(clusters, size=size)
+    vectors = centres[labels] + rng.normal(scale=0.6, size=(size, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def time_queries(index, queries, k, **params):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, k, **params))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def recall(results, truth):
+    hits = sum(len({i for i, _ in got} & {i for i, _ in expected}) for got, expected in zip(results, truth))
+    return hits / max(1, sum(len(expected) for expected in truth))
+
+
+def run(size, dimensions, n_queries, k, nprobes, seed):
+    vectors = synthetic_catalog(size, dimensions, clusters=max(8, size // 500), seed=seed)
+    ids = np.arange(size)
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.choice(size, n_queries, replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = ExactIndex(dimensions)
+    exact.add(ids, vectors)
+    truth, exact_latencies = time_queries(exact, queries, k)
+
+    start = time.perf_counter()
+    ivf = IVFFlatIndex.train(vectors)
+    ivf.add(ids, vectors)
+    build_seconds = time.perf_counter() - start
+
+    report = {
+        'size': size,
+        'dimensions': dimensions,
+        'k': k,
+        'exact': {
+            'p50_ms': percentile_ms(exact_latencies, 50),
+            'p95_ms': percentile_ms(exact_latencies, 95),
+        },
+        'ivf': {'n_lists': ivf.n_lists, 'build_seconds': round(build_seconds, 2), 'runs': []},
+    }
+
+    for nprobe in nprobes:
+        results, latencies = time_queries(ivf, queries, k, nprobe=nprobe)
+        report['ivf']['runs'].append({
+            'nprobe': nprobe,
+            'recall': round(recall(results, truth), 4),
+            'p50_ms': percentile_ms(latencies, 50),
+            'p95_ms': percentile_ms(latencies, 95),
+        })
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--dimensions', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    reports = []
+    for size in args.sizes:
+        report = run(size, args.dimensions, args.queries, args.k, args.nprobe, args.seed)
+        reports.append(report)
+
+        print(f"\n{size} vectors, exact p50 {report['exact']['p50_ms']}ms "
+              f"(IVF: {report['ivf']['n_lists']} lists, built in {report['ivf']['build_seconds']}s)")
+        print(f"{'nprobe':>8} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for row in report['ivf']['runs']:
+            print(f"{row['nprobe']:>8} {row['recall']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
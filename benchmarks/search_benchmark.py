@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Latency, throughput and memory benchmark for the product search paths
+
+Generates synthetic catalogs shaped like database/data/products.json (its
+vocabulary, brands and categories, scaled up), replays a realistic query mix
+against each search implementation and reports p50/p95/p99 latency, throughput
+and the memory taken by the structures built for the catalog.
+
+Usage:
+    python -m benchmarks.search_benchmark --sizes 1000 10000 100000 --output run.json
+    python -m benchmarks.search_benchmark --sizes 1000000 --targets intelligent_search --budget 60
+    python -m benchmarks.search_benchmark --baseline before.json --output after.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+os.environ.setdefault('CATALOG_RELOAD_INTERVAL', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from djangoapp.services.catalog_store import CATEGORIES_FILE, PRODUCTS_FILE, catalog_store  # noqa: E402
+from djangoapp.services.optimized_product_service import product_service  # noqa: E402
+from djangoapp.services.product_intelligence_service import product_intelligence_service  # noqa: E402
+from djangoapp.services.professional_ai_service import professional_ai_service  # noqa: E402
+from djangoapp.services.search_index import tokenize  # noqa: E402
+from djangoapp.services.search_service import search_service  # noqa: E402
+from djangoapp.services.vector_index import VectorIndex  # noqa: E402
+
+STOP_WORDS = {'the', 'and', 'for', 'with', 'its', 'this', 'that', 'from', 'are', 'your', 'you', 'our', 'has'}
+
+
+def load_seed():
+    with open(PRODUCTS_FILE) as f:
+        products = json.load(f)
+    with open(CATEGORIES_FILE) as f:
+        categories = json.load(f)
+    return products, categories
+
+
+class CatalogGenerator:
+    """Random products that reuse the seed catalog's words, brands and field shapes"""
+
+    def __init__(self, seed_products, categories, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.categories = [c['id'] for c in categories]
+
+        name_words = Counter(w for p in seed_products for w in p['name'].split() if len(w) > 2)
+        description_words = Counter(w for p in seed_products for w in p['description'].split())
+        self.name_words, self.name_weights = self._distribution(name_words)
+        self.description_words, self.description_weights = self._distribution(description_words)
+        self.brands = sorted({p['brand'] for p in seed_products if p.get('brand')})
+
+    @staticmethod
+    def _distribution(counts):
+        words = list(counts)
+        weights = np.array([counts[w] for w in words], dtype=np.float64)
+        return words, weights / weights.sum()
+
+    def _brand(self):
+        # Real catalogs have a long tail of brands; grow it with the catalog
+        if self.rng.random() < 0.7:
+            return self.brands[self.rng.integers(len(self.brands))]
+        return f"Brand{self.rng.zipf(1.3) % 5000}"
+
+    def products(self, size):
+        rng = self.rng
+        name_lengths = rng.integers(2, 5, size=size)
+        description_lengths = rng.integers(12, 30, size=size)
+        prices = np.round(np.exp(rng.normal(3.3, 1.2, size=size)), 2)
+        ratings = np.round(rng.uniform(1, 5, size=size), 2)
+        discounts = np.round(rng.uniform(0, 20, size=size), 2)
+        stock = rng.integers(0, 150, size=size)
+        categories = rng.choice(self.categories, size=size)
+
+        for i in range(size):
+            brand = self._brand()
+            name_words = rng.choice(self.name_words, size=name_lengths[i], p=self.name_weights)
+            description = rng.choice(self.description_words, size=description_lengths[i], p=self.description_weights)
+            yield {
+                'id': i + 1,
+                'name': f"{brand} {' '.join(name_words)}",
+                'description': ' '.join(description),
+                'price': float(prices[i]),
+                'category_id': int(categories[i]),
+                'brand': brand,
+                'sku': f"SKU-{i + 1}",
+                'stock_quantity': int(stock[i]),
+                'rating': float(ratings[i]),
+                'discount_percentage': float(discounts[i]),
+                'image_url': '',
+                'images': [],
+                'is_active': True,
+                'availability_status': 'In Stock' if stock[i] > 10 else 'Limited Stock' if stock[i] else 'Out of Stock',
+            }
+
+
+def typo(word, rng):
+    """One random deletion, transposition or substitution"""
+    if len(word) < 4:
+        return word
+    i = int(rng.integers(1, len(word) - 1))
+    kind = rng.integers(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word[:i] + 'aeiou'[int(rng.integers(5))] + word[i + 1:]
+
+
+def query_mix(products, categories, count, seed=0):
+    """Queries in the proportions a shop search box sees: mostly short product words"""
+    rng = np.random.default_rng(seed)
+    sample = [products[i] for i in rng.choice(len(products), size=min(len(products), 2000), replace=False)]
+    names = [[w for w in tokenize(p['name']) if w not in STOP_WORDS and len(w) > 2] for p in sample]
+    names = [words for words in names if words]
+    category_names = [c['name'].lower() for c in categories]
+
+    queries = []
+    for _ in range(count):
+        kind = rng.random()
+        words = names[rng.integers(len(names))]
+        if kind < 0.40:
+            queries.append(words[rng.integers(len(words))])
+        elif kind < 0.60:
+            queries.append(' '.join(words[:2]))
+        elif kind < 0.75:
+            queries.append(sample[rng.integers(len(sample))]['brand'].lower())
+        elif kind < 0.85:
+            queries.append(category_names[rng.integers(len(category_names))])
+        elif kind < 0.95:
+            queries.append(typo(max(words, key=len), rng))
+        else:
+            queries.append(f"zq{rng.integers(10 ** 6)}x")
+    return queries
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def replay(search, queries, budget):
+    """Run queries one after another until done or the time budget is spent"""
+    latencies = []
+    empty = 0
+    started = time.perf_counter()
+    for query in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append(time.perf_counter() - start)
+        empty += not results
+        if time.perf_counter() - started > budget:
+            break
+    elapsed = time.perf_counter() - started
+
+    return {
+        'queries': len(latencies),
+        'p50_ms': percentile_ms(latencies, 50),
+        'p95_ms': percentile_ms(latencies, 95),
+        'p99_ms': percentile_ms(latencies, 99),
+        'mean_ms': round(float(np.mean(latencies)) * 1000, 3),
+        'throughput_qps': round(len(latencies) / elapsed, 1),
+        'zero_result_rate': round(empty / len(latencies), 4),
+    }
+
+
+def traced(build):
+    """Run build() and return (seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    build()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(seconds, 3), round(peak / 2 ** 20, 1)
+
+
+def setup_semantic(snapshot, index_dir):
+    """Offline vector index for the synthetic catalog, as build_vector_index would write it"""
+    products = [{**p, 'category': snapshot.category_name(p['category_id'])} for p in snapshot.products]
+    backend = 'ivf' if len(products) >= 50000 else 'exact'
+    index = VectorIndex.build(products, backend=backend)
+    path = os.path.join(index_dir, f'vectors_{len(products)}.npz')
+    index.save(path)
+    search_service.index_path = path
+    return products
+
+
+def run(size, seed_products, categories, targets, n_queries, budget, seed, index_dir):
+    generator = CatalogGenerator(seed_products, categories, seed)
+    start = time.perf_counter()
+    raw = list(generator.products(size))
+    generate_seconds = time.perf_counter() - start
+
+    build = {}
+    build['catalog_seconds'], build['catalog_mb'] = traced(lambda: catalog_store.replace(raw, categories))
+    snapshot = catalog_store.snapshot
+    queries = query_mix(snapshot.products, categories, n_queries, seed)
+
+    product_intelligence_service.result_cache.clear()
+    searches = {
+        'intelligent_search': lambda q: product_intelligence_service.intelligent_search(q, limit=20),
+        'optimized_search': lambda q: product_service.search(q, limit=10),
+        'find_relevant_products': lambda q: professional_ai_service._find_relevant_products(
+            q, professional_ai_service._analyze_intent(q, {})
+        ),
+    }
+    warmups = {
+        'intelligent_search': lambda: (product_intelligence_service.text_index, product_intelligence_service.spelling),
+        'optimized_search': lambda: product_service.spelling,
+        'find_relevant_products': lambda: professional_ai_service.spelling,
+    }
+    semantic_products = []
+
+    def warm_semantic():
+        semantic_products[:] = setup_semantic(snapshot, index_dir)
+        return search_service.vector_index
+
+    warmups['semantic_search'] = warm_semantic
+    searches['semantic_search'] = lambda q: search_service.semantic_search(q, semantic_products)
+
+    report = {'size': size, 'generate_seconds': round(generate_seconds, 2), 'build': build, 'targets': {}}
+    for name in targets:
+        build[f'{name}_index_seconds'], build[f'{name}_index_mb'] = traced(warmups[name])
+        report['targets'][name] = replay(searches[name], queries, budget)
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"\n{report['size']} products (catalog built in {report['build']['catalog_seconds']}s, "
+          f"{report['build']['catalog_mb']} MB)")
+    print(f"{'target':>24} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9} {'vs base':>8}")
+    for name, row in report['targets'].items():
+        change = ''
+        base = (baseline or {}).get(name)
+        if base and base['p95_ms']:
+            change = f"{row['p95_ms'] / base['p95_ms']:.2f}x"
+        print(f"{name:>24} {row['queries']:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+              f"{row['p99_ms']:>9} {row['throughput_qps']:>9} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--targets', nargs='+', default=[
+        'intelligent_search', 'optimized_search', 'find_relevant_products', 'semantic_search'
+    ])
+    parser.add_argument('--queries', type=int, default=500, help='Queries replayed per target and size')
+    parser.add_argument('--budget', type=float, default=30.0, help='Max seconds per target and size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help='Earlier JSON report to compare p95 latencies against')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {run_['size']: run_['targets'] for run_ in json.load(f)['runs']}
+
+    seed_products, categories = load_seed()
+    reports = []
+    with tempfile.TemporaryDirectory() as index_dir:
+        for size in args.sizes:
+            report = run(size, seed_products, categories, args.targets, args.queries, args.budget, args.seed, index_dir)
+            reports.append(report)
+            print_report(report, baseline.get(size))
+
+    result = {
+        'environment': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'seed': args.seed,
+        'queries': args.queries,
+        'runs': reports,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
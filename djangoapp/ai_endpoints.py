@@ -6,13 +6,35 @@ import json
 import logging
 
 from .models import Product
+from .services.ai_content_store import ai_content_store
 from .services.gemini_service import gemini_service
+from .services.sync_pool import run_sync
 
 logger = logging.getLogger(__name__)
 
+# These views are async: while Gemini answers, the worker keeps serving other
+# requests. Database queries run on the bounded sync pool (run_sync).
+# Product descriptions, marketing content and FAQs are served from the
+# ProductAIContent rows the generate_ai_content command stores.
+
+
+def _search_results(query: str):
+    products = Product.objects.filter(
+        models.Q(name__icontains=query) | 
+        models.Q(description__icontains=query),
+        is_active=True
+    )[:10]
+    
+    return [{
+        'id': p.id,
+        'name': p.name,
+        'price': float(p.price),
+        'category': p.category.name if p.category else 'General'
+    } for p in products]
+
 
 @csrf_exempt
-def generate_product_bundles(request):
+async def generate_product_bundles(request):
     """Generate AI-powered product bundles"""
     if request.method != 'GET':
         return JsonResponse({"error": "GET method required"}, status=405)
@@ -22,7 +44,7 @@ def generate_product_bundles(request):
         return JsonResponse({"error": "Product ID required"}, status=400)
     
     try:
-        result = gemini_service.generate_bundle_suggestions(int(product_id))
+        result = await gemini_service.agenerate_bundle_suggestions(int(product_id))
         return JsonResponse(result)
     except Exception as e:
         logger.error(f"Bundle generation error: {e}")
@@ -30,7 +52,7 @@ def generate_product_bundles(request):
 
 
 @csrf_exempt
-def enhance_search_results(request):
+async def enhance_search_results(request):
     """Enhance search results with AI insights"""
     if request.method != 'GET':
         return JsonResponse({"error": "GET method required"}, status=405)
@@ -40,20 +62,8 @@ def enhance_search_results(request):
         return JsonResponse({"error": "Search query required"}, status=400)
     
     try:
-        products = Product.objects.filter(
-            models.Q(name__icontains=query) | 
-            models.Q(description__icontains=query),
-            is_active=True
-        )[:10]
-        
-        search_results = [{
-            'id': p.id,
-            'name': p.name,
-            'price': float(p.price),
-            'category': p.category.name if p.category else 'General'
-        } for p in products]
-        
-        enhancement = gemini_service.smart_search_enhancement(query, search_results)
+        search_results = await run_sync(_search_results, query)
+        enhancement = await gemini_service.asmart_search_enhancement(query, search_results)
         return JsonResponse({
             "results": search_results,
             "enhancement": enhancement
@@ -64,7 +74,7 @@ def enhance_search_results(request):
 
 
 @csrf_exempt
-def generate_marketing_content(request):
+async def generate_marketing_content(request):
     """Generate AI marketing content for products"""
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
@@ -77,15 +87,7 @@ def generate_marketing_content(request):
         if not product_id:
             return JsonResponse({"error": "Product ID required"}, status=400)
         
-        product = Product.objects.get(id=product_id)
-        product_data = {
-            'name': product.name,
-            'price': float(product.price),
-            'category': product.category.name if product.category else 'General',
-            'description': product.description
-        }
-        
-        content = gemini_service.generate_marketing_content(product_data, target_audience)
+        content = await ai_content_store.aget(int(product_id), 'marketing', target_audience)
         return JsonResponse(content)
         
     except Product.DoesNotExist:
@@ -96,7 +98,7 @@ def generate_marketing_content(request):
 
 
 @csrf_exempt
-def analyze_product_sentiment(request):
+async def analyze_product_sentiment(request):
     """Analyze customer sentiment for products"""
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
@@ -108,7 +110,7 @@ def analyze_product_sentiment(request):
         if not reviews:
             return JsonResponse({"error": "Reviews required"}, status=400)
         
-        analysis = gemini_service.analyze_customer_sentiment(reviews)
+        analysis = await gemini_service.aanalyze_customer_sentiment(reviews)
         return JsonResponse(analysis)
         
     except Exception as e:
@@ -117,21 +119,29 @@ def analyze_product_sentiment(request):
 
 
 @csrf_exempt
-def generate_product_description(request):
+async def generate_product_description(request):
     """Generate enhanced product descriptions"""
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
     
     try:
         data = json.loads(request.body)
+        product_id = data.get('product_id')
         product_name = data.get('product_name', '')
         category = data.get('category', '')
         features = data.get('features', [])
         
+        if product_id:
+            content = await ai_content_store.aget(int(product_id), 'description')
+            return JsonResponse({
+                "description": content["content"],
+                "status": content["status"]
+            })
+        
         if not product_name:
             return JsonResponse({"error": "Product name required"}, status=400)
         
-        description = gemini_service.generate_product_descriptions(
+        description = await gemini_service.agenerate_product_descriptions(
             product_name, category, features
         )
         
@@ -140,6 +150,31 @@ def generate_product_description(request):
             "status": "success"
         })
         
+    except Product.DoesNotExist:
+        return JsonResponse({"error": "Product not found"}, status=404)
     except Exception as e:
         logger.error(f"Description generation error: {e}")
-        return JsonResponse({"error": "Failed to generate description"}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": "Failed to generate description"}, status=500)
+
+
+@csrf_exempt
+async def generate_product_faq(request):
+    """FAQ responses for a product"""
+    if request.method != 'GET':
+        return JsonResponse({"error": "GET method required"}, status=405)
+    
+    product_id = request.GET.get('product_id')
+    if not product_id:
+        return JsonResponse({"error": "Product ID required"}, status=400)
+    
+    try:
+        content = await ai_content_store.aget(int(product_id), 'faq')
+        return JsonResponse({
+            "faq": content["content"],
+            "status": content["status"]
+        })
+    except Product.DoesNotExist:
+        return JsonResponse({"error": "Product not found"}, status=404)
+    except Exception as e:
+        logger.error(f"FAQ generation error: {e}")
+        return JsonResponse({"error": "Failed to generate FAQ"}, status=500)
@@ -3,4 +3,9 @@ from django.apps import AppConfig
 
 class DjangoappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'djangoapp'
\ No newline at end of file
+    name = 'djangoapp'
+
+    def ready(self):
+        # Keep the in-memory catalog in sync with Product/Category edits, and
+        # start watching the catalog files once the process serves a request
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from djangoapp.models import Product
+from djangoapp.services.vector_index import VectorIndex
+
+
+class Command(BaseCommand):
+    help = 'Build the local semantic search vector index for all active products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.SEMANTIC_INDEX_PATH,
+                            help='Path of the .npz index file to write')
+        parser.add_argument('--dimensions', type=int, default=128,
+                            help='Embedding dimensions kept after SVD')
+        parser.add_argument('--features', type=int, default=4096,
+                            help='Number of hashed TF-IDF features')
+        parser.add_argument('--backend', choices=['exact', 'ivf'], default='exact',
+                            help='Nearest-neighbour backend (ivf for large catalogs)')
+        parser.add_argument('--lists', type=int, default=None,
+                            help='Number of IVF lists (default: sqrt of catalog size)')
+
+    def handle(self, *args, **options):
+        products = [{
+            'id': p.id,
+            'name': p.name,
+            'description': p.description,
+            'category': p.category.name if p.category else '',
+            'brand': p.brand or ''
+        } for p in Product.objects.filter(is_active=True).select_related('category')]
+
+        if not products:
+            self.stdout.write(self.style.ERROR('No active products found. Run populate_db first.'))
+            return
+
+        self.stdout.write(f'Embedding {len(products)} products...')
+        ann_options = {'n_lists': options['lists']} if options['backend'] == 'ivf' else {}
+        index = VectorIndex.build(
+            products,
+            n_features=options['features'],
+            dimensions=options['dimensions'],
+            backend=options['backend'],
+            **ann_options
+        )
+        index.save(options['output'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {len(index)} vectors ({index.vectors.shape[1]} dimensions, '
+            f'{options["backend"]} backend) to {options["output"]}'
+        ))
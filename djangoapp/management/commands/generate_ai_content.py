@@ -0,0 +1,187 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from djangoapp.models import Product
+from djangoapp.services.ai_content_store import CALL_SITES, ai_content_store
+from djangoapp.services.llm_client import llm_client
+from djangoapp.services.llm_resilience import LLMUnavailable, RateLimiter
+
+# Seconds between checkpoint writes while the run makes progress
+CHECKPOINT_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = 'Generate and store AI descriptions, marketing content and FAQs for the whole catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kinds', nargs='+', choices=list(CALL_SITES), default=list(CALL_SITES),
+                            help='Kinds of content to generate')
+        parser.add_argument('--workers', type=int, default=settings.AI_CONTENT_WORKERS,
+                            help='Products processed concurrently')
+        parser.add_argument('--rate', type=float, default=settings.AI_CONTENT_RATE,
+                            help='Maximum model requests per second (0 = unlimited)')
+        parser.add_argument('--retries', type=int, default=2,
+                            help='Retries of a failed model request')
+        parser.add_argument('--checkpoint', default=settings.AI_CONTENT_CHECKPOINT,
+                            help='Checkpoint file an interrupted run resumes from')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and start from the first product')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate content even when the stored content is current')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Process at most this many products')
+
+    def handle(self, *args, **options):
+        jobs = [(kind, audience) for kind in options['kinds']
+                for audience in (ai_content_store.audiences if kind == 'marketing' else [''])]
+        checkpoint_path = options['checkpoint']
+        resume_after = 0 if options['restart'] else self._load_checkpoint(checkpoint_path, jobs)
+
+        product_ids = list(
+            Product.objects.filter(is_active=True, id__gt=resume_after)
+            .order_by('id').values_list('id', flat=True)[:options['limit']]
+        )
+        if not product_ids:
+            self.stdout.write(self.style.SUCCESS('No products left to process.'))
+            self._clear_checkpoint(checkpoint_path)
+            return
+
+        if resume_after:
+            self.stdout.write(f'Resuming after product {resume_after}.')
+        self.stdout.write(
+            f'Processing {len(product_ids)} products with {options["workers"]} workers '
+            f'({", ".join(options["kinds"])})...'
+        )
+
+        limiter = RateLimiter(options['rate'])
+        totals = {'generated': 0, 'current': 0, 'failed': 0}
+        # Products are submitted in id order; the checkpoint is the highest id
+        # below which every product completed without failures
+        submitted = deque()
+        completed = set()
+        watermark = resume_after
+        saved_at = time.monotonic()
+        ids = iter(product_ids)
+        pool = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='ai-content')
+        pending = {}
+
+        try:
+            while True:
+                # Bounded queue: products are loaded as workers free up
+                while len(pending) < options['workers'] * 2:
+                    product_id = next(ids, None)
+                    if product_id is None:
+                        break
+                    future = pool.submit(
+                        self._process, product_id, jobs, limiter, options['retries'], options['force']
+                    )
+                    pending[future] = product_id
+                    submitted.append(product_id)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    product_id = pending.pop(future)
+                    counts = future.result()
+                    for name, count in counts.items():
+                        totals[name] += count
+                    if not counts['failed']:
+                        completed.add(product_id)
+
+                while submitted and submitted[0] in completed:
+                    watermark = submitted.popleft()
+                    completed.discard(watermark)
+                if time.monotonic() - saved_at >= CHECKPOINT_INTERVAL:
+                    self._save_checkpoint(checkpoint_path, jobs, watermark)
+                    saved_at = time.monotonic()
+        except KeyboardInterrupt:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._save_checkpoint(checkpoint_path, jobs, watermark)
+            self.stdout.write(self.style.ERROR(
+                f'Interrupted: resume with the same command (checkpoint at product {watermark}).'
+            ))
+            return
+        pool.shutdown()
+
+        if totals['failed'] or len(product_ids) == options['limit']:
+            self._save_checkpoint(checkpoint_path, jobs, watermark)
+        else:
+            self._clear_checkpoint(checkpoint_path)
+
+        summary = (f'Generated {totals["generated"]}, already current {totals["current"]}, '
+                   f'failed {totals["failed"]}')
+        if totals['failed']:
+            self.stdout.write(self.style.ERROR(f'{summary}. Run again to retry the failures.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{summary}.'))
+
+    def _process(self, product_id, jobs, limiter, retries, force):
+        # Worker threads open their own database connections
+        close_old_connections()
+        counts = {'generated': 0, 'current': 0, 'failed': 0}
+        try:
+            product = Product.objects.select_related('category').get(id=product_id)
+            stale = ai_content_store.stale(product, jobs, force)
+            counts['current'] = len(jobs) - len(stale)
+            for kind, variant, prompt, content_hash in stale:
+                if self._generate(product, kind, variant, prompt, content_hash, limiter, retries, force):
+                    counts['generated'] += 1
+                else:
+                    counts['failed'] += 1
+        except Exception as e:
+            self.stderr.write(f'Product {product_id}: {e}')
+            counts['failed'] += len(jobs) - sum(counts.values())
+        finally:
+            close_old_connections()
+        return counts
+
+    def _generate(self, product, kind, variant, prompt, content_hash, limiter, retries, force):
+        for attempt in range(retries + 1):
+            limiter.acquire()
+            try:
+                # --force asks the model again instead of storing its cached response
+                ai_content_store.generate(product, kind, variant, prompt, content_hash, refresh=force)
+                return True
+            except LLMUnavailable as e:
+                # Breaker open: wait for it to let a trial call through
+                error, delay = e, llm_client.breaker.open_seconds
+            except Exception as e:
+                error, delay = e, 2 ** attempt
+            if attempt < retries:
+                time.sleep(delay)
+        self.stderr.write(f'Product {product.id} {kind}: {error}')
+        return False
+
+    def _load_checkpoint(self, path, jobs):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            self.stderr.write(f'Ignoring unreadable checkpoint {path}: {e}')
+            return 0
+        if checkpoint.get('jobs') != [list(job) for job in jobs]:
+            self.stdout.write('Checkpoint is for other kinds or audiences; starting over.')
+            return 0
+        return checkpoint.get('last_product_id', 0)
+
+    def _save_checkpoint(self, path, jobs, last_product_id):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'jobs': jobs, 'last_product_id': last_product_id}, f)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self, path):
+        # A finished pass starts over next time: new and changed products are
+        # picked up, current content is skipped by its hash
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,32 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .services.llm_resilience import request_deadline
+
+
+class RequestDeadlineMiddleware:
+    """Give each request REQUEST_DEADLINE_SECONDS end to end for its model calls
+
+    Model calls made while the view runs are capped to the time left, and
+    skipped (local fallback) when too little is left. Streamed responses are
+    produced after the view returns, so only per-call timeouts apply to them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.seconds = getattr(settings, 'REQUEST_DEADLINE_SECONDS', 20.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_deadline(self.seconds):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_deadline(self.seconds):
+            return await self.get_response(request)
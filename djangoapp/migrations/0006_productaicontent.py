@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-18 05:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0005_conversationhistory_productrecommendation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAIContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('description', 'Product Description'), ('marketing', 'Marketing Content'), ('faq', 'FAQ Responses')], max_length=20)),
+                ('variant', models.CharField(blank=True, default='', max_length=100)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('content', models.TextField()),
+                ('model', models.CharField(max_length=50)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_content', to='djangoapp.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'generated_at'], name='djangoapp_p_kind_eff582_idx')],
+                'unique_together': {('product', 'kind', 'variant')},
+            },
+        ),
+    ]
@@ -238,4 +238,60 @@ class ProductRecommendation(models.Model):
         ]
     
     def __str__(self):
-        return f"Recommendation: {self.product.name} for {self.user.username} ({self.score})"
\ No newline at end of file
+        return f"Recommendation: {self.product.name} for {self.user.username} ({self.score})"
+
+
+class ProductAIContent(models.Model):
+    """AI-generated copy for a product, stored by the generate_ai_content command
+
+    content_hash identifies the prompt (product data included) the content was
+    generated from: a row whose hash no longer matches the product is stale.
+    """
+    KIND_CHOICES = [
+        ('description', 'Product Description'),
+        ('marketing', 'Marketing Content'),
+        ('faq', 'FAQ Responses'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='ai_content')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    variant = models.CharField(max_length=100, blank=True, default='')  # Target audience of marketing content
+    content_hash = models.CharField(max_length=64)
+    content = models.TextField()
+    model = models.CharField(max_length=50)
+    generated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('product', 'kind', 'variant')
+        indexes = [
+            Index(fields=['kind', 'generated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for {self.product.name}"
+
+
+class CatalogChangeLog(models.Model):
+    """Products and categories edited in the database, for every process to replay
+
+    Written in the same transaction as the edit (see signals.py). Serving
+    processes poll for entries they have not applied and re-read the current
+    rows, so an entry says which object changed, not how. Only the latest
+    entry of each object is kept.
+    """
+    KIND_CHOICES = [
+        ('product', 'Product'),
+        ('category', 'Category'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            Index(fields=['kind', 'object_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id} changed"
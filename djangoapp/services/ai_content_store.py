@@ -0,0 +1,156 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from ..models import Product, ProductAIContent
+from .gemini_service import gemini_service
+from .llm_client import DEFAULT_MODEL, cache_key, llm_client
+from .sync_pool import run_sync
+
+logger = logging.getLogger(__name__)
+
+# llm_client call site (TTL and stats) of each kind of stored content
+CALL_SITES = {
+    'description': 'product_description',
+    'marketing': 'marketing_content',
+    'faq': 'product_faq',
+}
+
+# Questions answered in every product's FAQ
+FAQ_QUESTIONS = [
+    'What are the main features of this product?',
+    'Who is this product best suited for?',
+    'How do I care for or maintain it?',
+    'Is it good value for the price?',
+]
+
+
+class AIContentStore:
+    """Product copy generated once per product version and served from ProductAIContent
+
+    The content hash of a row is the llm_client cache key of the prompt it was
+    generated from. The prompt holds exactly the product data the content
+    depends on, so a row goes stale (and is regenerated) when that data, the
+    prompt or the model changes, but not on e.g. stock or rating updates.
+    Marketing content is stored for `audiences` only; other target audiences
+    are generated live (and cached by llm_client).
+    """
+
+    def __init__(self, audiences: List[str], model: str = DEFAULT_MODEL):
+        self.audiences = audiences
+        self.model = model
+
+    def _product_data(self, product: Product) -> Dict:
+        return {
+            'name': product.name,
+            'price': float(product.price),
+            'category': product.category.name if product.category else 'General',
+            'description': product.description
+        }
+
+    def prompt(self, product: Product, kind: str, variant: str = '') -> str:
+        """Prompt `kind` content of the product is generated from"""
+        data = self._product_data(product)
+        if kind == 'description':
+            features = [f"Brand: {product.brand}"] if product.brand else []
+            if product.description:
+                features.append(product.description)
+            return gemini_service._product_description_prompt(data['name'], data['category'], features)
+        if kind == 'marketing':
+            return gemini_service._marketing_prompt(data, variant)
+        return gemini_service._faq_prompt(data, FAQ_QUESTIONS)
+
+    def content_hash(self, prompt: str) -> str:
+        return cache_key(self.model, prompt, None)
+
+    def is_stored(self, kind: str, variant: str) -> bool:
+        """Whether content of this kind and variant is kept in ProductAIContent"""
+        return kind != 'marketing' or variant in self.audiences
+
+    def fallback(self, product: Product, kind: str) -> str:
+        if kind == 'description':
+            return gemini_service._description_fallback(product.name)
+        if kind == 'marketing':
+            return gemini_service._marketing_fallback(self._product_data(product))['content']
+        return '{}'
+
+    def lookup(self, product_id: int, kind: str, variant: str = '') -> Tuple[Optional[str], Product, str, str]:
+        """Stored content if it is current, else None, with the product, prompt and content hash
+
+        One indexed read (product, kind, variant) that also loads the product;
+        the product is only queried on its own when nothing is stored yet.
+        """
+        row = None
+        if self.is_stored(kind, variant):
+            row = ProductAIContent.objects.select_related('product__category').filter(
+                product_id=product_id, kind=kind, variant=variant
+            ).first()
+        product = row.product if row else Product.objects.select_related('category').get(id=product_id)
+
+        prompt = self.prompt(product, kind, variant)
+        content_hash = self.content_hash(prompt)
+        if row and row.content_hash == content_hash:
+            return row.content, product, prompt, content_hash
+        return None, product, prompt, content_hash
+
+    def save(self, product: Product, kind: str, variant: str, content_hash: str, content: str):
+        ProductAIContent.objects.update_or_create(
+            product=product, kind=kind, variant=variant,
+            defaults={'content_hash': content_hash, 'content': content, 'model': self.model}
+        )
+
+    def stale(self, product: Product, jobs: List[Tuple[str, str]],
+              force: bool = False) -> List[Tuple[str, str, str, str]]:
+        """(kind, variant, prompt, content hash) of the jobs whose stored content is missing or stale"""
+        stored = {
+            (kind, variant): content_hash
+            for kind, variant, content_hash in ProductAIContent.objects.filter(product=product)
+            .values_list('kind', 'variant', 'content_hash')
+        }
+        pending = []
+        for kind, variant in jobs:
+            prompt = self.prompt(product, kind, variant)
+            content_hash = self.content_hash(prompt)
+            if force or stored.get((kind, variant)) != content_hash:
+                pending.append((kind, variant, prompt, content_hash))
+        return pending
+
+    def generate(self, product: Product, kind: str, variant: str, prompt: str, content_hash: str,
+                 refresh: bool = False) -> str:
+        """Generate and store content; API errors are raised and nothing is stored
+
+        With `refresh` the llm_client cache is bypassed (and updated), so the
+        model writes new content even for a prompt it answered recently.
+        """
+        content = llm_client.generate(prompt, call_site=CALL_SITES[kind], model=self.model, refresh=refresh).strip()
+        if not content:
+            raise ValueError(f"empty {kind} response for product {product.id}")
+        self.save(product, kind, variant, content_hash, content)
+        return content
+
+    async def aget(self, product_id: int, kind: str, variant: str = '') -> Dict[str, str]:
+        """Content of the product: stored if current, else generated live (and stored)
+
+        Raises Product.DoesNotExist. When the model fails, the local fallback
+        is returned with status 'fallback' and nothing is stored.
+        """
+        content, product, prompt, content_hash = await run_sync(self.lookup, product_id, kind, variant)
+        if content is not None:
+            return {"content": content, "status": "success", "source": "stored"}
+
+        try:
+            content = (await llm_client.agenerate(prompt, call_site=CALL_SITES[kind], model=self.model)).strip()
+            if not content:
+                raise ValueError(f"empty {kind} response for product {product_id}")
+        except Exception as e:
+            logger.error(f"AI content generation error ({kind}, product {product_id}): {e}")
+            return {"content": self.fallback(product, kind), "status": "fallback", "source": "fallback"}
+
+        if self.is_stored(kind, variant):
+            await run_sync(self.save, product, kind, variant, content_hash, content)
+        return {"content": content, "status": "success", "source": "generated"}
+
+
+# Global instance
+ai_content_store = AIContentStore(audiences=getattr(settings, 'AI_CONTENT_AUDIENCES', ['general']))
@@ -0,0 +1,232 @@
+import copy
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .ranking import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+class ExactIndex:
+    """Brute-force inner-product index over L2-normalized vectors
+
+    Vectors live in a growable buffer so add() is amortized O(added) rather than
+    copying the whole matrix on every insert. add() is for building; an index
+    that is already being searched is extended with with_added(), which leaves
+    it untouched for concurrent readers.
+    """
+
+    name = 'exact'
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.size]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    def _grow(self, needed: int):
+        capacity = len(self._ids)
+        if self.size + needed <= capacity:
+            return
+        capacity = max(self.size + needed, capacity * 2, 1024)
+        ids = np.zeros(capacity, dtype=np.int64)
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        ids[:self.size] = self.ids
+        vectors[:self.size] = self.vectors
+        self._ids, self._vectors = ids, vectors
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> np.ndarray:
+        """Append vectors; returns the row positions they were stored at"""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimensions)
+        self._grow(len(ids))
+        rows = np.arange(self.size, self.size + len(ids))
+        self._ids[rows] = ids
+        self._vectors[rows] = vectors
+        self.size += len(ids)
+        return rows
+
+    def _copy(self) -> 'ExactIndex':
+        # The copy starts from views of exactly `size` rows: with no spare
+        # capacity, its first add() moves to new buffers instead of writing
+        # into the ones this index is read from
+        index = copy.copy(self)
+        index._ids, index._vectors = self.ids, self.vectors
+        return index
+
+    def with_added(self, ids: Iterable[int], vectors: np.ndarray) -> Tuple['ExactIndex', np.ndarray]:
+        """New index with the vectors appended, and their row positions"""
+        index = self._copy()
+        rows = index.add(ids, vectors)
+        return index, rows
+
+    def _top_k(self, rows: Optional[np.ndarray], scores: np.ndarray, limit: int,
+               allowed_ids: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        ids = self.ids if rows is None else self.ids[rows]
+        if allowed_ids is not None:
+            scores = np.where(np.isin(ids, allowed_ids), scores, -np.inf)
+
+        top = top_k_indices(scores, limit, ids)
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def search(self, query: np.ndarray, limit: int = 10, allowed_ids: Optional[np.ndarray] = None,
+               **params) -> List[Tuple[int, float]]:
+        """Exact top-k by inner product (cosine similarity for normalized vectors)"""
+        return self._top_k(None, self.vectors @ query, limit, allowed_ids)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to restore this index with from_state()"""
+        return {'ids': self.ids, 'vectors': self.vectors}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> 'ExactIndex':
+        index = cls(state['vectors'].shape[1])
+        index.add(state['ids'], state['vectors'])
+        return index
+
+    def save(self, path: str):
+        np.savez(path, backend=np.array(self.name), **self.state())
+
+    @classmethod
+    def load(cls, path: str) -> 'ExactIndex':
+        with np.load(path, allow_pickle=False) as data:
+            backend = ANN_BACKENDS[str(data['backend'])]
+            return backend.from_state({key: data[key] for key in data.files})
+
+
+class IVFFlatIndex(ExactIndex):
+    """Inverted-file index: vectors are bucketed by their nearest k-means centroid
+
+    A query is only compared against the vectors in its `nprobe` closest lists,
+    so nprobe trades recall for latency (nprobe == n_lists is exact search).
+    """
+
+    name = 'ivf'
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 8):
+        super().__init__(centroids.shape[1])
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self._list_rows: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(len(self.centroids))]
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, n_lists: Optional[int] = None, iterations: int = 15,
+              sample_size: int = 50000, nprobe: int = 8, seed: int = 0) -> 'IVFFlatIndex':
+        """Learn the coarse quantizer with spherical k-means on a sample of vectors"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = cls._nearest(centroids, vectors)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+
+            # Re-seed empty lists with random vectors
+            empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+            sums[empty] = vectors[rng.integers(len(vectors), size=len(empty))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        return cls(centroids, nprobe=nprobe)
+
+    @staticmethod
+    def _nearest(centroids: np.ndarray, vectors: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch_size):
+            labels[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+        return labels
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> np.ndarray:
+        """Assign new vectors to their nearest list; no retraining needed"""
+        rows = super().add(ids, vectors)
+        labels = self._nearest(self.centroids, self._vectors[rows])
+        self._assign(rows, labels)
+        return rows
+
+    def _copy(self) -> 'IVFFlatIndex':
+        index = super()._copy()
+        index._list_rows = list(self._list_rows)
+        return index
+
+    def _assign(self, rows: np.ndarray, labels: np.ndarray):
+        # Lists get new arrays rather than being extended, so a copy made by
+        # _copy() never shares a list that is still changing
+        for list_id in np.unique(labels):
+            self._list_rows[list_id] = np.concatenate([self._list_rows[list_id], rows[labels == list_id]])
+
+    def _rows(self, list_id: int) -> np.ndarray:
+        return self._list_rows[list_id]
+
+    def assignments(self) -> np.ndarray:
+        """List id of every stored row"""
+        labels = np.zeros(self.size, dtype=np.int32)
+        for list_id in range(self.n_lists):
+            labels[self._rows(list_id)] = list_id
+        return labels
+
+    def search(self, query: np.ndarray, limit: int = 10, allowed_ids: Optional[np.ndarray] = None,
+               nprobe: Optional[int] = None, **params) -> List[Tuple[int, float]]:
+        """Approximate top-k restricted to the `nprobe` lists closest to the query"""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([self._rows(int(list_id)) for list_id in probe])
+        return self._top_k(rows, self._vectors[rows] @ query, limit, allowed_ids)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        state = super().state()
+        state.update({
+            'centroids': self.centroids,
+            'assignments': self.assignments(),
+            'nprobe': np.int64(self.nprobe),
+        })
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> 'IVFFlatIndex':
+        index = cls(state['centroids'], nprobe=int(state['nprobe']))
+        rows = ExactIndex.add(index, state['ids'], state['vectors'])
+        index._assign(rows, state['assignments'])
+        return index
+
+
+ANN_BACKENDS = {
+    ExactIndex.name: ExactIndex,
+    IVFFlatIndex.name: IVFFlatIndex,
+}
+
+
+def build_ann_index(ids: Iterable[int], vectors: np.ndarray, backend: str = 'exact', **options) -> ExactIndex:
+    """Build the named backend over the given vectors"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if backend == IVFFlatIndex.name:
+        index = IVFFlatIndex.train(vectors, **options)
+    else:
+        index = ANN_BACKENDS[backend](vectors.shape[1])
+    index.add(ids, vectors)
+    return index
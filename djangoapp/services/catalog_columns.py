@@ -0,0 +1,147 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog_store import CatalogChange, CatalogSnapshot
+from .pagination import resume_index
+
+logger = logging.getLogger(__name__)
+
+
+class ColumnarCatalog:
+    """Column-oriented NumPy view of a catalog snapshot
+
+    Each numeric product attribute is held in its own array, aligned with
+    snapshot.products. Sort permutations are computed once per snapshot so
+    filtered listings are a boolean mask applied to a precomputed order.
+    """
+
+    # Sort keys available to top(); each maps to the column it orders by (descending)
+    SORT_COLUMNS = {
+        'popularity': 'popularity_score',
+        'value': 'value_score',
+        'rating': 'rating',
+    }
+
+    # Column attribute -> (product field, dtype)
+    COLUMNS = {
+        'ids': ('id', np.int64),
+        'price': ('price', np.float64),
+        'rating': ('rating', np.float64),
+        'discount': ('discount_percentage', np.float64),
+        'stock': ('stock_quantity', np.int64),
+        'category_id': ('category_id', np.int64),
+        'popularity_score': ('popularity_score', np.float64),
+        'value_score': ('value_score', np.float64),
+    }
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.products = snapshot.products
+        for name, (field, dtype) in self.COLUMNS.items():
+            setattr(self, name, self._column(self.products, field, dtype))
+
+        # Descending by score, ties broken by ascending id, so every product has
+        # one fixed place and keyset cursors can resume anywhere in the order
+        self.orders = {
+            name: np.lexsort((self.ids, -getattr(self, column)))
+            for name, column in self.SORT_COLUMNS.items()
+        }
+        # Negated scores and ids in each order, for binary-searching a cursor
+        self.sorted_keys = {
+            name: -getattr(self, column)[self.orders[name]]
+            for name, column in self.SORT_COLUMNS.items()
+        }
+        self.sorted_ids = {name: self.ids[order] for name, order in self.orders.items()}
+
+    @staticmethod
+    def _column(products, field: str, dtype) -> np.ndarray:
+        return np.fromiter((p.get(field) or 0 for p in products), dtype=dtype, count=len(products))
+
+    def with_changes(self, change: CatalogChange) -> 'ColumnarCatalog':
+        """Columns for change.snapshot, reading only the products at change.positions
+
+        Unchanged slots are copied array-wise; in each sort order the stale
+        slots are dropped and the changed ones inserted at their binary-searched
+        place, so nothing is re-read or re-sorted per product.
+        """
+        columns = ColumnarCatalog.__new__(ColumnarCatalog)
+        columns.products = products = change.snapshot.products
+        size = len(products)
+        positions = np.asarray(change.positions, dtype=np.int64)
+        changed = [products[i] for i in change.positions]
+
+        for name, (field, dtype) in self.COLUMNS.items():
+            old = getattr(self, name)
+            column = np.zeros(size, dtype=dtype)
+            kept = min(size, len(old))
+            column[:kept] = old[:kept]
+            column[positions] = self._column(changed, field, dtype)
+            setattr(columns, name, column)
+
+        # Slots whose product changed or that are past the new end
+        stale = np.zeros(len(self), dtype=bool)
+        stale[positions[positions < len(self)]] = True
+        stale[size:] = True
+
+        columns.orders, columns.sorted_keys, columns.sorted_ids = {}, {}, {}
+        for name, column in self.SORT_COLUMNS.items():
+            keep = ~stale[self.orders[name]]
+            order = self.orders[name][keep]
+            keys = self.sorted_keys[name][keep]
+            ids = self.sorted_ids[name][keep]
+
+            new_keys = -getattr(columns, column)[positions]
+            new_ids = columns.ids[positions]
+            arranged = np.lexsort((new_ids, new_keys))
+            insert_at = [
+                resume_index(keys, ids, (-float(new_keys[i]), int(new_ids[i]))) for i in arranged
+            ]
+            columns.orders[name] = np.insert(order, insert_at, positions[arranged])
+            columns.sorted_keys[name] = np.insert(keys, insert_at, new_keys[arranged])
+            columns.sorted_ids[name] = np.insert(ids, insert_at, new_ids[arranged])
+
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def mask(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+             category_id: Optional[int] = None, min_rating: Optional[float] = None) -> np.ndarray:
+        """Boolean mask of products matching every given filter"""
+        mask = np.ones(len(self.products), dtype=bool)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if category_id is not None:
+            mask &= self.category_id == category_id
+        if min_rating is not None:
+            mask &= self.rating >= min_rating
+        return mask
+
+    def sort_values(self, sort_by: str) -> np.ndarray:
+        """The column a sort key orders by"""
+        return getattr(self, self.SORT_COLUMNS[sort_by])
+
+    def top_positions(self, sort_by: str, limit: int, mask: Optional[np.ndarray] = None,
+                      after: Optional[Tuple[float, int]] = None) -> np.ndarray:
+        """Positions of the first `limit` products in `sort_by` order that pass the mask
+
+        `after` is a (score, id) keyset position; only products ordered after it
+        are considered, so later pages start with two binary searches instead of
+        walking every earlier page.
+        """
+        order = self.orders[sort_by]
+        if after is not None:
+            order = order[resume_index(self.sorted_keys[sort_by], self.sorted_ids[sort_by], after):]
+        if mask is not None:
+            order = order[mask[order]]
+        return order[:limit]
+
+    def top(self, sort_by: str, limit: int, mask: Optional[np.ndarray] = None,
+            after: Optional[Tuple[float, int]] = None) -> List[Dict]:
+        """Same as top_positions() but returns the products as plain dicts"""
+        products = self.products
+        return [products[i].to_dict() for i in self.top_positions(sort_by, limit, mask, after)]
+
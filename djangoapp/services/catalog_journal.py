@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List
+
+from ..models import CatalogChangeLog, Category, Product
+from .catalog_store import catalog_store
+
+logger = logging.getLogger(__name__)
+
+# Objects re-read from the database per query while replaying
+REPLAY_BATCH_SIZE = 500
+
+
+def product_to_dict(product: Product) -> Dict:
+    """Product model instance in the shape of the catalog JSON"""
+    return {
+        'id': product.pk,
+        'name': product.name,
+        'description': product.description,
+        'price': float(product.price),
+        'category_id': product.category_id,
+        'brand': product.brand or '',
+        'sku': product.sku,
+        'stock_quantity': product.stock_quantity,
+        'rating': float(product.rating),
+        'discount_percentage': float(product.discount_percentage),
+        'image_url': product.image_url or '',
+        'images': list(product.images or []),
+        'is_active': product.is_active,
+        'availability_status': product.availability_status,
+        'created_at': product.created_at.isoformat() if product.created_at else None,
+        'updated_at': product.updated_at.isoformat() if product.updated_at else None,
+    }
+
+
+def category_to_dict(category: Category) -> Dict:
+    return {
+        'id': category.pk,
+        'name': category.name,
+        'description': category.description,
+        'is_active': category.is_active,
+        'created_at': category.created_at.isoformat() if category.created_at else None,
+    }
+
+
+def _batches(ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(ids), REPLAY_BATCH_SIZE):
+        yield ids[start:start + REPLAY_BATCH_SIZE]
+
+
+class CatalogJournal:
+    """Brings catalog_store up to date with edits made by any process
+
+    Model signals record an entry per edited product or category in the
+    edit's own transaction; the process that saved applies it right away.
+    Every serving process polls the entries from its catalog watcher thread
+    and re-reads the rows it has not applied yet, so admin saves in another
+    worker and sync_database runs reach all workers. The first poll replays
+    every entry: edits made before the process started are applied on top
+    of the catalog files too.
+
+    Entries can commit out of id order when transactions overlap. Ids seen
+    within the last `settle_seconds` are looked back over, so an entry whose
+    transaction commits later is still picked up (transactions are assumed to
+    commit within that time).
+    """
+
+    def __init__(self, settle_seconds: float = 60.0):
+        self.settle_seconds = settle_seconds
+        self._after_id = 0  # every entry up to this id has been applied (or superseded)
+        self._seen: Dict[int, float] = {}  # applied ids above _after_id -> monotonic time first seen
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, object_id: int, using: str = 'default') -> int:
+        """Journal an edit in the current transaction; returns the entry id"""
+        entries = CatalogChangeLog.objects.using(using)
+        entry = entries.create(kind=kind, object_id=object_id)
+        # Only the latest entry of an object matters
+        entries.filter(kind=kind, object_id=object_id, id__lt=entry.pk).delete()
+        return entry.pk
+
+    def mark_applied(self, entry_id: int):
+        """An entry this process already applied itself; polling skips it"""
+        with self._lock:
+            if entry_id > self._after_id:
+                self._seen.setdefault(entry_id, time.monotonic())
+
+    def poll(self) -> int:
+        """Apply entries committed since the last poll; returns how many objects were re-read"""
+        with self._lock:
+            entries = list(
+                CatalogChangeLog.objects.filter(id__gt=self._after_id)
+                .order_by('id').values_list('id', 'kind', 'object_id')
+            )
+            fresh = [entry for entry in entries if entry[0] not in self._seen]
+            if fresh:
+                self._replay(
+                    {object_id for _, kind, object_id in fresh if kind == 'product'},
+                    {object_id for _, kind, object_id in fresh if kind == 'category'},
+                )
+
+            now = time.monotonic()
+            for entry_id, _, _ in fresh:
+                self._seen[entry_id] = now
+            # Lower ids can still commit until the newest of them has been
+            # seen for settle_seconds
+            settled = [entry_id for entry_id, seen_at in self._seen.items()
+                       if now - seen_at >= self.settle_seconds]
+            if settled:
+                self._after_id = max(self._after_id, max(settled))
+                self._seen = {entry_id: seen_at for entry_id, seen_at in self._seen.items()
+                              if entry_id > self._after_id}
+        return len(fresh)
+
+    def _replay(self, product_ids: Iterable[int], category_ids: Iterable[int]):
+        product_ids, category_ids = sorted(product_ids), sorted(category_ids)
+        upserts, categories = [], []
+        for batch in _batches(product_ids):
+            upserts.extend(
+                product_to_dict(product)
+                for product in Product.objects.filter(id__in=batch, is_active=True)
+            )
+        for batch in _batches(category_ids):
+            categories.extend(category_to_dict(category) for category in Category.objects.filter(id__in=batch))
+
+        # Missing or inactive rows were deleted or deactivated
+        active_ids = {product['id'] for product in upserts}
+        found_category_ids = {category['id'] for category in categories}
+        catalog_store.apply_changes(
+            upserts=upserts,
+            deleted_ids=[product_id for product_id in product_ids if product_id not in active_ids],
+            categories=categories,
+            deleted_category_ids=[category_id for category_id in category_ids
+                                  if category_id not in found_category_ids],
+        )
+        logger.info(f"Catalog journal replayed {len(product_ids)} products and {len(category_ids)} categories")
+
+
+# Global instance
+catalog_journal = CatalogJournal()
+catalog_store.add_poller(catalog_journal.poll)
@@ -0,0 +1,495 @@
+import hashlib
+import json
+import os
+import logging
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .product_record import ProductRecord
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS_FILE = os.path.join(os.path.dirname(__file__), '../../database/data/products.json')
+CATEGORIES_FILE = os.path.join(os.path.dirname(__file__), '../../database/data/categories.json')
+
+KNOWN_BRANDS = ['chanel', 'dior', 'calvin klein', 'gucci', 'essence']
+
+CATEGORY_KEYWORDS = {
+    1: ['makeup', 'beauty', 'cosmetic'],       # Beauty
+    2: ['perfume', 'fragrance', 'scent'],      # Fragrances
+    3: ['furniture', 'home', 'decor'],         # Furniture
+}
+
+COMPLEMENTARY_CATEGORIES = {
+    1: [2],  # Beauty complements with Fragrances
+    2: [1],  # Fragrances complement with Beauty
+    3: []    # Furniture standalone
+}
+
+
+def calculate_popularity(product: Dict) -> float:
+    """Calculate product popularity score"""
+    score = 0.0
+
+    # Rating contribution (0-50 points)
+    rating = product.get('rating', 0)
+    score += rating * 10
+
+    # Stock level contribution (0-20 points)
+    stock = product.get('stock_quantity', 0)
+    if stock > 50:
+        score += 20
+    elif stock > 10:
+        score += 15
+    elif stock > 0:
+        score += 10
+
+    # Price attractiveness (0-15 points)
+    discount = product.get('discount_percentage', 0)
+    score += discount * 0.5
+
+    # Brand recognition (0-15 points)
+    brand = product.get('brand', '').lower()
+    if any(kb in brand for kb in KNOWN_BRANDS):
+        score += 15
+
+    return round(score, 2)
+
+
+def calculate_value_score(product: Dict) -> float:
+    """Calculate value-for-money score"""
+    rating = product.get('rating', 0)
+    price = product.get('price', 1)
+    discount = product.get('discount_percentage', 0)
+
+    # Base value: rating per dollar
+    base_value = rating / price if price > 0 else 0
+
+    # Discount bonus
+    discount_bonus = discount * 0.01
+
+    return round((base_value + discount_bonus) * 100, 2)
+
+
+def extract_keywords(product: Dict) -> List[str]:
+    """Extract searchable keywords from product"""
+    keywords = []
+
+    # Name keywords
+    name_words = product.get('name', '').lower().split()
+    keywords.extend([word for word in name_words if len(word) > 2])
+
+    # Brand
+    brand = product.get('brand', '').lower()
+    if brand:
+        keywords.append(brand)
+
+    # Category-specific keywords
+    keywords.extend(CATEGORY_KEYWORDS.get(product.get('category_id'), []))
+
+    return list(set(keywords))
+
+
+def classify_price_tier(price: float) -> str:
+    """Classify product into price tiers"""
+    if price < 20:
+        return "budget"
+    elif price < 100:
+        return "mid-range"
+    else:
+        return "premium"
+
+
+def enrich_product(product: Dict) -> Dict:
+    """Compute every derived field the in-process product services rely on"""
+    product['price_tier'] = classify_price_tier(product.get('price', 0))
+    product['popularity_score'] = calculate_popularity(product)
+    product['value_score'] = calculate_value_score(product)
+    product['search_keywords'] = extract_keywords(product)
+    product['complementary_categories'] = COMPLEMENTARY_CATEGORIES.get(product.get('category_id'), [])
+    return product
+
+
+class CatalogChange:
+    """Products replaced or removed (old dicts) and added (new dicts) between two snapshots
+
+    `positions` lists, in ascending order, the slots of the new snapshot whose
+    product differs from the one the previous snapshot had there; every other
+    slot below the new length holds the same product as before.
+    """
+
+    __slots__ = ('snapshot', 'removed', 'added', 'positions', 'categories_changed')
+
+    def __init__(self, snapshot: 'CatalogSnapshot', removed: List[Dict], added: List[Dict],
+                 positions: List[int] = (), categories_changed: bool = False):
+        self.snapshot = snapshot
+        self.removed = removed
+        self.added = added
+        self.positions = positions
+        self.categories_changed = categories_changed
+
+
+class CatalogSnapshot:
+    """Immutable, versioned view of the enriched product catalog
+
+    Products are read-only ProductRecords shared by every service; callers
+    that need to annotate one take a to_dict() copy first. Structures derived
+    from the catalog (search indexes etc.) are cached per snapshot via derive().
+    """
+
+    __slots__ = (
+        'version', 'checksum', 'loaded_at', 'products', 'by_id', 'positions', 'categories',
+        '_derived', '_builders', '_lock'
+    )
+
+    def __init__(self, version: int, products: List[Dict], categories: List[Dict] = (), checksum: str = ''):
+        products = tuple(products)
+        self._assign(
+            version, products,
+            {p['id']: p for p in products},
+            {p['id']: i for i, p in enumerate(products)},
+            {c['id']: c for c in categories},
+            checksum
+        )
+
+    def _assign(self, version: int, products: Tuple[Dict, ...], by_id: Dict[int, Dict],
+                positions: Dict[int, int], categories: Dict[int, Dict], checksum: str):
+        self.version = version
+        self.checksum = checksum
+        self.loaded_at = datetime.now()
+        self.products: Tuple[ProductRecord, ...] = products
+        self.by_id: Mapping[int, ProductRecord] = MappingProxyType(by_id)
+        self.positions: Mapping[int, int] = MappingProxyType(positions)
+        self.categories: Mapping[int, Dict] = MappingProxyType(categories)
+        self._derived: Dict[str, object] = {}
+        self._builders: Dict[str, Tuple[Callable, Optional[Callable]]] = {}  # name -> (builder, updater)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def category_name(self, category_id: int, default: str = 'General') -> str:
+        category = self.categories.get(category_id)
+        return category['name'] if category else default
+
+    def derive(self, name: str, builder: Callable[['CatalogSnapshot'], object],
+               updater: Optional[Callable[[object, CatalogChange], object]] = None):
+        """Return the structure `name` built from this snapshot, building it once
+
+        An updater (or a `with_changes(change)` method on the built structure)
+        lets apply_changes() carry the structure over to the next snapshot
+        without rebuilding it; it must return a new object, never mutate.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = builder(self)
+                self._builders[name] = (builder, updater)
+            return self._derived[name]
+
+    def warm(self, previous: 'CatalogSnapshot'):
+        """Build every structure that was derived from `previous`, ahead of first use"""
+        with previous._lock:
+            builders = dict(previous._builders)
+
+        for name, (builder, updater) in builders.items():
+            try:
+                self.derive(name, builder, updater)
+            except Exception as e:
+                logger.error(f"Failed to pre-build '{name}' for catalog v{self.version}: {e}")
+
+    def apply_changes(self, version: int, upserts: List[Dict], deleted_ids: Iterable[int] = (),
+                      categories: Optional[Mapping[int, Dict]] = None) -> 'CatalogSnapshot':
+        """A new snapshot with products upserted and removed, sharing all unchanged products
+
+        A removed product's slot is filled by the last product, so no other
+        product moves. Derived structures that know how to apply a change are
+        carried over incrementally; the others are dropped and rebuilt on demand.
+        """
+        products = list(self.products)
+        by_id = dict(self.by_id)
+        positions = dict(self.positions)
+        removed, added = [], []
+        touched = set()
+
+        for product_id in deleted_ids:
+            old = by_id.pop(product_id, None)
+            if old is None:
+                continue
+            removed.append(old)
+            hole = positions.pop(product_id)
+            touched.add(hole)
+            last = products.pop()
+            if last['id'] != product_id:
+                products[hole] = last
+                positions[last['id']] = hole
+
+        for product in upserts:
+            old = by_id.get(product['id'])
+            if old is not None:
+                removed.append(old)
+                products[positions[product['id']]] = product
+            else:
+                positions[product['id']] = len(products)
+                products.append(product)
+            touched.add(positions[product['id']])
+            by_id[product['id']] = product
+            added.append(product)
+
+        snapshot = CatalogSnapshot.__new__(CatalogSnapshot)
+        snapshot._assign(
+            version, tuple(products), by_id, positions,
+            dict(self.categories if categories is None else categories), self.checksum
+        )
+
+        change = CatalogChange(
+            snapshot, removed, added, sorted(p for p in touched if p < len(products)),
+            categories_changed=categories is not None
+        )
+        with self._lock:
+            derived = list(self._derived.items())
+            # Remembered even for dropped structures, so a later reload pre-builds them
+            snapshot._builders.update(self._builders)
+
+        for name, value in derived:
+            updater = self._builders[name][1]
+            try:
+                if updater is not None:
+                    snapshot._derived[name] = updater(value, change)
+                elif hasattr(value, 'with_changes'):
+                    snapshot._derived[name] = value.with_changes(change)
+            except Exception as e:
+                logger.error(f"Could not update '{name}' incrementally, it will be rebuilt: {e}")
+
+        return snapshot
+
+
+class CatalogStore:
+    """Loads the product catalog and hands out the current snapshot
+
+    A new snapshot (from a file reload or from apply_changes) is fully built
+    before it replaces the current one with a single reference assignment, so
+    readers never wait on a reload and never see a partially built catalog.
+
+    Changes applied through apply_changes() come from the database (model
+    signals and the catalog journal). The latest state of every product and
+    category they touched is kept and replayed on top of each file reload,
+    so a reload never discards them.
+    """
+
+    def __init__(self, products_file: str = PRODUCTS_FILE, categories_file: str = CATEGORIES_FILE):
+        self.products_file = products_file
+        self.categories_file = categories_file
+        self._version = 0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+        self._pollers: List[Callable[[], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        # id -> (change sequence number, latest record or None when deleted)
+        self._changed_products: Dict[int, Tuple[int, Optional[Dict]]] = {}
+        self._changed_categories: Dict[int, Tuple[int, Optional[Dict]]] = {}
+        self._change_seq = 0
+        self._source_mtimes = self._read_mtimes()
+        self._snapshot = self.load()
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    def add_listener(self, callback: Callable[[CatalogSnapshot], None]):
+        """Call `callback(snapshot)` after every snapshot swap (in the thread that swapped)"""
+        self._listeners.append(callback)
+
+    def add_poller(self, callback: Callable[[], None]):
+        """Call `callback()` on every tick of the watcher thread (e.g. to pull database changes)"""
+        self._pollers.append(callback)
+
+    def _notify(self, snapshot: CatalogSnapshot):
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Catalog listener {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+    def _read_mtimes(self) -> Tuple:
+        mtimes = []
+        for path in (self.products_file, self.categories_file):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _read_json(self, path: str, checksum) -> List[Dict]:
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            checksum.update(raw)
+            return json.loads(raw)
+        except Exception as e:
+            logger.error(f"Failed to load {os.path.basename(path)}: {e}")
+            return []
+
+    def _read_sources(self) -> Tuple[List[Dict], List[Dict], str]:
+        checksum = hashlib.sha1()
+        products = self._read_json(self.products_file, checksum)
+        categories = self._read_json(self.categories_file, checksum)
+        return products, categories, checksum.hexdigest()
+
+    def _build(self, products: List[Dict], categories: List[Dict], checksum: str) -> CatalogSnapshot:
+        products = [ProductRecord(enrich_product(product)) for product in products]
+
+        with self._lock:
+            self._version += 1
+            snapshot = CatalogSnapshot(self._version, products, categories, checksum)
+
+        logger.info(f"Loaded catalog v{snapshot.version} with {len(snapshot)} products")
+        return snapshot
+
+    def load(self) -> CatalogSnapshot:
+        """Read the catalog files and build a new enriched snapshot"""
+        return self._build(*self._read_sources())
+
+    def reload(self) -> bool:
+        """Rebuild the catalog from its files and swap it in if their content changed
+
+        The new snapshot and every structure derived from the current one are
+        built first; only then is the snapshot swapped. Database changes
+        applied through apply_changes() are replayed on top of the file
+        contents, including those that arrive while the reload is built.
+        """
+        with self._reload_lock:
+            self._source_mtimes = self._read_mtimes()
+            products, categories, checksum = self._read_sources()
+            if not products or checksum == self._snapshot.checksum:
+                return False
+
+            snapshot = self._build(products, categories, checksum)
+            with self._lock:
+                replayed = self._change_seq
+                snapshot = self._replay_changes(snapshot, since=0)
+            snapshot.warm(self._snapshot)
+
+            with self._lock:
+                self._snapshot = self._replay_changes(snapshot, since=replayed)
+                snapshot = self._snapshot
+
+        logger.info(f"Catalog v{snapshot.version} is live")
+        self._notify(snapshot)
+        return True
+
+    def replace(self, products: List[Dict], categories: List[Dict]) -> CatalogSnapshot:
+        """Swap in a catalog built from the given raw products (imports, benchmarks)
+
+        Database changes recorded so far are forgotten, not replayed on top.
+        """
+        snapshot = self._build(products, categories, checksum='')
+        with self._lock:
+            self._snapshot = snapshot
+            self._changed_products.clear()
+            self._changed_categories.clear()
+        self._notify(snapshot)
+        return snapshot
+
+    def start_watching(self, interval: float = 5.0):
+        """Poll the catalog files every `interval` seconds and reload them when they change"""
+        with self._lock:
+            if self._watcher is not None or interval <= 0:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name='catalog-reloader',
+                                             daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching catalog files for changes every {interval}s")
+
+    def _watch(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                if self._read_mtimes() != self._source_mtimes:
+                    self.reload()
+            except Exception as e:
+                logger.error(f"Catalog reload failed: {e}")
+            for callback in list(self._pollers):
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Catalog poller {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+    def _replay_changes(self, snapshot: CatalogSnapshot, since: int) -> CatalogSnapshot:
+        """snapshot with the database changes recorded after sequence number `since` (call with _lock held)"""
+        upserts, deleted_ids = [], []
+        for product_id, (seq, product) in self._changed_products.items():
+            if seq > since:
+                if product is None:
+                    deleted_ids.append(product_id)
+                else:
+                    upserts.append(product)
+
+        category_map = None
+        for category_id, (seq, category) in self._changed_categories.items():
+            if seq > since:
+                if category_map is None:
+                    category_map = dict(snapshot.categories)
+                if category is None:
+                    category_map.pop(category_id, None)
+                else:
+                    category_map[category_id] = category
+
+        if not upserts and not deleted_ids and category_map is None:
+            return snapshot
+        self._version += 1
+        return snapshot.apply_changes(self._version, upserts, deleted_ids, category_map)
+
+    def apply_changes(self, upserts: Iterable[Dict] = (), deleted_ids: Iterable[int] = (),
+                      categories: Iterable[Dict] = (), deleted_category_ids: Iterable[int] = ()) -> CatalogSnapshot:
+        """Publish a new snapshot with the given products/categories added, replaced or removed
+
+        Readers holding the previous snapshot keep a consistent view; the swap
+        to the new one is a single reference assignment. Upserts are enriched
+        into ProductRecords first.
+        """
+        upserts = [ProductRecord(enrich_product(product)) for product in upserts]
+        deleted_ids = list(deleted_ids)
+        categories = list(categories)
+        deleted_category_ids = list(deleted_category_ids)
+
+        with self._lock:
+            previous = self._snapshot
+            category_map = None
+            if categories or deleted_category_ids:
+                category_map = dict(previous.categories)
+                category_map.update((c['id'], c) for c in categories)
+                for category_id in deleted_category_ids:
+                    category_map.pop(category_id, None)
+
+            self._version += 1
+            snapshot = previous.apply_changes(self._version, upserts, deleted_ids, category_map)
+            self._snapshot = snapshot
+
+            # Kept for replay on top of the next file reload
+            self._change_seq += 1
+            for product in upserts:
+                self._changed_products[product['id']] = (self._change_seq, product)
+            for product_id in deleted_ids:
+                self._changed_products[product_id] = (self._change_seq, None)
+            for category in categories:
+                self._changed_categories[category['id']] = (self._change_seq, category)
+            for category_id in deleted_category_ids:
+                self._changed_categories[category_id] = (self._change_seq, None)
+
+        deleted = sum(1 for product_id in deleted_ids if product_id in previous.by_id)
+        logger.info(f"Catalog v{snapshot.version}: {len(upserts)} products upserted, {deleted} removed")
+        self._notify(snapshot)
+        return snapshot
+
+
+# Global instance
+catalog_store = CatalogStore()
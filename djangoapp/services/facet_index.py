@@ -0,0 +1,204 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .catalog_store import CatalogChange, CatalogSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class Facet:
+    """One facet: a value code per product for counting, a bitmap per value for filtering
+
+    Bitmaps are built the first time a value is filtered on and kept for the
+    life of the facet.
+    """
+
+    def __init__(self, name: str, values: List, labels: Dict):
+        self.name = name
+        self.values = sorted(set(values), key=lambda value: str(value))
+        self.labels = labels
+        self.codes_by_value = {value: code for code, value in enumerate(self.values)}
+        self.codes = np.fromiter(
+            (self.codes_by_value[value] for value in values), dtype=np.int32, count=len(values)
+        )
+        # Products having each value
+        self.totals = np.bincount(self.codes, minlength=len(self.values))
+        self._bitmaps: Dict[object, np.ndarray] = {}
+
+    def bitmap(self, value) -> Optional[np.ndarray]:
+        code = self.codes_by_value.get(value)
+        if code is None:
+            return None
+        bitmap = self._bitmaps.get(value)
+        if bitmap is None:
+            # Concurrent requests may both build a missing bitmap; the results are identical
+            bitmap = self._bitmaps[value] = self.codes == code
+        return bitmap
+
+    def mask(self, selected: Iterable) -> np.ndarray:
+        """Products having any of the selected values"""
+        mask = np.zeros(len(self.codes), dtype=bool)
+        for value in selected:
+            bitmap = self.bitmap(value)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def counts(self, mask: np.ndarray) -> np.ndarray:
+        return np.bincount(self.codes[mask], minlength=len(self.values))
+
+    def with_values(self, size: int, changed: Dict[int, object], labels: Dict) -> 'Facet':
+        """Copy resized to `size` products, those at the `changed` positions having the given values
+
+        Values gained or lost by the change are added to or dropped from the
+        value list; bitmaps of untouched values are shared while the catalog
+        does not grow.
+        """
+        facet = Facet.__new__(Facet)
+        facet.name = self.name
+        facet.labels = {**self.labels, **labels}
+
+        old_size = len(self.codes)
+        positions = np.fromiter(changed, dtype=np.int64, count=len(changed))
+        # Codes past the current values are given to values new to this facet
+        added_values = sorted(set(changed.values()) - self.codes_by_value.keys(), key=lambda value: str(value))
+        added_codes = {value: len(self.values) + i for i, value in enumerate(added_values)}
+        changed_codes = np.fromiter(
+            (self.codes_by_value.get(value, added_codes.get(value)) for value in changed.values()),
+            dtype=np.int32, count=len(changed)
+        )
+
+        codes = np.zeros(size, dtype=np.int32)
+        kept = min(size, old_size)
+        codes[:kept] = self.codes[:kept]
+        codes[positions] = changed_codes
+
+        totals = np.concatenate([self.totals, np.zeros(len(added_values), dtype=self.totals.dtype)])
+        leaving = np.concatenate([self.codes[positions[positions < old_size]], self.codes[size:]])
+        np.subtract.at(totals, leaving, 1)
+        np.add.at(totals, changed_codes, 1)
+
+        touched = set(changed.values())
+        touched.update(self.values[code] for code in leaving)
+        if added_values or not totals[leaving].all():
+            present = [value for value, total in zip(self.values + added_values, totals) if total > 0]
+            facet.values = sorted(present, key=lambda value: str(value))
+            facet.codes_by_value = {value: code for code, value in enumerate(facet.values)}
+            remap = np.fromiter(
+                (facet.codes_by_value.get(value, -1) for value in self.values + added_values),
+                dtype=np.int32, count=len(totals)
+            )
+            codes = remap[codes]
+            facet.totals = totals[np.argsort(remap)[len(totals) - len(facet.values):]]
+        else:
+            facet.values = self.values
+            facet.codes_by_value = self.codes_by_value
+            facet.totals = totals
+        facet.codes = codes
+
+        facet._bitmaps = {}
+        if size <= old_size:
+            facet._bitmaps = {
+                value: bitmap[:size] for value, bitmap in list(self._bitmaps.items()) if value not in touched
+            }
+        return facet
+
+
+class FacetIndex:
+    """Bitmap indexes over category, brand, availability and price tier of a snapshot
+
+    Within a facet the selected values are OR-ed, across facets they are AND-ed.
+    Counts for a facet ignore that facet's own selection (so the frontend can
+    offer the other values) but respect every other active filter.
+    """
+
+    VALUE_LIMIT = 30
+
+    # Facet -> the product's value in it
+    FIELDS = {
+        'category': lambda p: p.get('category_id') or 0,
+        'brand': lambda p: (p.get('brand') or '').lower(),
+        'availability': lambda p: p.get('availability_status', 'In Stock'),
+        'price_tier': lambda p: p.get('price_tier', ''),
+    }
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        products = snapshot.products
+        self.size = len(products)
+        self.facets = {}
+        for name, value_of in self.FIELDS.items():
+            values = [value_of(p) for p in products]
+            self.facets[name] = Facet(name, values, self._labels(name, values, products, snapshot))
+
+    def _labels(self, name: str, values: List, products, snapshot: CatalogSnapshot) -> Dict:
+        if name == 'category':
+            return {category_id: snapshot.category_name(category_id) for category_id in set(values)}
+        if name == 'brand':
+            return {brand: p.get('brand') for brand, p in zip(values, products)}
+        return {}
+
+    def with_changes(self, change: CatalogChange) -> 'FacetIndex':
+        """Facets for change.snapshot, reading only the products at change.positions"""
+        snapshot = change.snapshot
+        changed = [snapshot.products[i] for i in change.positions]
+        index = FacetIndex.__new__(FacetIndex)
+        index.size = len(snapshot)
+        index.facets = {}
+
+        for name, value_of in self.FIELDS.items():
+            values = [value_of(p) for p in changed]
+            labels = self._labels(name, values, changed, snapshot)
+            if name == 'category' and change.categories_changed:
+                # Renamed categories relabel products that did not change
+                labels = self._labels(name, self.facets[name].values + values, (), snapshot)
+            index.facets[name] = self.facets[name].with_values(
+                index.size, dict(zip(change.positions, values)), labels
+            )
+        return index
+
+    def normalize_filters(self, filters: Optional[Dict[str, Iterable]]) -> Dict[str, List]:
+        """Drop empty filters and coerce values to the stored representation"""
+        normalized = {}
+        for name, values in (filters or {}).items():
+            if name not in self.facets or not values:
+                continue
+            if name == 'category':
+                values = [int(value) for value in values if str(value).isdigit()]
+            elif name == 'brand':
+                values = [str(value).lower() for value in values]
+            normalized[name] = list(values)
+        return normalized
+
+    def mask(self, filters: Optional[Dict[str, Iterable]], exclude: Optional[str] = None) -> np.ndarray:
+        """AND of the selected facets, optionally leaving one facet out"""
+        mask = np.ones(self.size, dtype=bool)
+        for name, values in self.normalize_filters(filters).items():
+            if name != exclude:
+                mask &= self.facets[name].mask(values)
+        return mask
+
+    def counts(self, base_mask: np.ndarray, filters: Optional[Dict[str, Iterable]]) -> Dict[str, List[Dict]]:
+        """Per-value counts for every facet, restricted to base_mask (e.g. the query matches)"""
+        filters = self.normalize_filters(filters)
+        filtered = base_mask & self.mask(filters)
+        result = {}
+
+        for name, facet in self.facets.items():
+            mask = base_mask & self.mask(filters, exclude=name) if name in filters else filtered
+            counts = facet.counts(mask)
+            top = np.argsort(-counts, kind='stable')[:self.VALUE_LIMIT]
+            selected = set(filters.get(name, []))
+            result[name] = [
+                {
+                    'value': facet.values[code],
+                    'label': facet.labels.get(facet.values[code], facet.values[code]),
+                    'count': int(counts[code]),
+                    'selected': facet.values[code] in selected,
+                }
+                for code in top
+                if facet.values[code] != '' and (counts[code] > 0 or facet.values[code] in selected)
+            ]
+
+        return result
@@ -0,0 +1,159 @@
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every keyword the assistants and search react to, by intent. Keywords match at
+# the start of a word, inflected ("cheap" matches "cheapest", "compare" matches
+# "comparing") but not inside other words ("table" does not match "tablet").
+INTENT_KEYWORDS = {
+    # Catalog categories (ids in CATEGORY_INTENTS)
+    'beauty': ['makeup', 'beauty', 'cosmetic', 'mascara', 'lipstick', 'eyeshadow', 'powder'],
+    'fragrances': ['perfume', 'fragrance', 'scent', 'cologne', 'eau de'],
+    'furniture': ['furniture', 'bed', 'chair', 'table', 'sofa', 'desk'],
+
+    # Departments the fallback replies talk about
+    'electronics': ['electronic', 'electronics', 'phone', 'laptop', 'computer', 'tech', 'smartphone', 'tablet'],
+    'clothing': ['clothing', 'clothes', 'shirt', 'pants', 'dress', 'shoe', 'apparel', 'fashion'],
+    'home': ['home', 'furniture', 'kitchen', 'decor'],
+
+    # Shopping intents
+    'price': ['cheap', 'affordable', 'budget', 'expensive', 'price', 'cost', 'deal', 'discount',
+              'preço', 'barato', 'desconto', 'promoção'],
+    'budget': ['cheap', 'budget', 'barato'],
+    'premium': ['premium', 'luxury'],
+    'comparison': ['compare', 'vs', 'versus', 'difference', 'better', 'best'],
+    'top_rated': ['best', 'top', 'melhor', 'recomenda'],
+    'urgency': ['urgent', 'quickly', 'asap', 'immediately', 'now'],
+    'recommendation': ['recommend', 'suggest', 'what do you have', 'show me'],
+    'product_search': ['looking for', 'need', 'want', 'search', 'find'],
+    'browse_categories': ['categoria', 'tipo', 'seção'],
+    'greeting': ['hello', 'hi', 'hey', 'good morning', 'good afternoon'],
+}
+
+# Catalog category id of each category intent, in priority order
+CATEGORY_INTENTS = {
+    'beauty': 1,
+    'fragrances': 2,
+    'furniture': 3,
+}
+
+# Endings a keyword of MIN_STEM_LENGTH or more letters may take; keywords ending
+# in 'e' drop it before the endings starting with a vowel ("compar-ing")
+INFLECTION_SUFFIXES = ('', 's', 'es', 'ed', 'er', 'ers', 'est', 'ing', 'ings', 'ly', 'ation', 'ations',
+                       'ison', 'isons')
+MIN_STEM_LENGTH = 4
+# Three-letter keywords ("top", "bed") only take plural endings, shorter ones ("hi") none
+PLURAL_SUFFIXES = ('', 's', 'es')
+
+
+def keyword_suffixes(keyword: str) -> Tuple[str, ...]:
+    if len(keyword) >= MIN_STEM_LENGTH:
+        return INFLECTION_SUFFIXES
+    return PLURAL_SUFFIXES if len(keyword) == 3 else ('',)
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over every keyword of an intent registry
+
+    One linear pass over a message finds all keyword occurrences, however
+    many intents and keywords there are, instead of one substring scan per
+    keyword.
+    """
+
+    def __init__(self, registry: Dict[str, Iterable[str]]):
+        self.registry = {intent: list(keywords) for intent, keywords in registry.items()}
+
+        # keyword -> intents it signals (a keyword may belong to several)
+        keyword_intents: Dict[str, List[str]] = {}
+        for intent, keywords in self.registry.items():
+            for keyword in keywords:
+                keyword_intents.setdefault(keyword.lower(), []).append(intent)
+
+        # Patterns: each keyword, plus its stem without a final 'e' (which only
+        # matches when an ending follows)
+        patterns: List[Tuple[str, str, Tuple[str, ...]]] = []
+        for keyword, intents in keyword_intents.items():
+            patterns.append((keyword, keyword, tuple(intents)))
+            if keyword.endswith('e') and len(keyword) > MIN_STEM_LENGTH:
+                patterns.append((keyword[:-1], keyword, tuple(intents)))
+
+        # Trie of the patterns: goto transitions and the (pattern, keyword, intents) ending at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[Tuple[str, str, Tuple[str, ...]]]] = [[]]
+        for pattern, keyword, intents in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append((pattern, keyword, intents))
+
+        # Failure links, breadth first; each state also reports its suffix states' keywords
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+        logger.info(f"Intent matcher: {len(self.registry)} intents, {len(keyword_intents)} keywords, "
+                    f"{len(self._goto)} states")
+
+    def _occurrences(self, text: str) -> Iterable[Tuple[int, int, str, str, Tuple[str, ...]]]:
+        """(start, end, pattern, keyword, intents) of every pattern occurrence in lowercase text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, keyword, intents in output[state]:
+                yield position + 1 - len(pattern), position + 1, pattern, keyword, intents
+
+    @staticmethod
+    def _is_word(text: str, start: int, end: int, stem_only: bool, suffixes: Tuple[str, ...]) -> bool:
+        """Occurrence text[start:end] starts a word that ends after one of the suffixes"""
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        for suffix in suffixes:
+            if stem_only and (not suffix or suffix[0] not in 'aeiou'):
+                continue
+            if not text.startswith(suffix, end):
+                continue
+            after = end + len(suffix)
+            if after == len(text) or not text[after].isalnum():
+                return True
+        return False
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Every intent found in the text, with its matched keywords (in order of appearance)"""
+        text = (text or '').lower()
+        matches: Dict[str, List[str]] = {}
+        for start, end, pattern, keyword, intents in self._occurrences(text):
+            if not self._is_word(text, start, end, pattern != keyword, keyword_suffixes(keyword)):
+                continue
+            for intent in intents:
+                keywords = matches.setdefault(intent, [])
+                if keyword not in keywords:
+                    keywords.append(keyword)
+        return matches
+
+    def category(self, matches: Dict[str, List[str]]) -> Tuple[Optional[str], Optional[int]]:
+        """(intent, catalog category id) of the highest priority category in a match() result"""
+        for intent, category_id in CATEGORY_INTENTS.items():
+            if intent in matches:
+                return intent, category_id
+        return None, None
+
+
+# Global instance
+intent_matcher = IntentMatcher(INTENT_KEYWORDS)
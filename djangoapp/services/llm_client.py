@@ -0,0 +1,484 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from django.conf import settings
+
+from .llm_resilience import CircuitBreaker, LLMUnavailable, call_timeout, remaining
+from .result_cache import ResultCache
+from .sync_pool import run_sync
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+
+# Seconds a response stays cached, per call site (0 = never cached). Product
+# copy only changes with the product; conversational answers go stale quickly.
+CALL_SITE_TTLS = {
+    'product_description': 7 * 24 * 3600,
+    'marketing_content': 7 * 24 * 3600,
+    'product_faq': 7 * 24 * 3600,
+    'bundle_suggestions': 24 * 3600,
+    'sentiment_analysis': 24 * 3600,
+    'search_enhancement': 3600,
+    'shopping_list': 3600,
+    'shopping_assistant': 600,
+    'shopping_guidance': 600,
+    'voice_query': 600,
+    'chat_response': 600,
+    'assistant_response': 600,
+}
+DEFAULT_TTL = 600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt with whitespace runs collapsed, so indentation changes don't miss the cache"""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def cache_key(model: str, prompt: str, generation_config: Optional[Dict]) -> str:
+    """Content address of a request: model, generation config and normalized prompt"""
+    payload = json.dumps(
+        {'model': model, 'config': generation_config or {}, 'prompt': normalize_prompt(prompt)},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SQLiteResponseCache:
+    """On-disk response cache shared by every worker process on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS llm_responses ('
+            'key TEXT PRIMARY KEY, call_site TEXT, response TEXT, created_at REAL, expires_at REAL)'
+        )
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            'SELECT response FROM llm_responses WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, call_site: str, response: str, ttl: float):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)',
+            (key, call_site, response, now, now + ttl)
+        )
+        connection.commit()
+
+    def purge_expired(self) -> int:
+        connection = self._connection()
+        deleted = connection.execute('DELETE FROM llm_responses WHERE expires_at <= ?', (time.time(),)).rowcount
+        connection.commit()
+        return deleted
+
+
+class FlightAbandoned(Exception):
+    """The leading task of a flight was cancelled before the API answered"""
+
+
+class Flight:
+    """One in-progress API call that identical concurrent requests wait on
+
+    Waiters can be threads (wait()) or asyncio tasks (await result()) on any
+    event loop; all of them get the leader's response, or its exception
+    (FlightAbandoned if the leader was cancelled: waiters then retry).
+    """
+
+    def __init__(self):
+        self.followers = 0
+        self.response: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def finish(self, response: Optional[str] = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self.response, self.error = response, error
+            self._done.set()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # the waiting loop is closed
+
+    def _outcome(self) -> str:
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        if not self._done.wait(timeout):
+            raise LLMUnavailable("request deadline reached waiting for an identical call")
+        return self._outcome()
+
+    async def result(self, timeout: Optional[float] = None) -> str:
+        with self._lock:
+            future = None
+            if not self._done.is_set():
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                self._futures.append((loop, future))
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise LLMUnavailable("request deadline reached waiting for an identical call")
+        return self._outcome()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMClient:
+    """Shared Gemini client with a content-addressed response cache
+
+    Identical requests (same model, generation config and prompt, ignoring
+    whitespace) are answered from an in-memory LRU, then from the optional
+    SQLite tier shared across workers, before the API is called. How long a
+    response is reused depends on the call site (CALL_SITE_TTLS). Async views
+    use agenerate(), which shares the same cache.
+
+    Cache misses are single-flight: while a request is in progress, identical
+    requests from other threads or asyncio tasks wait for its response instead
+    of calling the API again (counted as `coalesced`).
+
+    Every API call gets a timeout (`timeout`, capped by the request deadline)
+    and goes through a circuit breaker. When the breaker is open or the
+    deadline is too close, LLMUnavailable is raised at once, so callers
+    answer with their local fallback instead of waiting on a degraded backend.
+    """
+
+    def __init__(self, api_key: str, memory_bytes: int = 16 * 1024 * 1024, disk_path: str = '',
+                 ttls: Optional[Dict[str, float]] = None, timeout: float = 10.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.ttls = {**CALL_SITE_TTLS, **(ttls or {})}
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.memory = ResultCache(max_bytes=memory_bytes, ttl=DEFAULT_TTL)
+        self.disk: Optional[SQLiteResponseCache] = None
+        if disk_path:
+            try:
+                self.disk = SQLiteResponseCache(disk_path)
+            except Exception as e:
+                logger.error(f"LLM disk cache unavailable ({disk_path}): {e}")
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._configured = False
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Flight] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _model(self, name: str) -> genai.GenerativeModel:
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=self.api_key)
+                self._configured = True
+            if name not in self._models:
+                self._models[name] = genai.GenerativeModel(name)
+            return self._models[name]
+
+    def _count(self, call_site: str, event: str, seconds: float = 0.0):
+        with self._lock:
+            stats = self.stats.setdefault(call_site, {
+                'memory_hits': 0, 'disk_hits': 0, 'coalesced': 0, 'misses': 0, 'errors': 0, 'rejected': 0,
+                'api_seconds': 0.0
+            })
+            stats[event] += 1
+            stats['api_seconds'] += seconds
+
+    def _memory_hit(self, key: str, call_site: str) -> Optional[str]:
+        text = self.memory.get(key)
+        if text is not None:
+            self._count(call_site, 'memory_hits')
+        return text
+
+    def _disk_hit(self, key: str, call_site: str, ttl: float) -> Optional[str]:
+        try:
+            text = self.disk.get(key)
+        except Exception as e:
+            logger.warning(f"LLM disk cache read failed: {e}")
+            return None
+        if text is not None:
+            self.memory.put(key, text, len(text), ttl)
+            self._count(call_site, 'disk_hits')
+        return text
+
+    def _disk_store(self, key: str, call_site: str, text: str, ttl: float):
+        try:
+            self.disk.put(key, call_site, text, ttl)
+        except Exception as e:
+            logger.warning(f"LLM disk cache write failed: {e}")
+
+    def _start_call(self, call_site: str, timeout: Optional[float]) -> float:
+        """Timeout of an API call about to be made; LLMUnavailable if it must not be made"""
+        try:
+            timeout = call_timeout(self.timeout if timeout is None else timeout)
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+        except LLMUnavailable:
+            self._count(call_site, 'rejected')
+            raise
+        return timeout
+
+    def _end_call(self, call_site: str, start: float, ok: bool):
+        seconds = time.perf_counter() - start
+        self.breaker.record(ok, seconds)
+        self._count(call_site, 'misses' if ok else 'errors', seconds)
+
+    def _join(self, key: str, call_site: str) -> Tuple[Flight, bool]:
+        """The in-progress call for key and whether the caller leads it (makes the call)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                return flight, True
+            flight.followers += 1
+        self._count(call_site, 'coalesced')
+        return flight, False
+
+    def _land(self, key: str, flight: Flight, response: Optional[str] = None,
+              error: Optional[BaseException] = None):
+        with self._lock:
+            del self._flights[key]
+        flight.finish(response, error)
+
+    def generate(self, prompt: str, call_site: str, generation_config: Optional[Dict] = None,
+                 model: str = DEFAULT_MODEL, ttl: Optional[float] = None, timeout: Optional[float] = None,
+                 refresh: bool = False) -> str:
+        """Response text for the prompt, from the cache when an identical request was answered recently
+
+        With `refresh` the model is always called and its response replaces
+        the cached one. API errors, timeouts and LLMUnavailable are raised to
+        the caller (and never cached).
+        """
+        ttl = self.ttls.get(call_site, DEFAULT_TTL) if ttl is None else ttl
+        key = cache_key(model, prompt, generation_config)
+
+        if ttl > 0 and not refresh:
+            text = self._memory_hit(key, call_site)
+            if text is None and self.disk is not None:
+                text = self._disk_hit(key, call_site, ttl)
+            if text is not None:
+                return text
+
+        while True:
+            flight, leader = self._join(key, call_site)
+            if leader:
+                break
+            try:
+                return flight.wait(remaining())
+            except FlightAbandoned:
+                continue
+
+        try:
+            # The previous flight may have landed between the cache lookup and _join()
+            text = self._memory_hit(key, call_site) if ttl > 0 and not refresh else None
+            if text is None:
+                call_seconds = self._start_call(call_site, timeout)
+                start = time.perf_counter()
+                try:
+                    response = self._model(model).generate_content(
+                        prompt, generation_config=generation_config, request_options={'timeout': call_seconds}
+                    )
+                    text = response.text
+                except Exception:
+                    self._end_call(call_site, start, ok=False)
+                    raise
+                self._end_call(call_site, start, ok=True)
+
+                if ttl > 0 and text:
+                    self.memory.put(key, text, len(text), ttl)
+                    if self.disk is not None:
+                        self._disk_store(key, call_site, text, ttl)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, response=text)
+        return text
+
+    async def agenerate(self, prompt: str, call_site: str, generation_config: Optional[Dict] = None,
+                        model: str = DEFAULT_MODEL, ttl: Optional[float] = None,
+                        timeout: Optional[float] = None) -> str:
+        """Async generate(): the API call is awaited and the SQLite tier runs on the sync pool,
+        so the event loop is never blocked"""
+        ttl = self.ttls.get(call_site, DEFAULT_TTL) if ttl is None else ttl
+        key = cache_key(model, prompt, generation_config)
+
+        if ttl > 0:
+            text = self._memory_hit(key, call_site)
+            if text is None and self.disk is not None:
+                text = await run_sync(self._disk_hit, key, call_site, ttl)
+            if text is not None:
+                return text
+
+        while True:
+            flight, leader = self._join(key, call_site)
+            if leader:
+                break
+            try:
+                return await flight.result(remaining())
+            except FlightAbandoned:
+                continue
+
+        try:
+            text = self._memory_hit(key, call_site) if ttl > 0 else None
+            if text is None:
+                call_seconds = self._start_call(call_site, timeout)
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(self._model(model).generate_content_async(
+                        prompt, generation_config=generation_config, request_options={'timeout': call_seconds}
+                    ), call_seconds)
+                    text = response.text
+                except asyncio.TimeoutError:
+                    self._end_call(call_site, start, ok=False)
+                    raise TimeoutError(f"Gemini call timed out after {call_seconds:.1f}s") from None
+                except asyncio.CancelledError:
+                    self.breaker.release()
+                    raise
+                except Exception:
+                    self._end_call(call_site, start, ok=False)
+                    raise
+                self._end_call(call_site, start, ok=True)
+
+                if ttl > 0 and text:
+                    self.memory.put(key, text, len(text), ttl)
+                    if self.disk is not None:
+                        await run_sync(self._disk_store, key, call_site, text, ttl)
+        except asyncio.CancelledError:
+            # The waiters' own requests are still live: one of them takes over
+            self._land(key, flight, error=FlightAbandoned())
+            raise
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, response=text)
+        return text
+
+    async def astream(self, prompt: str, call_site: str, generation_config: Optional[Dict] = None,
+                      model: str = DEFAULT_MODEL, ttl: Optional[float] = None,
+                      timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Response text in chunks as the model generates it (a cached response is one chunk)
+
+        The complete text is cached when the stream ends; a stream the caller
+        stops early is not. Streams are not coalesced: each reader gets its own.
+        """
+        ttl = self.ttls.get(call_site, DEFAULT_TTL) if ttl is None else ttl
+        key = cache_key(model, prompt, generation_config)
+
+        if ttl > 0:
+            text = self._memory_hit(key, call_site)
+            if text is None and self.disk is not None:
+                text = await run_sync(self._disk_hit, key, call_site, ttl)
+            if text is not None:
+                yield text
+                return
+
+        chunks = []
+        call_seconds = self._start_call(call_site, timeout)
+        start = time.perf_counter()
+        try:
+            # The timeout covers the whole stream: each chunk read gets what is left of it
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + call_seconds
+            response = await asyncio.wait_for(self._model(model).generate_content_async(
+                prompt, generation_config=generation_config, stream=True,
+                request_options={'timeout': call_seconds}
+            ), call_seconds)
+            chunk_iterator = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunk_iterator.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                chunks.append(chunk.text)
+                yield chunks[-1]
+        except GeneratorExit:
+            # The reader stopped early (closing the stream ends the generation)
+            self._end_call(call_site, start, ok=True)
+            raise
+        except asyncio.TimeoutError:
+            self._end_call(call_site, start, ok=False)
+            raise TimeoutError(f"Gemini stream timed out after {call_seconds:.1f}s") from None
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self._end_call(call_site, start, ok=False)
+            raise
+        self._end_call(call_site, start, ok=True)
+
+        text = ''.join(chunks)
+        if ttl > 0 and text:
+            self.memory.put(key, text, len(text), ttl)
+            if self.disk is not None:
+                await run_sync(self._disk_store, key, call_site, text, ttl)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            call_sites = {}
+            for call_site, stats in self.stats.items():
+                hits = stats['memory_hits'] + stats['disk_hits']
+                requests = hits + stats['coalesced'] + stats['misses'] + stats['errors'] + stats['rejected']
+                call_sites[call_site] = {
+                    **stats,
+                    'api_seconds': round(stats['api_seconds'], 3),
+                    'hit_rate': round(hits / requests, 4) if requests else 0.0,
+                    'coalesced_rate': round(stats['coalesced'] / requests, 4) if requests else 0.0,
+                    'ttl_seconds': self.ttls.get(call_site, DEFAULT_TTL),
+                }
+            in_flight = len(self._flights)
+            waiting = sum(flight.followers for flight in self._flights.values())
+        return {
+            'memory': self.memory.get_stats(),
+            'disk': self.disk.path if self.disk else None,
+            'breaker': self.breaker.get_stats(),
+            'timeout_seconds': self.timeout,
+            'in_flight': in_flight,
+            'waiting': waiting,
+            'call_sites': call_sites,
+        }
+
+
+# Global instance
+llm_client = LLMClient(
+    api_key=getattr(settings, 'GEMINI_API_KEY', ''),
+    memory_bytes=getattr(settings, 'LLM_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+    disk_path=getattr(settings, 'LLM_CACHE_PATH', ''),
+    ttls=getattr(settings, 'LLM_CACHE_TTLS', None),
+    timeout=getattr(settings, 'LLM_CALL_TIMEOUT', 10.0),
+    breaker=CircuitBreaker(
+        window=getattr(settings, 'LLM_BREAKER_WINDOW', 20),
+        min_calls=getattr(settings, 'LLM_BREAKER_MIN_CALLS', 5),
+        failure_rate=getattr(settings, 'LLM_BREAKER_FAILURE_RATE', 0.5),
+        slow_seconds=getattr(settings, 'LLM_BREAKER_SLOW_SECONDS', 8.0),
+        open_seconds=getattr(settings, 'LLM_BREAKER_OPEN_SECONDS', 30.0)
+    )
+)
@@ -0,0 +1,160 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Calls with less time than this left before the request deadline are not made
+MIN_CALL_SECONDS = 0.5
+
+# Monotonic time by which the current request must be answered (None = no deadline)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('llm_deadline', default=None)
+
+
+class LLMUnavailable(Exception):
+    """The model is not called: its circuit breaker is open or the request is out of time"""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Give everything run inside (threads via sync_to_async and tasks included) `seconds` to finish"""
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline (None without a deadline)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(timeout: float) -> float:
+    """Timeout for one model call: `timeout`, capped by what is left of the request deadline"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left < MIN_CALL_SECONDS:
+        raise LLMUnavailable(f"request deadline reached ({left:.2f}s left)")
+    return min(timeout, left)
+
+
+class CircuitBreaker:
+    """Stops calling a failing or slow backend for a while
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are known and the share of errors and slow calls (over `slow_seconds`)
+    reaches `failure_rate`, the breaker opens: calls are refused for
+    `open_seconds`. Then a single trial call is let through (half open); its
+    outcome closes the breaker or opens it again. A cancelled trial is
+    released at once; one that never reports back at all is replaced after
+    another `open_seconds`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_seconds: float = 8.0, open_seconds: float = 30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window)  # True = failed or slow
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'rejected': 0, 'failures': 0, 'slow_calls': 0}
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (a half-open breaker lets one trial call through)"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_started = None
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and (
+                self._trial_started is None or now - self._trial_started >= self.open_seconds
+            ):
+                self._trial_started = now
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, success: bool, seconds: float):
+        slow = seconds > self.slow_seconds
+        failed = not success or slow
+        with self._lock:
+            self.stats['failures'] += not success
+            self.stats['slow_calls'] += slow
+            if self.state == self.HALF_OPEN:
+                self._trial_started = None
+                if failed:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._open()
+
+    def release(self):
+        """Forget a call whose outcome is unknown (cancelled), freeing the half-open trial slot"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_started = None
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.stats['opened'] += 1
+        logger.warning(f"LLM circuit breaker opened for {self.open_seconds}s")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'state': self.state, 'recent_calls': len(self._outcomes),
+                    'recent_failures': sum(self._outcomes)}
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most `rate` acquisitions per second, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may be made (never blocks when rate is 0)"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
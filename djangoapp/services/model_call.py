@@ -0,0 +1,59 @@
+import logging
+from typing import Any, Callable, Optional
+
+from .llm_client import llm_client
+from .sync_pool import run_sync
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCall:
+    """One model-backed operation, run the same way by a sync method and its async twin
+
+    prompt() builds the prompt and result(response) what the caller gets
+    back. When the model fails, result() is given the `unavailable` response
+    instead, if there is one; any other failure (or a model failure without
+    `unavailable`) returns fallback(error). With `uses_db`, arun() runs prompt()
+    and result() on the sync pool, as they query the database.
+    """
+
+    def __init__(self, label: str, call_site: str, prompt: Callable[[], str],
+                 result: Callable[[str], Any], fallback: Callable[[Exception], Any],
+                 unavailable: Optional[str] = None, uses_db: bool = False):
+        self.label = label
+        self.call_site = call_site
+        self.prompt = prompt
+        self.result = result
+        self.fallback = fallback
+        self.unavailable = unavailable
+        self.uses_db = uses_db
+
+    def _model_failed(self, error: Exception) -> str:
+        if self.unavailable is None:
+            raise error
+        logger.error(f"Gemini API error: {error}")
+        return self.unavailable
+
+    def run(self) -> Any:
+        try:
+            prompt = self.prompt()
+            try:
+                response = llm_client.generate(prompt, call_site=self.call_site)
+            except Exception as e:
+                response = self._model_failed(e)
+            return self.result(response)
+        except Exception as e:
+            logger.error(f"{self.label} error: {e}")
+            return self.fallback(e)
+
+    async def arun(self) -> Any:
+        try:
+            prompt = await run_sync(self.prompt) if self.uses_db else self.prompt()
+            try:
+                response = await llm_client.agenerate(prompt, call_site=self.call_site)
+            except Exception as e:
+                response = self._model_failed(e)
+            return await run_sync(self.result, response) if self.uses_db else self.result(response)
+        except Exception as e:
+            logger.error(f"{self.label} error: {e}")
+            return self.fallback(e)
@@ -122,7 +122,8 @@ class SmartNotificationService:
                 ai_message = ai_service.chat_completion([
                     {'role': 'system', 'content': 'You are a friendly e-commerce assistant.'},
                     {'role': 'user', 'content': recovery_prompt}
-                ])
+                ], fallback=lambda e: f"You left {', '.join(items_list)} in your cart. "
+                                      f"Complete your purchase before they sell out!")
                 
                 return [{
                     'type': 'abandoned_cart',
@@ -170,7 +171,7 @@ class SmartNotificationService:
             ai_recommendation = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a personalized shopping assistant.'},
                 {'role': 'user', 'content': recommendation_prompt}
-            ])
+            ], fallback=lambda e: self._recommendation_fallback(recent_behaviors))
             
             return [{
                 'type': 'recommendation',
@@ -202,7 +203,7 @@ class SmartNotificationService:
             campaign = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a marketing campaign expert.'},
                 {'role': 'user', 'content': campaign_prompt}
-            ])
+            ], fallback=lambda e: self._campaign_fallback(target_segment, campaign_type))
             
             return {
                 'target_segment': target_segment,
@@ -213,7 +214,19 @@ class SmartNotificationService:
             
         except Exception as e:
             logger.error(f"Marketing campaign error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Marketing campaign unavailable'}
+    
+    def _recommendation_fallback(self, recent_behaviors) -> str:
+        """Recommendation message from the latest viewed product when the model is unavailable"""
+        product = next((b.product for b in recent_behaviors if b.product), None)
+        if product is None:
+            return "We picked some new products we think you'll like. Take a look!"
+        return f"Liked {product.name}? We picked some related products you might like. Take a look!"
+    
+    def _campaign_fallback(self, target_segment: str, campaign_type: str) -> str:
+        """Campaign outline from a template when the model is unavailable"""
+        return (f"{campaign_type.title()} campaign for {target_segment}: lead with the products this segment "
+                f"views most, offer a time-limited incentive, and track click-through and conversion rates.")
 
 # Global instance
 notification_service = SmartNotificationService()
\ No newline at end of file
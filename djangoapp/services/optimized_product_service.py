@@ -1,43 +1,61 @@
-import json
-import os
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from .catalog_columns import ColumnarCatalog
+from .catalog_store import catalog_store
+from .intent_matcher import intent_matcher
+from .product_record import ProductRecord
+from .ranking import top_k
+from .spelling import SpellingCorrector
 
 logger = logging.getLogger(__name__)
 
 class OptimizedProductService:
-    def __init__(self):
-        self.products_file = os.path.join(os.path.dirname(__file__), '../../database/data/products.json')
-        self.products = self.load_products()
-        
-    def load_products(self) -> List[Dict]:
-        """Load and index products from JSON"""
-        try:
-            with open(self.products_file, 'r', encoding='utf-8') as f:
-                products = json.load(f)
-            
-            # Index products for fast search
-            for product in products:
-                product['search_text'] = (
-                    f"{product['name']} {product['description']} "
-                    f"{product.get('brand', '')}".lower()
-                )
-            
-            logger.info(f"Loaded {len(products)} products from JSON")
-            return products
-        except Exception as e:
-            logger.error(f"Error loading products: {e}")
-            return []
+    @property
+    def products(self) -> Tuple[ProductRecord, ...]:
+        """Products from the shared catalog snapshot"""
+        return catalog_store.snapshot.products
+    
+    @property
+    def columns(self) -> ColumnarCatalog:
+        return catalog_store.snapshot.derive('columns', ColumnarCatalog)
+    
+    @property
+    def spelling(self) -> SpellingCorrector:
+        return catalog_store.snapshot.derive(
+            'spelling', lambda snapshot: SpellingCorrector.from_products(snapshot.products)
+        )
     
     def search(self, query: str, category_id: Optional[int] = None, limit: int = 10) -> List[Dict]:
         """Optimized search with relevance scoring"""
         if not query:
             return self.get_trending_products(limit)
         
-        query_lower = query.lower()
-        results = []
+        positions, scores = self._score_products(query.lower(), category_id)
+        
+        # Nothing matched: retry once with misspelled words corrected
+        if not positions:
+            corrected = self.spelling.correct_query(query)
+            if corrected:
+                positions, scores = self._score_products(corrected, category_id)
         
-        for product in self.products:
+        # Sort by relevance and rating; only the returned products become dicts
+        products = self.products
+        best = top_k(
+            range(len(positions)), limit,
+            key=lambda i: (scores[i], products[positions[i]].get('rating', 0)),
+            tie_breaker=lambda i: products[positions[i]]['id']
+        )
+        return [products[positions[i]].to_dict(relevance_score=scores[i]) for i in best]
+    
+    def _score_products(self, query_lower: str, category_id: Optional[int]) -> Tuple[List[int], List[int]]:
+        """Catalog positions of the products matching the query and their relevance scores"""
+        positions = []
+        scores = []
+        
+        for position, product in enumerate(self.products):
             # Category filter
             if category_id and product.get('category_id') != category_id:
                 continue
@@ -65,38 +83,27 @@ class OptimizedProductService:
                 score += 2
             
             if score > 0:
-                product_copy = product.copy()
-                product_copy['relevance_score'] = score
-                results.append(product_copy)
+                positions.append(position)
+                scores.append(score)
         
-        # Sort by relevance and rating
-        results.sort(key=lambda x: (x['relevance_score'], x.get('rating', 0)), reverse=True)
-        return results[:limit]
+        return positions, scores
     
     def get_by_category(self, category_id: int, limit: int = 10) -> List[Dict]:
         """Get products by category"""
-        return [p for p in self.products if p.get('category_id') == category_id][:limit]
+        columns = self.columns
+        positions = np.flatnonzero(columns.category_id == category_id)[:limit]
+        return [columns.products[i].to_dict() for i in positions]
     
     def get_trending_products(self, limit: int = 10) -> List[Dict]:
         """Get trending products (by rating)"""
-        sorted_products = sorted(
-            self.products, 
-            key=lambda x: x.get('rating', 0), 
-            reverse=True
-        )
-        return sorted_products[:limit]
+        return self.columns.top('rating', limit)
     
     def get_by_intent(self, user_query: str) -> List[Dict]:
         """Get products by user intent"""
-        query_lower = user_query.lower()
-        
-        # Category mapping by keywords
-        if any(word in query_lower for word in ['makeup', 'beauty', 'cosmetic', 'mascara', 'lipstick']):
-            return self.get_by_category(1, 5)  # Beauty
-        elif any(word in query_lower for word in ['perfume', 'fragrance', 'scent']):
-            return self.get_by_category(2, 5)  # Fragrances
-        elif any(word in query_lower for word in ['furniture', 'bed', 'chair', 'table']):
-            return self.get_by_category(3, 5)  # Furniture
+        # Category mapping by keywords (Beauty, Fragrances, Furniture)
+        _, category_id = intent_matcher.category(intent_matcher.match(user_query))
+        if category_id:
+            return self.get_by_category(category_id, 5)
         
         return self.search(user_query, limit=5)
 
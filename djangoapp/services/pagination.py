@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not issued for this listing"""
+
+
+def encode_cursor(sort_key: str, score: float, product_id: int) -> str:
+    """Opaque cursor pointing just past (score, product_id) in a listing ordered by sort_key"""
+    payload = json.dumps({'s': sort_key, 'v': score, 'id': product_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_key: str) -> Tuple[float, int]:
+    """Return the (score, product_id) a cursor points past"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        score, product_id = float(payload['v']), int(payload['id'])
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if payload.get('s') != sort_key:
+        raise InvalidCursor(f"Cursor was issued for a '{payload.get('s')}' listing, not '{sort_key}'")
+    return score, product_id
+
+
+def resume_index(negated_scores: np.ndarray, ids: np.ndarray, after: Tuple[float, int]) -> int:
+    """Index of the first entry after (score, id) in a listing ordered by (-score, id)
+
+    negated_scores and ids are aligned with the listing order, so negated_scores
+    is ascending and ids are ascending within each run of equal scores.
+    """
+    after_score, after_id = after
+
+    # Entries tied on the cursor score are ordered by id; skip those up to after_id
+    tied_start = int(np.searchsorted(negated_scores, -after_score, side='left'))
+    tied_end = int(np.searchsorted(negated_scores, -after_score, side='right'))
+    return tied_start + int(np.searchsorted(ids[tied_start:tied_end], after_id, side='right'))
+
+
+class RankedListing:
+    """Every match of one listing request in final order, ready to be paged
+
+    Holds catalog positions, ids and scores as arrays, so a page at any offset
+    or cursor is a slice and the entry stays small enough to cache.
+    """
+
+    __slots__ = ('sort_key', 'positions', 'ids', 'scores', 'total', 'facets', 'did_you_mean', '_negated')
+
+    def __init__(self, sort_key: str, positions: np.ndarray, ids: np.ndarray, scores: np.ndarray,
+                 facets: Dict, did_you_mean: Optional[str] = None):
+        self.sort_key = sort_key
+        self.positions = positions
+        self.ids = ids
+        self.scores = scores
+        self.total = len(positions)
+        self.facets = facets
+        self.did_you_mean = did_you_mean
+        self._negated = -scores
+
+    @classmethod
+    def from_scored(cls, sort_key: str, positions: Iterable[int], ids: Iterable[int],
+                    scores: Iterable[float], **extra) -> 'RankedListing':
+        """Order arbitrary (position, id, score) triples by score descending, id ascending"""
+        positions = np.asarray(list(positions), dtype=np.int64)
+        ids = np.asarray(list(ids), dtype=np.int64)
+        scores = np.asarray(list(scores), dtype=np.float64)
+        order = np.lexsort((ids, -scores))
+        return cls(sort_key, positions[order], ids[order], scores[order], **extra)
+
+    @property
+    def nbytes(self) -> int:
+        facet_bytes = len(json.dumps(self.facets, separators=(',', ':')))
+        return self.positions.nbytes + self.ids.nbytes + self.scores.nbytes * 2 + facet_bytes
+
+    def page(self, limit: int, offset: int = 0,
+             after: Optional[Tuple[float, int]] = None) -> Tuple[List[Tuple[int, float]], Optional[str]]:
+        """(position, score) pairs of one page and the cursor of the next page, if any"""
+        start = resume_index(self._negated, self.ids, after) if after is not None else offset
+        end = start + max(limit, 0)
+        page = [(int(position), float(score)) for position, score in
+                zip(self.positions[start:end], self.scores[start:end])]
+
+        next_cursor = None
+        if page and end < self.total:
+            next_cursor = encode_cursor(self.sort_key, float(self.scores[end - 1]), int(self.ids[end - 1]))
+        return page, next_cursor
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional
 from django.contrib.auth.models import User
+from django.db.models import Count
 from ..models import Product, UserBehavior, Category
 from .ai_service import ai_service
 import logging
@@ -28,22 +29,26 @@ class PersonalizationService:
             4. Content organization suggestions
             """
             
+            layout_type = self._determine_layout_preference(behaviors)
+            category_priorities = self._get_category_priorities(behaviors)
+            color_scheme = self._suggest_color_scheme(behaviors)
+            
             ui_recommendations = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a UI/UX personalization expert.'},
                 {'role': 'user', 'content': ui_prompt}
-            ])
+            ], fallback=lambda e: self._ui_fallback(layout_type, category_priorities, color_scheme))
             
             return {
-                'layout_type': self._determine_layout_preference(behaviors),
-                'category_priorities': self._get_category_priorities(behaviors),
-                'color_scheme': self._suggest_color_scheme(behaviors),
+                'layout_type': layout_type,
+                'category_priorities': category_priorities,
+                'color_scheme': color_scheme,
                 'ai_recommendations': ui_recommendations,
                 'status': 'success'
             }
             
         except Exception as e:
             logger.error(f"UI personalization error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'UI personalization unavailable'}
     
     def get_adaptive_product_layout(self, user_id: int, category_id: Optional[int] = None) -> Dict:
         """Get adaptive product layout based on user preferences"""
@@ -70,7 +75,7 @@ class PersonalizationService:
             
         except Exception as e:
             logger.error(f"Adaptive layout error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Adaptive layout unavailable'}
     
     def get_dynamic_navigation(self, user_id: int) -> Dict:
         """Generate dynamic navigation based on user behavior"""
@@ -93,21 +98,40 @@ class PersonalizationService:
             4. Smart filters to show
             """
             
+            priority_categories = [item['product__category__name'] for item in category_views[:5]]
+            quick_access_items = self._get_quick_access_items(behaviors)
+            
             nav_suggestions = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a navigation design expert.'},
                 {'role': 'user', 'content': nav_prompt}
-            ])
+            ], fallback=lambda e: self._navigation_fallback(priority_categories, quick_access_items))
             
             return {
-                'priority_categories': [item['product__category__name'] for item in category_views[:5]],
+                'priority_categories': priority_categories,
                 'navigation_suggestions': nav_suggestions,
-                'quick_access_items': self._get_quick_access_items(behaviors),
+                'quick_access_items': quick_access_items,
                 'status': 'success'
             }
             
         except Exception as e:
             logger.error(f"Dynamic navigation error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Dynamic navigation unavailable'}
+    
+    def _ui_fallback(self, layout_type: str, category_priorities: List[str], color_scheme: str) -> str:
+        """UI suggestions from the behavior heuristics when the model is unavailable"""
+        suggestion = f"Show products in a {layout_type} layout with the {color_scheme} color scheme."
+        if category_priorities:
+            suggestion += f" Lead with {', '.join(category_priorities)}."
+        return suggestion
+    
+    def _navigation_fallback(self, priority_categories: List[str], quick_access_items: List[str]) -> str:
+        """Navigation suggestions from the most viewed categories when the model is unavailable"""
+        categories = [name for name in priority_categories if name]
+        suggestion = (f"Put {', '.join(categories)} first in the menu." if categories
+                      else "Keep the default category order until more browsing history is available.")
+        if quick_access_items:
+            suggestion += f" Add shortcuts to {', '.join(quick_access_items)}."
+        return suggestion
     
     def _analyze_user_patterns(self, behaviors) -> str:
         """Analyze user behavior patterns"""
@@ -130,7 +154,6 @@ class PersonalizationService:
     def _get_category_priorities(self, behaviors) -> List[str]:
         """Get user's category priorities"""
         try:
-            from django.db.models import Count
             category_views = behaviors.filter(action='VIEW').values(
                 'product__category__name'
             ).annotate(view_count=Count('id')).order_by('-view_count')
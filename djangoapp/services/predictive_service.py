@@ -57,7 +57,7 @@ class PredictiveAnalyticsService:
             forecast = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a demand forecasting expert.'},
                 {'role': 'user', 'content': forecast_prompt}
-            ])
+            ], fallback=lambda e: self._forecast_fallback(historical_data))
             
             return {
                 'product_id': product_id,
@@ -69,7 +69,7 @@ class PredictiveAnalyticsService:
             
         except Exception as e:
             logger.error(f"Demand forecast error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Demand forecast unavailable'}
     
     def optimize_inventory(self, category_id: Optional[int] = None) -> Dict:
         """Suggest inventory optimization"""
@@ -114,7 +114,7 @@ class PredictiveAnalyticsService:
             recommendations = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are an inventory optimization expert.'},
                 {'role': 'user', 'content': optimization_prompt}
-            ])
+            ], fallback=lambda e: self._inventory_fallback(inventory_data))
             
             return {
                 'analyzed_products': len(inventory_data),
@@ -125,7 +125,7 @@ class PredictiveAnalyticsService:
             
         except Exception as e:
             logger.error(f"Inventory optimization error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Inventory optimization unavailable'}
     
     def analyze_price_trends(self, product_id: int) -> Dict:
         """Analyze price trends and suggest optimizations"""
@@ -148,7 +148,7 @@ class PredictiveAnalyticsService:
             analysis = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a pricing strategy expert.'},
                 {'role': 'user', 'content': price_analysis_prompt}
-            ])
+            ], fallback=lambda e: self._price_fallback(product))
             
             return {
                 'product_id': product_id,
@@ -157,9 +157,11 @@ class PredictiveAnalyticsService:
                 'status': 'success'
             }
             
+        except Product.DoesNotExist:
+            return {'status': 'error', 'message': 'Product not found'}
         except Exception as e:
             logger.error(f"Price analysis error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Price analysis unavailable'}
     
     def predict_customer_lifetime_value(self, user_id: int) -> Dict:
         """Predict customer lifetime value"""
@@ -190,7 +192,7 @@ class PredictiveAnalyticsService:
             clv_prediction = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a customer analytics expert.'},
                 {'role': 'user', 'content': clv_prompt}
-            ])
+            ], fallback=lambda e: self._clv_fallback(float(total_spent), order_count, behavior_count))
             
             return {
                 'user_id': user_id,
@@ -205,7 +207,51 @@ class PredictiveAnalyticsService:
             
         except Exception as e:
             logger.error(f"CLV prediction error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'CLV prediction unavailable'}
+    
+    def _forecast_fallback(self, historical_data: Dict) -> str:
+        """Forecast from the recent daily average when the model is unavailable"""
+        units = sum(day['daily_quantity'] or 0 for day in historical_data['orders'])
+        views = sum(day['daily_views'] for day in historical_data['views'])
+        daily = units / historical_data['period_days']
+        return (f"Expected daily demand: about {daily:.1f} units "
+                f"({daily * historical_data['forecast_days']:.0f} over the next {historical_data['forecast_days']} days), "
+                f"based on {units} units ordered and {views} views in the last {historical_data['period_days']} days.")
+    
+    def _inventory_fallback(self, inventory_data: List[Dict]) -> str:
+        """Restock and overstock lists from last month's sales when the model is unavailable"""
+        restock = [item['product_name'] for item in inventory_data
+                   if item['recent_sales'] and item['current_stock'] < item['recent_sales']]
+        overstock = [item['product_name'] for item in inventory_data
+                     if item['current_stock'] > 3 * item['recent_sales']]
+        lines = [
+            f"Restock: {', '.join(restock[:5])}." if restock else "No products need restocking.",
+            f"Overstocked: {', '.join(overstock[:5])}." if overstock else "No products are overstocked.",
+            "Keep about one month of sales in stock.",
+        ]
+        return ' '.join(lines)
+    
+    def _price_fallback(self, product: Product) -> str:
+        """Price position within the product's category when the model is unavailable"""
+        price = float(product.price)
+        average = Product.objects.filter(
+            category_id=product.category_id, is_active=True
+        ).aggregate(average=Avg('price'))['average']
+        if not average:
+            return f"{product.name} is priced at ${price:.2f}."
+        
+        average = float(average)
+        position = 'above' if price > average * 1.05 else 'below' if price < average * 0.95 else 'in line with'
+        return (f"{product.name} is priced at ${price:.2f}, {position} the category average of "
+                f"${average:.2f}.")
+    
+    def _clv_fallback(self, total_spent: float, order_count: int, behavior_count: int) -> str:
+        """Spending summary when the model is unavailable"""
+        if not order_count:
+            return f"No orders yet; {behavior_count} recorded interactions."
+        engagement = 'high' if behavior_count > 50 else 'medium' if behavior_count > 10 else 'low'
+        return (f"Average order value: ${total_spent / order_count:.2f} over {order_count} orders. "
+                f"Engagement level: {engagement} ({behavior_count} interactions).")
 
 # Global instance
 predictive_service = PredictiveAnalyticsService()
\ No newline at end of file
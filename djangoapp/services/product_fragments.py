@@ -0,0 +1,84 @@
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+from .catalog_store import CatalogChange, CatalogSnapshot
+from .product_record import ProductRecord
+
+
+def encode(value) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def listing_representation(product: ProductRecord, snapshot: CatalogSnapshot) -> Dict:
+    """A product as the storefront listing (GET /products) renders it"""
+    return {
+        'id': product['id'],
+        'title': product['name'],
+        'name': product['name'],
+        'description': product['description'],
+        'price': product['price'],
+        'discountPercentage': product.get('discount_percentage', 0),
+        'rating': product.get('rating', 0),
+        'stock': product.get('stock_quantity', 0),
+        'brand': product.get('brand', ''),
+        'category': snapshot.category_name(product.get('category_id')),
+        'thumbnail': product.get('image_url', ''),
+        'images': list(product.get('images', [])),
+        'availabilityStatus': product.get('availability_status', 'In Stock'),
+        'sku': product.get('sku', f'SKU-{product["id"]}'),
+        'popularityScore': product.get('popularity_score', 0),
+        'valueScore': product.get('value_score', 0)
+    }
+
+
+class ProductFragments:
+    """Pre-encoded JSON of each product's listing representation, per catalog snapshot
+
+    A fragment is encoded the first time its product is listed and reused by
+    every later response for the same snapshot; responses are assembled by
+    joining fragments instead of re-encoding product dicts.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        self._fragments: Dict[int, Tuple[ProductRecord, bytes]] = {}  # id -> (product, fragment)
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def get(self, product: ProductRecord, **extra) -> bytes:
+        """The product's listing JSON, with `extra` (e.g. scores) spliced in as additional keys"""
+        entry = self._fragments.get(product['id'])
+        if entry is None or entry[0] is not product:
+            # Concurrent requests may both encode a missing fragment; the results are identical
+            entry = (product, encode(listing_representation(product, self.snapshot)))
+            self._fragments[product['id']] = entry
+
+        fragment = entry[1]
+        return splice(fragment, **extra) if extra else fragment
+
+    def with_changes(self, change: CatalogChange) -> 'ProductFragments':
+        """Fragments for change.snapshot: those of changed products are dropped
+
+        Category renames change the embedded category names, so they start over.
+        """
+        fragments = ProductFragments(change.snapshot)
+        if not change.categories_changed:
+            fragments._fragments = dict(self._fragments)
+            for product in change.removed:
+                fragments._fragments.pop(product['id'], None)
+        return fragments
+
+
+def splice(fragment: bytes, **fields) -> bytes:
+    """Add keys to an encoded JSON object without decoding it"""
+    extra = b','.join(encode(key) + b':' + encode(value) for key, value in fields.items())
+    return fragment[:-1] + b',' + extra + b'}'
+
+
+def render_object(fragments: Dict[str, Iterable[bytes]], fields: Optional[Dict] = None) -> bytes:
+    """JSON object with pre-encoded arrays (name -> fragments) followed by ordinary fields"""
+    parts = [encode(name) + b':[' + b','.join(items) + b']' for name, items in fragments.items()]
+    if fields:
+        parts.append(encode(fields)[1:-1])
+    return b'{' + b','.join(parts) + b'}'
@@ -1,166 +1,76 @@
-import json
-import os
 import logging
+import threading
+import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from django.conf import settings
+
+from .catalog_columns import ColumnarCatalog
+from .catalog_store import CatalogSnapshot, catalog_store
+from .facet_index import FacetIndex
+from .pagination import RankedListing, decode_cursor
+from .product_fragments import ProductFragments
+from .product_record import ProductRecord
+from .query_analytics import query_analytics
+from .ranking import top_k_bounded
+from .relevance import TEXT_SCORE_WEIGHT, boost_bound, search_relevance
+from .result_cache import ResultCache
+from .search_index import InvertedIndex
+from .sharded_search import ShardedSearch
+from .spelling import SpellingCorrector
 
 logger = logging.getLogger(__name__)
 
 class ProductIntelligenceService:
     """Advanced product intelligence and recommendation service"""
     
+    TEXT_SCORE_WEIGHT = TEXT_SCORE_WEIGHT
+    
+    # Boundaries the preferred price range is widened to before scoring (see _bucket_preferences)
+    PRICE_BUCKETS = (0, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+    
     def __init__(self):
-        self.products_file = os.path.join(os.path.dirname(__file__), '../../database/data/products.json')
-        self.products = self._load_products()
-        self.product_index = self._build_search_index()
+        # Ranked listings keyed by catalog version, query, filters and preference bucket
+        self.result_cache = ResultCache(
+            max_bytes=getattr(settings, 'SEARCH_RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+            ttl=getattr(settings, 'SEARCH_RESULT_CACHE_TTL', 300)
+        )
         
-    def _load_products(self) -> List[Dict]:
-        """Load products with enhanced metadata"""
-        try:
-            with open(self.products_file, 'r', encoding='utf-8') as f:
-                products = json.load(f)
-            
-            # Enhance products with intelligence metadata
-            for product in products:
-                product['popularity_score'] = self._calculate_popularity(product)
-                product['value_score'] = self._calculate_value_score(product)
-                product['search_keywords'] = self._extract_keywords(product)
-                product['complementary_categories'] = self._get_complementary_categories(product)
-            
-            logger.info(f"Enhanced {len(products)} products with intelligence metadata")
-            return products
-            
-        except Exception as e:
-            logger.error(f"Failed to load products: {e}")
-            return []
-    
-    def _build_search_index(self) -> Dict:
-        """Build advanced search index"""
-        index = {
-            'by_category': {},
-            'by_brand': {},
-            'by_price_range': {'budget': [], 'mid': [], 'premium': []},
-            'by_keywords': {},
-            'trending': []
-        }
+        # Optional: score queries in a pool of shard processes (very large catalogs)
+        shards = getattr(settings, 'SEARCH_SHARDS', 0)
+        self.sharded_search = ShardedSearch(
+            shards, timeout=getattr(settings, 'SEARCH_SHARD_TIMEOUT', 0.5)
+        ) if shards > 1 else None
         
-        for product in self.products:
-            # Category index
-            cat_id = product.get('category_id')
-            if cat_id:
-                if cat_id not in index['by_category']:
-                    index['by_category'][cat_id] = []
-                index['by_category'][cat_id].append(product)
-            
-            # Brand index
-            brand = product.get('brand', '').lower()
-            if brand:
-                if brand not in index['by_brand']:
-                    index['by_brand'][brand] = []
-                index['by_brand'][brand].append(product)
-            
-            # Price range index
-            price = product.get('price', 0)
-            if price < 25:
-                index['by_price_range']['budget'].append(product)
-            elif price < 100:
-                index['by_price_range']['mid'].append(product)
-            else:
-                index['by_price_range']['premium'].append(product)
-            
-            # Keyword index
-            for keyword in product.get('search_keywords', []):
-                if keyword not in index['by_keywords']:
-                    index['by_keywords'][keyword] = []
-                index['by_keywords'][keyword].append(product)
-        
-        # Sort trending by popularity
-        index['trending'] = sorted(
-            self.products, 
-            key=lambda x: x.get('popularity_score', 0), 
-            reverse=True
-        )[:20]
-        
-        return index
+        # Background re-ranking of popular queries after catalog changes
+        self._warm_requested = threading.Event()
+        self._warm_lock = threading.Lock()
+        self._warmer: Optional[threading.Thread] = None
     
-    def _calculate_popularity(self, product: Dict) -> float:
-        """Calculate product popularity score"""
-        score = 0.0
-        
-        # Rating contribution (0-50 points)
-        rating = product.get('rating', 0)
-        score += rating * 10
-        
-        # Stock level contribution (0-20 points)
-        stock = product.get('stock_quantity', 0)
-        if stock > 50:
-            score += 20
-        elif stock > 10:
-            score += 15
-        elif stock > 0:
-            score += 10
-        
-        # Price attractiveness (0-15 points)
-        discount = product.get('discount_percentage', 0)
-        score += discount * 0.5
-        
-        # Brand recognition (0-15 points)
-        known_brands = ['chanel', 'dior', 'calvin klein', 'gucci', 'essence']
-        brand = product.get('brand', '').lower()
-        if any(kb in brand for kb in known_brands):
-            score += 15
-        
-        return round(score, 2)
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        """Current shared catalog snapshot"""
+        return catalog_store.snapshot
     
-    def _calculate_value_score(self, product: Dict) -> float:
-        """Calculate value-for-money score"""
-        rating = product.get('rating', 0)
-        price = product.get('price', 1)
-        discount = product.get('discount_percentage', 0)
-        
-        # Base value: rating per dollar
-        base_value = rating / price if price > 0 else 0
-        
-        # Discount bonus
-        discount_bonus = discount * 0.01
-        
-        return round((base_value + discount_bonus) * 100, 2)
+    @property
+    def products(self) -> Tuple[ProductRecord, ...]:
+        return self.snapshot.products
     
-    def _extract_keywords(self, product: Dict) -> List[str]:
-        """Extract searchable keywords from product"""
-        keywords = []
-        
-        # Name keywords
-        name_words = product.get('name', '').lower().split()
-        keywords.extend([word for word in name_words if len(word) > 2])
-        
-        # Brand
-        brand = product.get('brand', '').lower()
-        if brand:
-            keywords.append(brand)
-        
-        # Category-specific keywords
-        cat_id = product.get('category_id')
-        if cat_id == 1:  # Beauty
-            keywords.extend(['makeup', 'beauty', 'cosmetic'])
-        elif cat_id == 2:  # Fragrances
-            keywords.extend(['perfume', 'fragrance', 'scent'])
-        elif cat_id == 3:  # Furniture
-            keywords.extend(['furniture', 'home', 'decor'])
-        
-        return list(set(keywords))
+    @property
+    def text_index(self) -> InvertedIndex:
+        return self.snapshot.derive('inverted_index', lambda snapshot: InvertedIndex(snapshot.products))
     
-    def _get_complementary_categories(self, product: Dict) -> List[int]:
-        """Get categories that complement this product"""
-        cat_id = product.get('category_id')
-        
-        complements = {
-            1: [2],  # Beauty complements with Fragrances
-            2: [1],  # Fragrances complement with Beauty
-            3: []    # Furniture standalone
-        }
-        
-        return complements.get(cat_id, [])
+    @property
+    def columns(self) -> ColumnarCatalog:
+        return self.snapshot.derive('columns', ColumnarCatalog)
+    
+    @property
+    def facets(self) -> FacetIndex:
+        return self.snapshot.derive('facets', FacetIndex)
+    
+    @property
+    def spelling(self) -> SpellingCorrector:
+        return self.snapshot.derive('spelling', lambda snapshot: SpellingCorrector.from_products(snapshot.products))
     
     def intelligent_search(self, query: str, limit: int = 10, user_preferences: Optional[Dict] = None) -> List[Dict]:
         """Perform intelligent product search"""
@@ -169,84 +79,284 @@ class ProductIntelligenceService:
         if not query_lower:
             return self.get_trending_products(limit)
         
-        scored_products = []
+        snapshot = self.snapshot
+        sharded = self._search_shards(snapshot, query_lower, user_preferences, limit)
+        if sharded is not None:
+            return [product.to_dict(search_relevance=score) for product, score in sharded[0]]
+        
+        matches, _ = self._match_query_with_correction(snapshot, query_lower)
+        
+        # Boosts are bounded, so matches are scored in text score order and
+        # scoring stops once no remaining match can reach the top `limit`
+        boost_bound = self._boost_bound(snapshot, user_preferences)
+        best = top_k_bounded(
+            matches, limit,
+            score=lambda match: self._calculate_search_relevance(match[0], match[1], user_preferences),
+            upper_bound=lambda match: match[1] * self.TEXT_SCORE_WEIGHT + boost_bound,
+            tie_breaker=lambda match: match[0]['id']
+        )
         
-        for product in self.products:
-            score = self._calculate_search_relevance(product, query_lower, user_preferences)
-            
-            if score > 0:
-                product_copy = product.copy()
-                product_copy['search_relevance'] = score
-                scored_products.append(product_copy)
-        
-        # Sort by relevance and return top results
-        scored_products.sort(key=lambda x: x['search_relevance'], reverse=True)
-        return scored_products[:limit]
+        return [product.to_dict(search_relevance=score) for (product, _), score in best]
     
-    def _calculate_search_relevance(self, product: Dict, query: str, user_preferences: Optional[Dict]) -> float:
-        """Calculate search relevance score"""
-        score = 0.0
-        
-        # Exact name match (highest priority)
-        if query in product.get('name', '').lower():
-            score += 100
-        
-        # Brand match
-        if query in product.get('brand', '').lower():
-            score += 80
-        
-        # Keyword matches
-        keywords = product.get('search_keywords', [])
-        for keyword in keywords:
-            if query in keyword or keyword in query:
-                score += 60
-        
-        # Description match
-        if query in product.get('description', '').lower():
-            score += 40
-        
-        # Popularity boost
-        score += product.get('popularity_score', 0) * 0.5
-        
-        # User preference boost
-        if user_preferences:
-            if user_preferences.get('preferred_categories'):
-                if product.get('category_id') in user_preferences['preferred_categories']:
-                    score += 30
-            
-            if user_preferences.get('price_range'):
-                price = product.get('price', 0)
-                pref_range = user_preferences['price_range']
-                if pref_range['min'] <= price <= pref_range['max']:
-                    score += 20
+    def _match_query(self, snapshot: CatalogSnapshot, query: str) -> List[Tuple[Dict, float]]:
+        """Unordered (product, BM25 score) pairs for every product matching the query"""
+        text_index = snapshot.derive('inverted_index', lambda s: InvertedIndex(s.products))
         
-        return score
+        # Only products present in the posting lists of the query terms are visited
+        return text_index.search(query)
+    
+    def _match_query_with_correction(self, snapshot: CatalogSnapshot,
+                                     query: str) -> Tuple[List[Tuple[Dict, float]], Optional[str]]:
+        """Match the query; if nothing matches, retry once with misspelled words corrected
+        
+        Returns the matches and the corrected query actually used (None if the
+        original query matched).
+        """
+        matches = self._match_query(snapshot, query)
+        if matches:
+            return matches, None
+        
+        spelling = snapshot.derive('spelling', lambda s: SpellingCorrector.from_products(s.products))
+        corrected = spelling.correct_query(query)
+        if not corrected:
+            return matches, None
+        
+        return self._match_query(snapshot, corrected), corrected
+    
+    def _score_query_with_correction(self, snapshot: CatalogSnapshot, query: str,
+                                     user_preferences: Optional[Dict]) -> Tuple[List[Tuple[Dict, float]], Optional[str]]:
+        """Unordered (product, relevance) pairs for every match, and the corrected query if one was used"""
+        sharded = self._search_shards(snapshot, query, user_preferences)
+        if sharded is not None:
+            return sharded
+        
+        matches, corrected = self._match_query_with_correction(snapshot, query)
+        scored = [
+            (product, self._calculate_search_relevance(product, text_score, user_preferences))
+            for product, text_score in matches
+        ]
+        return scored, corrected
+    
+    def _search_shards(self, snapshot: CatalogSnapshot, query: str, user_preferences: Optional[Dict],
+                       limit: Optional[int] = None) -> Optional[Tuple[List[Tuple[Dict, float]], Optional[str]]]:
+        """(product, relevance) pairs from the shard processes and the corrected query, if any
+        
+        Best first when limited. Returns None when sharding is off or no shard
+        answered in time, and the caller searches in-process instead.
+        """
+        if self.sharded_search is None:
+            return None
+        
+        try:
+            # Ships the catalog to the shards once per snapshot lineage, then only changes
+            snapshot.derive('shards', self.sharded_search.load, self.sharded_search.apply_change)
+        except Exception as e:
+            logger.error(f"Sharded search unavailable: {e}")
+            return None
+        
+        corrected = None
+        results = self.sharded_search.search(query, user_preferences, limit)
+        if results == []:
+            spelling = snapshot.derive('spelling', lambda s: SpellingCorrector.from_products(s.products))
+            corrected = spelling.correct_query(query)
+            if corrected:
+                results = self.sharded_search.search(corrected, user_preferences, limit)
+        if results is None:
+            return None
+        
+        by_id = snapshot.by_id
+        return [(by_id[product_id], score) for product_id, score in results if product_id in by_id], corrected
+    
+    def list_products(self, query: Optional[str] = None, filters: Optional[Dict[str, List]] = None,
+                      limit: int = 20, offset: int = 0, user_preferences: Optional[Dict] = None,
+                      cursor: Optional[str] = None, encoded: bool = False) -> Dict:
+        """One listing page plus facet counts for any combination of search and facet filters
+        
+        filters maps facet names (category, brand, availability, price_tier) to the
+        accepted values. Without a query, products are ordered by popularity.
+        
+        Pages are addressed either by offset or by the opaque `next_cursor` of the
+        previous page. The full ranking of a request is cached (per catalog
+        version), so later pages are slices of it. Raises InvalidCursor for a
+        bad cursor.
+        
+        A query without matches is retried with spelling corrected; the corrected
+        query is returned as did_you_mean.
+        
+        With encoded=True the products are returned as pre-encoded JSON fragments
+        of their listing representation (see ProductFragments), relevance spliced
+        in as searchRelevance for queries.
+        """
+        snapshot = self.snapshot
+        query = (query or '').lower().strip()
+        sort_key = 'relevance' if query else 'popularity'
+        after = decode_cursor(cursor, sort_key) if cursor else None
+        preferences = self._bucket_preferences(user_preferences) if query else None
+        
+        # Entries of older catalog versions can never match again; drop them
+        self.result_cache.set_generation(snapshot.version)
+        cache_key = (
+            snapshot.version, query, self._filters_key(snapshot, filters),
+            self._preferences_key(preferences)
+        )
+        listing = self.result_cache.get(cache_key)
+        if listing is None:
+            listing = self._rank_listing(snapshot, query, sort_key, filters, preferences)
+            self.result_cache.put(cache_key, listing, listing.nbytes)
+        
+        page, next_cursor = listing.page(limit, offset, after)
+        
+        # Only the returned page is materialized, as dicts or as cached JSON fragments
+        products = []
+        fragments = snapshot.derive('fragments', ProductFragments) if encoded else None
+        for position, score in page:
+            product = snapshot.products[position]
+            if fragments is not None:
+                products.append(fragments.get(product, searchRelevance=score) if query else fragments.get(product))
+            else:
+                products.append(product.to_dict(search_relevance=score) if query else product.to_dict())
+        
+        return {
+            'products': products,
+            'total': listing.total,
+            'next_cursor': next_cursor,
+            'did_you_mean': listing.did_you_mean,
+            'facets': listing.facets,
+        }
+    
+    def warm_result_cache(self, snapshot: Optional[CatalogSnapshot] = None):
+        """Catalog listener: rank the currently popular queries into the cache for the new catalog
+        
+        A catalog change empties the result cache; the most searched queries
+        (minus those that return nothing) are re-ranked in a background thread
+        so their next request is a cache hit. A newer change restarts the pass.
+        """
+        if getattr(settings, 'SEARCH_CACHE_WARM_QUERIES', 50) <= 0:
+            return
+        
+        self._warm_requested.set()
+        with self._warm_lock:
+            if self._warmer is None:
+                self._warmer = threading.Thread(target=self._warm_loop, name='result-cache-warmer', daemon=True)
+                self._warmer.start()
+    
+    def _warm_loop(self):
+        while True:
+            self._warm_requested.wait()
+            self._warm_requested.clear()
+            try:
+                self._warm_popular_queries()
+            except Exception as e:
+                logger.error(f"Result cache warm-up failed: {e}")
+    
+    def _warm_popular_queries(self):
+        limit = getattr(settings, 'SEARCH_CACHE_WARM_QUERIES', 50)
+        zero_results = {entry['query'] for entry in query_analytics.top('zero_results', limit)}
+        queries = [entry['query'] for entry in query_analytics.top('queries', limit) if entry['query'] not in zero_results]
+        
+        for query in queries:
+            if self._warm_requested.is_set():
+                return
+            self.list_products(query=query)
+        
+        if queries:
+            logger.info(f"Result cache warmed with {len(queries)} popular queries for catalog v{self.snapshot.version}")
+    
+    def _rank_listing(self, snapshot: CatalogSnapshot, query: str, sort_key: str,
+                      filters: Optional[Dict[str, List]], user_preferences: Optional[Dict]) -> RankedListing:
+        """Every product of a listing request in final order, with its facet counts"""
+        facets = snapshot.derive('facets', FacetIndex)
+        filter_mask = facets.mask(filters)
+        
+        if query:
+            scored, did_you_mean = self._score_query_with_correction(snapshot, query, user_preferences)
+            
+            match_mask = np.zeros(len(snapshot), dtype=bool)
+            match_mask[[snapshot.positions[product['id']] for product, _ in scored]] = True
+            
+            matches = [
+                (snapshot.positions[product['id']], product['id'], score) for product, score in scored
+                if filter_mask[snapshot.positions[product['id']]]
+            ]
+            return RankedListing.from_scored(
+                sort_key,
+                [position for position, _, _ in matches],
+                [product_id for _, product_id, _ in matches],
+                [score for _, _, score in matches],
+                facets=facets.counts(match_mask, filters),
+                did_you_mean=did_you_mean
+            )
+        
+        columns = snapshot.derive('columns', ColumnarCatalog)
+        positions = columns.top_positions(sort_key, len(columns), filter_mask)
+        return RankedListing(
+            sort_key, positions, columns.ids[positions], columns.sort_values(sort_key)[positions],
+            facets=facets.counts(np.ones(len(snapshot), dtype=bool), filters)
+        )
+    
+    @staticmethod
+    def _filters_key(snapshot: CatalogSnapshot, filters: Optional[Dict[str, List]]) -> Tuple:
+        normalized = snapshot.derive('facets', FacetIndex).normalize_filters(filters)
+        return tuple(sorted(
+            (name, tuple(sorted(set(values), key=str))) for name, values in normalized.items()
+        ))
+    
+    def _bucket_preferences(self, user_preferences: Optional[Dict]) -> Optional[Dict]:
+        """Coarsen preferences so users with similar histories share cached results
+        
+        The preferred price range is widened to the enclosing PRICE_BUCKETS
+        boundaries; scoring uses the widened range, so a cached listing is exactly
+        what every user in the bucket would have got.
+        """
+        if not user_preferences:
+            return None
+        
+        bucketed = {}
+        if user_preferences.get('preferred_categories'):
+            bucketed['preferred_categories'] = sorted(set(user_preferences['preferred_categories']))
+        
+        price_range = user_preferences.get('price_range')
+        if price_range:
+            low = max((b for b in self.PRICE_BUCKETS if b <= price_range['min']), default=0)
+            high = min((b for b in self.PRICE_BUCKETS if b >= price_range['max']), default=price_range['max'])
+            bucketed['price_range'] = {'min': low, 'max': high}
+        
+        return bucketed or None
+    
+    @staticmethod
+    def _preferences_key(preferences: Optional[Dict]) -> Tuple:
+        if not preferences:
+            return ()
+        price_range = preferences.get('price_range') or {}
+        return (
+            tuple(preferences.get('preferred_categories', ())),
+            price_range.get('min'), price_range.get('max')
+        )
+    
+    def _boost_bound(self, snapshot: CatalogSnapshot, user_preferences: Optional[Dict]) -> float:
+        """Most _calculate_search_relevance() can add on top of the weighted text score"""
+        columns = snapshot.derive('columns', ColumnarCatalog)
+        return boost_bound(float(columns.popularity_score.max()) if len(columns) else 0.0, user_preferences)
+    
+    def _calculate_search_relevance(self, product: Dict, text_score: float, user_preferences: Optional[Dict]) -> float:
+        """Combine BM25 text relevance with popularity and user preference boosts"""
+        return search_relevance(product, text_score, user_preferences)
     
     def get_trending_products(self, limit: int = 10) -> List[Dict]:
         """Get trending products"""
-        return self.product_index['trending'][:limit]
+        return self.columns.top('popularity', limit)
     
     def get_products_by_category(self, category_id: int, limit: int = 10) -> List[Dict]:
         """Get products by category with intelligent sorting"""
-        products = self.product_index['by_category'].get(category_id, [])
+        columns = self.columns
         
         # Sort by popularity within category
-        sorted_products = sorted(
-            products, 
-            key=lambda x: x.get('popularity_score', 0), 
-            reverse=True
-        )
-        
-        return sorted_products[:limit]
+        return columns.top('popularity', limit, columns.mask(category_id=category_id))
     
     def get_complementary_products(self, product_id: int, limit: int = 5) -> List[Dict]:
         """Get products that complement the given product"""
         # Find the source product
-        source_product = None
-        for product in self.products:
-            if product['id'] == product_id:
-                source_product = product
-                break
+        source_product = self.snapshot.by_id.get(product_id)
         
         if not source_product:
             return []
@@ -273,19 +383,10 @@ class ProductIntelligenceService:
     
     def get_products_by_price_range(self, min_price: float, max_price: float, limit: int = 10) -> List[Dict]:
         """Get products within price range"""
-        filtered_products = [
-            product for product in self.products
-            if min_price <= product.get('price', 0) <= max_price
-        ]
+        columns = self.columns
         
         # Sort by value score
-        sorted_products = sorted(
-            filtered_products,
-            key=lambda x: x.get('value_score', 0),
-            reverse=True
-        )
-        
-        return sorted_products[:limit]
+        return columns.top('value', limit, columns.mask(min_price=min_price, max_price=max_price))
     
     def get_product_recommendations(self, user_behavior: List[Dict], limit: int = 10) -> List[Dict]:
         """Generate personalized recommendations based on user behavior"""
@@ -340,4 +441,5 @@ class ProductIntelligenceService:
         return unique_recommendations[:limit]
 
 # Global instance
-product_intelligence_service = ProductIntelligenceService()
\ No newline at end of file
+product_intelligence_service = ProductIntelligenceService()
+catalog_store.add_listener(product_intelligence_service.warm_result_cache)
@@ -0,0 +1,74 @@
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterator
+
+# Fields of an enriched catalog product (products.json plus enrich_product())
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'category_id', 'brand', 'sku',
+    'stock_quantity', 'rating', 'discount_percentage', 'image_url', 'images',
+    'is_active', 'availability_status', 'created_at', 'updated_at',
+    'price_tier', 'popularity_score', 'value_score', 'search_keywords', 'complementary_categories',
+)
+_FIELD_SET = frozenset(PRODUCT_FIELDS)
+
+# Low-cardinality strings repeated across the catalog share one object
+INTERNED_FIELDS = frozenset(('brand', 'availability_status', 'price_tier'))
+
+_MISSING = object()
+
+
+class ProductRecord(Mapping):
+    """Read-only, slotted catalog product
+
+    Behaves like the product dict it was built from (`product['name']`,
+    `product.get('brand', '')`, `{**product}`), at a fraction of the memory:
+    no per-product hash table, interned brand/status/tier strings and tuples
+    instead of lists. Search paths keep scores beside the records and call
+    to_dict() only for the products they actually return.
+    """
+
+    __slots__ = PRODUCT_FIELDS + ('_extra',)
+
+    def __init__(self, data: Dict):
+        for field in PRODUCT_FIELDS:
+            value = data.get(field, _MISSING)
+            if isinstance(value, str) and field in INTERNED_FIELDS:
+                value = sys.intern(value)
+            elif isinstance(value, list):
+                value = tuple(sys.intern(v) if isinstance(v, str) and field == 'search_keywords' else v
+                              for v in value)
+            setattr(self, field, value)
+
+        extra = {key: value for key, value in data.items() if key not in _FIELD_SET}
+        self._extra = extra or None
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in PRODUCT_FIELDS:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"<ProductRecord {self.id}: {self.name!r}>"
+
+    def to_dict(self, **extra) -> Dict:
+        """Plain, mutable dict of the product (lists restored), plus any extra keys"""
+        product = {key: list(value) if isinstance(value, tuple) else value for key, value in self.items()}
+        product.update(extra)
+        return product
+
+    # dict.copy() compatibility for code that annotates a product before returning it
+    copy = to_dict
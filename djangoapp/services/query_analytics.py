@@ -0,0 +1,136 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', (query or '').lower()).strip()
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: approximate counts of the most frequent items in fixed memory
+
+    At most `capacity` items are tracked. An untracked item replaces the
+    least counted one and inherits its count as possible overestimate
+    (`error`), so every item seen more than total/capacity times is kept and
+    its true count lies in [count - error, count].
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.total = 0
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+        self._heap: List[Tuple[int, str]] = []  # (count, item), may hold stale entries
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+    def add(self, item: str, count: int = 1):
+        self.total += count
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[item] = [count, 0]
+        else:
+            minimum, evicted = self._pop_minimum()
+            del self.counters[evicted]
+            counter = self.counters[item] = [minimum + count, minimum]
+
+        heapq.heappush(self._heap, (counter[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(counter[0], key) for key, counter in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_minimum(self) -> Tuple[int, str]:
+        """Least counted tracked item; heap entries with an outdated count are skipped"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+
+    def top(self, limit: int) -> List[Tuple[str, int, int]]:
+        """(item, count, error) of the `limit` most counted items"""
+        best = heapq.nlargest(limit, self.counters.items(), key=lambda item: (item[1][0], item[0]))
+        return [(item, count, error) for item, (count, error) in best]
+
+
+class QueryAnalytics:
+    """Popular and zero-result search queries over a sliding window, in bounded memory
+
+    Each time window (`window_seconds`) has one Space-Saving summary per
+    stream; the last `windows` windows are kept, so memory never exceeds
+    windows x streams x capacity counters however many distinct queries come in.
+    """
+
+    STREAMS = ('queries', 'zero_results')
+
+    def __init__(self, capacity: int = 1000, window_seconds: int = 300, windows: int = 12):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._windows: deque = deque(maxlen=windows)  # (window start, {stream: SpaceSaving})
+        self._lock = threading.Lock()
+
+    def _current(self, now: float) -> Dict[str, SpaceSaving]:
+        start = int(now // self.window_seconds) * self.window_seconds
+        if not self._windows or self._windows[-1][0] != start:
+            self._windows.append((start, {stream: SpaceSaving(self.capacity) for stream in self.STREAMS}))
+        return self._windows[-1][1]
+
+    def record(self, query: str, result_count: int):
+        """Count one search and whether it returned anything"""
+        query = normalize_query(query)
+        if not query:
+            return
+
+        with self._lock:
+            summaries = self._current(time.time())
+            summaries['queries'].add(query)
+            if not result_count:
+                summaries['zero_results'].add(query)
+
+    def top(self, stream: str = 'queries', limit: int = 20, windows: Optional[int] = None) -> List[Dict]:
+        """Most frequent queries of a stream over the last `windows` windows (all kept by default)"""
+        horizon = time.time() - (windows or self.windows) * self.window_seconds
+        merged: Dict[str, List[int]] = {}
+        with self._lock:
+            for start, summaries in self._windows:
+                if start + self.window_seconds <= horizon:
+                    continue
+                for query, (count, error) in summaries[stream].counters.items():
+                    totals = merged.setdefault(query, [0, 0])
+                    totals[0] += count
+                    totals[1] += error
+
+        best = heapq.nlargest(limit, merged.items(), key=lambda item: (item[1][0], item[0]))
+        return [{'query': query, 'count': count, 'error': error} for query, (count, error) in best]
+
+    def get_stats(self, limit: int = 20) -> Dict:
+        with self._lock:
+            searches = sum(summaries['queries'].total for _, summaries in self._windows)
+            zero_results = sum(summaries['zero_results'].total for _, summaries in self._windows)
+        return {
+            'searches': searches,
+            'zero_result_rate': round(zero_results / searches, 4) if searches else 0.0,
+            'window_seconds': self.window_seconds * self.windows,
+            'popular': self.top('queries', limit),
+            'zero_results': self.top('zero_results', limit),
+        }
+
+
+# Global instance
+query_analytics = QueryAnalytics(
+    capacity=getattr(settings, 'QUERY_ANALYTICS_CAPACITY', 1000),
+    window_seconds=getattr(settings, 'QUERY_ANALYTICS_WINDOW', 300),
+    windows=getattr(settings, 'QUERY_ANALYTICS_WINDOWS', 12)
+)
@@ -0,0 +1,88 @@
+import heapq
+from typing import Callable, Iterable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+
+def _negate(key):
+    return tuple(-part for part in key) if isinstance(key, tuple) else -key
+
+
+def top_k(items: Iterable[T], k: int, key: Callable[[T], object],
+          tie_breaker: Optional[Callable[[T], object]] = None) -> List[T]:
+    """The k items with the highest key, best first
+
+    Ties are broken by tie_breaker ascending (e.g. product id), otherwise by
+    input order, so equal scores always come back in the same order. Keys are
+    numbers or tuples of numbers. Uses a bounded heap: O(n log k), not a sort
+    of every candidate.
+    """
+    if k <= 0:
+        return []
+    if tie_breaker is None:
+        return heapq.nsmallest(k, items, key=lambda item: _negate(key(item)))
+    return heapq.nsmallest(k, items, key=lambda item: (_negate(key(item)), tie_breaker(item)))
+
+
+def top_k_bounded(items: Iterable[T], k: int, score: Callable[[T], float], upper_bound: Callable[[T], float],
+                  tie_breaker: Optional[Callable[[T], float]] = None) -> List[Tuple[T, float]]:
+    """The k (item, score) pairs with the highest score, stopping as early as possible
+
+    upper_bound(item) must be cheap and never below score(item). Candidates are
+    visited in descending bound order; once k items are kept and the next bound
+    is below the k-th best score, no remaining candidate can enter the top k, so
+    the rest are never scored. Ties are broken by tie_breaker ascending (a
+    number, e.g. product id), otherwise by input order.
+    """
+    if k <= 0:
+        return []
+
+    # Lazily ordered by bound: heapify is O(n), each visited candidate O(log n)
+    candidates = [
+        (-upper_bound(item), tie_breaker(item) if tie_breaker else sequence, sequence, item)
+        for sequence, item in enumerate(items)
+    ]
+    heapq.heapify(candidates)
+
+    # Min-heap of the best k so far; its root is the worst kept item
+    kept: List[Tuple[float, float, int, T]] = []
+    while candidates:
+        negated_bound, tie, sequence, item = candidates[0]
+        if len(kept) == k and -negated_bound < kept[0][0]:
+            break
+        heapq.heappop(candidates)
+
+        entry = (score(item), -tie, -sequence, item)
+        if len(kept) < k:
+            heapq.heappush(kept, entry)
+        elif entry[:3] > kept[0][:3]:
+            heapq.heapreplace(kept, entry)
+
+    kept.sort(key=lambda entry: entry[:3], reverse=True)
+    return [(item, item_score) for item_score, _, _, item in kept]
+
+
+def top_k_indices(scores: np.ndarray, k: int, tie_breaker: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the k highest scores, best first, ties broken by tie_breaker ascending
+
+    argpartition finds the k-th score in O(n); only the entries at or above it
+    are sorted. Entries tied with the k-th score are all kept for the final
+    ordering, so which tied entry makes the cut does not depend on the
+    partition. Without tie_breaker, ties are broken by index.
+    """
+    scores = np.asarray(scores)
+    if tie_breaker is None:
+        tie_breaker = np.arange(len(scores))
+    if k <= 0 or not len(scores):
+        return np.zeros(0, dtype=np.int64)
+
+    if k < len(scores):
+        kth = np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(-scores <= kth)
+    else:
+        candidates = np.arange(len(scores))
+
+    order = np.lexsort((tie_breaker[candidates], -scores[candidates]))
+    return candidates[order[:k]]
@@ -0,0 +1,44 @@
+from typing import Dict, Optional
+
+# BM25 scores are small (single digits per term); scale them so the popularity
+# and preference boosts keep the same relative weight they had before
+TEXT_SCORE_WEIGHT = 20.0
+
+POPULARITY_WEIGHT = 0.5
+PREFERRED_CATEGORY_BOOST = 30
+PREFERRED_PRICE_BOOST = 20
+
+
+def search_relevance(product: Dict, text_score: float, user_preferences: Optional[Dict]) -> float:
+    """Combine BM25 text relevance with popularity and user preference boosts"""
+    score = text_score * TEXT_SCORE_WEIGHT
+
+    # Popularity boost
+    score += product.get('popularity_score', 0) * POPULARITY_WEIGHT
+
+    # User preference boost
+    if user_preferences:
+        if user_preferences.get('preferred_categories'):
+            if product.get('category_id') in user_preferences['preferred_categories']:
+                score += PREFERRED_CATEGORY_BOOST
+
+        if user_preferences.get('price_range'):
+            price = product.get('price', 0)
+            pref_range = user_preferences['price_range']
+            if pref_range['min'] <= price <= pref_range['max']:
+                score += PREFERRED_PRICE_BOOST
+
+    return round(score, 2)
+
+
+def boost_bound(max_popularity: float, user_preferences: Optional[Dict]) -> float:
+    """Most search_relevance() can add on top of the weighted text score"""
+    bound = max_popularity * POPULARITY_WEIGHT
+    if user_preferences:
+        if user_preferences.get('preferred_categories'):
+            bound += PREFERRED_CATEGORY_BOOST
+        if user_preferences.get('price_range'):
+            bound += PREFERRED_PRICE_BOOST
+
+    # Relevance is rounded to 2 decimals, which may round it up
+    return bound + 0.01
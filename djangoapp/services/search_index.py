@@ -0,0 +1,168 @@
+import copy
+import math
+import re
+import logging
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .ranking import top_k
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """Tokenized inverted index with BM25 scoring over product fields"""
+
+    # Field weights: a term found in the name counts more than one in the description
+    FIELD_WEIGHTS = {
+        'name': 3.0,
+        'brand': 2.0,
+        'search_keywords': 2.0,
+        'description': 1.0,
+    }
+
+    def __init__(self, products: Iterable[Dict], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_lengths: Dict[int, float] = {}
+        self.documents: Dict[int, Dict] = {}
+        self.total_length = 0.0
+
+        for product in products:
+            self._add_document(product)
+
+        self.vocabulary = sorted(self.postings)
+        logger.info(f"Indexed {len(self.documents)} products, {len(self.vocabulary)} terms")
+
+    def _document_terms(self, product: Dict) -> Dict[str, float]:
+        """Weighted term frequencies for a product across all indexed fields"""
+        frequencies: Dict[str, float] = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            value = product.get(field) or ''
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            for token in tokenize(value):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        return frequencies
+
+    def _add_document(self, product: Dict, postings_for: Optional[Callable[[str], Dict[int, float]]] = None):
+        doc_id = product['id']
+        frequencies = self._document_terms(product)
+        length = sum(frequencies.values())
+
+        self.documents[doc_id] = product
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+        for term, frequency in frequencies.items():
+            postings = postings_for(term) if postings_for else self.postings.setdefault(term, {})
+            postings[doc_id] = frequency
+
+    def with_changes(self, change) -> 'InvertedIndex':
+        """Copy of the index with change.removed taken out and change.added indexed
+
+        Work is proportional to the changed products: only the posting lists of
+        their terms are copied, every other list is shared with this index,
+        which stays untouched for readers of the previous catalog snapshot.
+        """
+        index = copy.copy(self)
+        index.postings = dict(self.postings)
+        index.doc_lengths = dict(self.doc_lengths)
+        index.documents = dict(self.documents)
+        copied = set()
+
+        def postings_for(term: str) -> Dict[int, float]:
+            if term not in copied:
+                copied.add(term)
+                if term in index.postings:
+                    index.postings[term] = dict(index.postings[term])
+            return index.postings.setdefault(term, {})
+
+        for product in change.removed:
+            doc_id = product['id']
+            if index.documents.get(doc_id) is not product:
+                continue
+            for term in self._document_terms(product):
+                postings = postings_for(term)
+                postings.pop(doc_id, None)
+                if not postings:
+                    del index.postings[term]
+            index.total_length -= index.doc_lengths.pop(doc_id)
+            del index.documents[doc_id]
+
+        for product in change.added:
+            index._add_document(product, postings_for)
+
+        new_terms = [term for term in copied if term in index.postings and term not in self.postings]
+        dropped_terms = [term for term in copied if term not in index.postings and term in self.postings]
+        if new_terms or dropped_terms:
+            index.vocabulary = list(self.vocabulary)
+            for term in dropped_terms:
+                del index.vocabulary[bisect_left(index.vocabulary, term)]
+            for term in new_terms:
+                insort(index.vocabulary, term)
+
+        return index
+
+    @property
+    def average_length(self) -> float:
+        if not self.doc_lengths:
+            return 0.0
+        return self.total_length / len(self.doc_lengths)
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency (always positive)"""
+        doc_freq = len(self.postings.get(term, ()))
+        total_docs = len(self.documents)
+        return math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def expand_term(self, token: str, max_expansions: int = 10) -> List[Tuple[str, float]]:
+        """Resolve a query token to index terms, allowing prefix matches for partial words"""
+        terms = []
+        if token in self.postings:
+            terms.append((token, 1.0))
+
+        # Partial words ("mascar", "fragr") still reach the full term at reduced weight
+        if len(token) >= 3:
+            position = bisect_left(self.vocabulary, token)
+            while position < len(self.vocabulary) and len(terms) < max_expansions:
+                term = self.vocabulary[position]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, 0.5))
+                position += 1
+
+        return terms
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """Score only documents that appear in the posting lists of the query terms
+
+        With a limit, the best `limit` matches are returned best first;
+        without one, every match is returned unordered.
+        """
+        scores: Dict[int, float] = {}
+        average_length = self.average_length or 1.0
+
+        for token in set(tokenize(query)):
+            for term, term_weight in self.expand_term(token):
+                idf = self.idf(term) * term_weight
+                for doc_id, frequency in self.postings[term].items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    term_score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + term_score
+
+        results = [(self.documents[doc_id], score) for doc_id, score in scores.items()]
+        if limit:
+            return top_k(results, limit, key=lambda item: item[1], tie_breaker=lambda item: item[0]['id'])
+        return results
@@ -1,15 +1,13 @@
+import os
+import threading
 import requests
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from django.conf import settings
 import logging
 
-try:
-    import numpy as np
-    from sklearn.metrics.pairwise import cosine_similarity
-    HAS_ML_LIBS = True
-except ImportError:
-    HAS_ML_LIBS = False
+from .ranking import top_k
+from .vector_index import VectorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -21,71 +19,79 @@ class SemanticSearchService:
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
+        self.index_path = getattr(settings, 'SEMANTIC_INDEX_PATH', '')
+        self.nprobe = getattr(settings, 'SEMANTIC_INDEX_NPROBE', None)
+        self._vector_index: Optional[VectorIndex] = None
+        self._index_mtime = None
+        # Serializes index swaps (file reloads and added products); searches read
+        # whichever index is current without taking it
+        self._index_lock = threading.Lock()
     
-    def get_text_embedding(self, text: str) -> List[float]:
-        """Generate embeddings for text using DeepSeek API"""
+    @property
+    def vector_index(self) -> Optional[VectorIndex]:
+        """Precomputed product vectors, reloaded when the index file is rebuilt"""
         try:
-            payload = {
-                'model': 'deepseek-chat',
-                'messages': [
-                    {'role': 'system', 'content': 'Generate a semantic representation of this text for search purposes.'},
-                    {'role': 'user', 'content': f'Text: {text}'}
-                ],
-                'max_tokens': 100
-            }
-            
-            response = requests.post(
-                f'{self.base_url}/chat/completions',
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                # Simulate embedding generation (in production, use proper embedding API)
-                return [hash(text + str(i)) % 1000 / 1000.0 for i in range(384)]
-            return []
-            
-        except Exception as e:
-            logger.error(f"Embedding generation error: {str(e)}")
+            mtime = os.path.getmtime(self.index_path)
+        except (OSError, TypeError):
+            return None
+        
+        if mtime != self._index_mtime:
+            with self._index_lock:
+                if mtime != self._index_mtime:
+                    try:
+                        self._vector_index = VectorIndex.load(self.index_path)
+                        self._index_mtime = mtime
+                        logger.info(f"Loaded semantic index with {len(self._vector_index)} products")
+                    except Exception as e:
+                        logger.error(f"Failed to load semantic index: {str(e)}")
+                        return None
+        
+        return self._vector_index
+    
+    def get_text_embedding(self, text: str) -> List[float]:
+        """Generate embeddings for text with the local encoder of the vector index"""
+        index = self.vector_index
+        if index is None:
             return []
+        return index.encoder.encode([text])[0].tolist()
     
     def semantic_search(self, query: str, products: List[Dict]) -> List[Dict]:
         """Perform semantic search on products"""
         if not products:
             return []
         
-        # Generate query embedding
-        query_embedding = self.get_text_embedding(query)
-        if not query_embedding:
+        index = self.vector_index
+        if index is None:
             return self._fallback_search(query, products)
         
-        # Calculate similarities
-        scored_products = []
-        for product in products:
-            product_text = f"{product.get('name', '')} {product.get('description', '')} {product.get('category', '')}"
-            product_embedding = self.get_text_embedding(product_text)
-            
-            if product_embedding:
-                similarity = self._calculate_similarity(query_embedding, product_embedding)
-                scored_products.append({
-                    **product,
-                    'similarity_score': similarity
-                })
+        by_id = {product['id']: product for product in products}
+        missing = [product for product_id, product in by_id.items() if product_id not in index.positions]
+        if missing:
+            index = self._add_to_index(missing)
         
-        # Sort by similarity and return top results
-        return sorted(scored_products, key=lambda x: x.get('similarity_score', 0), reverse=True)[:20]
+        query_vector = index.encoder.encode([query])[0]
+        matches = index.search_vector(query_vector, 20, candidate_ids=by_id.keys(), nprobe=self.nprobe)
+        return [
+            {**by_id[product_id], 'similarity_score': round(score, 4)}
+            for product_id, score in matches
+        ]
     
-    def _calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
-        """Calculate cosine similarity between embeddings"""
-        if not HAS_ML_LIBS:
-            return 0.5  # Default similarity
-        try:
-            arr1 = np.array(embedding1).reshape(1, -1)
-            arr2 = np.array(embedding2).reshape(1, -1)
-            return cosine_similarity(arr1, arr2)[0][0]
-        except:
-            return 0.0
+    def _add_to_index(self, products: List[Dict]) -> VectorIndex:
+        """Embed products added since the last offline build; returns the index holding them
+        
+        The products go into a new index that replaces the current one, so
+        searches running on the current index never see it change. Each product
+        is encoded once; the index keeps its vector until the next build
+        replaces the index file.
+        """
+        with self._index_lock:
+            index = self._vector_index
+            products = [product for product in products if product['id'] not in index.positions]
+            if products:
+                index = index.with_products(products)
+                self._vector_index = index
+                logger.info(f"Added {len(products)} products to the semantic index")
+            return index
     
     def _fallback_search(self, query: str, products: List[Dict]) -> List[Dict]:
         """Fallback to basic text search"""
@@ -112,9 +118,10 @@ class SemanticSearchService:
                 score += 1
             
             if score > 0:
-                results.append({**product, 'similarity_score': score})
+                results.append((product, score))
         
-        return sorted(results, key=lambda x: x.get('similarity_score', 0), reverse=True)[:20]
+        best = top_k(results, 20, key=lambda result: result[1], tie_breaker=lambda result: result[0]['id'])
+        return [{**product, 'similarity_score': score} for product, score in best]
     
     def generate_search_suggestions(self, query: str) -> List[str]:
         """Generate intelligent search suggestions"""
@@ -0,0 +1,377 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from .ranking import top_k, top_k_bounded
+from .relevance import TEXT_SCORE_WEIGHT, boost_bound, search_relevance
+from .search_index import InvertedIndex
+
+# Workers are spawned: this module (and what it imports) must stay free of
+# Django models and of the catalog store, which loads the catalog on import
+logger = logging.getLogger(__name__)
+
+
+def _shard_worker(conn):
+    """Serve one catalog shard: ('load' | 'changes' | 'search' | 'stop', ...) messages from the web process"""
+    index = InvertedIndex(())
+    max_popularity = 0.0
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        kind = message[0]
+
+        if kind == 'stop':
+            return
+
+        if kind == 'load':
+            _, _, products = message
+            index = InvertedIndex(products)
+            max_popularity = max((p.get('popularity_score', 0) for p in products), default=0.0)
+            continue
+
+        if kind == 'changes':
+            _, _, upserts, deleted_ids = message
+            changed = set(deleted_ids) | {product['id'] for product in upserts}
+            removed = [index.documents[product_id] for product_id in changed if product_id in index.documents]
+            index = index.with_changes(SimpleNamespace(removed=removed, added=upserts))
+            max_popularity = max((p.get('popularity_score', 0) for p in index.documents.values()), default=0.0)
+            continue
+
+        # ('search', request_id, query, user_preferences, limit)
+        _, request_id, query, user_preferences, limit = message
+        try:
+            matches = index.search(query)
+            if limit:
+                bound = boost_bound(max_popularity, user_preferences)
+                best = top_k_bounded(
+                    matches, limit,
+                    score=lambda match: search_relevance(match[0], match[1], user_preferences),
+                    upper_bound=lambda match: match[1] * TEXT_SCORE_WEIGHT + bound,
+                    tie_breaker=lambda match: match[0]['id']
+                )
+                results = [(product['id'], score) for (product, _), score in best]
+            else:
+                results = [
+                    (product['id'], search_relevance(product, text_score, user_preferences))
+                    for product, text_score in matches
+                ]
+            conn.send((request_id, True, results))
+        except Exception as e:
+            conn.send((request_id, False, str(e)))
+
+
+class _PendingSearch:
+    """Replies to one fanned-out search, filled in by the shard reader threads"""
+
+    __slots__ = ('waiting', 'results', 'answered', 'done')
+
+    def __init__(self):
+        self.waiting: Dict[int, object] = {}  # shard -> connection the request was sent on
+        self.results: List[Tuple[int, float]] = []
+        self.answered = 0
+        self.done = threading.Event()
+
+    def settle(self, shard: int):
+        del self.waiting[shard]
+        if not self.waiting:
+            self.done.set()
+
+
+class ShardedSearch:
+    """Catalog search fanned out over a pool of worker processes, one index shard each
+
+    Products are partitioned by id across `processes` workers; each keeps a
+    BM25 index of its shard in memory (term statistics are per shard, as in
+    most sharded engines). A query is sent to every shard, each returns its own
+    top-k by relevance and the web process merges them. Shards that fail or do
+    not answer within `timeout` seconds are left out (partial results); when
+    no shard answers the caller falls back to the in-process index.
+
+    A worker that has exited is restarted by a supervisor thread, off the
+    query path. Until every shard is back, search() returns None straight
+    away so callers serve the query from the in-process index.
+
+    Concurrent searches are in flight together: one reader thread per shard
+    hands each reply to the search waiting for its request id, and the lock
+    is only held to send requests and update bookkeeping.
+
+    Shards follow the catalog asynchronously: edits are shipped as they are
+    applied, and callers map the returned ids through their own snapshot. While
+    a shard rebuilds after a reload it does not answer, so queries in that
+    window get partial results or fall back.
+    """
+
+    def __init__(self, processes: int, timeout: float = 0.5):
+        self.processes = processes
+        self.timeout = timeout
+        self.version = None
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: List[Optional[Tuple[multiprocessing.Process, object]]] = [None] * processes
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._pending: Dict[int, _PendingSearch] = {}
+        self._retired: List[Tuple[multiprocessing.Process, object]] = []  # workers for the supervisor to reap
+        self._restart_requested = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {'queries': 0, 'partial': 0, 'failed': 0, 'shard_timeouts': 0, 'shard_errors': 0, 'restarts': 0,
+                      'shards_down': 0}
+
+    def _shard_of(self, product_id: int) -> int:
+        return product_id % self.processes
+
+    def _partition(self, products) -> List[List[Dict]]:
+        shards = [[] for _ in range(self.processes)]
+        for product in products:
+            shards[self._shard_of(product['id'])].append(product.to_dict())
+        return shards
+
+    def _spawn(self, shard: int) -> Tuple[multiprocessing.Process, object]:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_shard_worker, args=(child_conn,), name=f'search-shard-{shard}', daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _install(self, shard: int, worker: Tuple[multiprocessing.Process, object], products: List[Dict]):
+        """Load a spawned worker with its shard and route its replies (lock held)"""
+        process, conn = worker
+        conn.send(('load', self.version, products))
+        self._workers[shard] = worker
+        threading.Thread(
+            target=self._read_replies, args=(shard, conn), name=f'search-shard-{shard}-reader', daemon=True
+        ).start()
+
+    def _start(self, shard: int, products: List[Dict]):
+        self._install(shard, self._spawn(shard), products)
+
+    def _stop(self, shard: int):
+        worker = self._workers[shard]
+        self._workers[shard] = None
+        if worker is not None:
+            self._reap(worker)
+
+    def _retire(self, shard: int):
+        """Hand a failed worker to the supervisor to reap and replace (lock held)"""
+        worker = self._workers[shard]
+        self._workers[shard] = None
+        if worker is not None:
+            self._retired.append(worker)
+        self._request_restart()
+
+    @staticmethod
+    def _reap(worker: Tuple[multiprocessing.Process, object]):
+        # The shard's reader thread closes the connection once the worker has exited
+        process, conn = worker
+        try:
+            conn.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+
+    def _read_replies(self, shard: int, conn):
+        """Hand every reply of one shard worker to the search waiting for it, until the worker exits"""
+        while True:
+            try:
+                request_id, ok, payload = conn.recv()
+            except (EOFError, OSError, ValueError):
+                break
+
+            with self._lock:
+                search = self._pending.get(request_id)
+                # A late answer to a timed out query is dropped
+                if search is None or search.waiting.get(shard) is not conn:
+                    continue
+                if ok:
+                    search.results.extend(payload)
+                    search.answered += 1
+                else:
+                    self.stats['shard_errors'] += 1
+                    logger.error(f"Search shard {shard} failed: {payload}")
+                search.settle(shard)
+
+        with self._lock:
+            for search in self._pending.values():
+                if search.waiting.get(shard) is conn:
+                    self.stats['shard_errors'] += 1
+                    search.settle(shard)
+        conn.close()
+
+    def load(self, snapshot) -> int:
+        """Ship every shard of `snapshot` to the workers (starting them if needed)
+
+        Used as the snapshot.derive() builder, so a catalog reload repartitions
+        the shards while warming, before the new snapshot goes live.
+        """
+        shards = self._partition(snapshot.products)
+        with self._lock:
+            self._snapshot = snapshot
+            self.version = snapshot.version
+            for shard, products in enumerate(shards):
+                worker = self._workers[shard]
+                if worker is None or not worker[0].is_alive():
+                    self._stop(shard)
+                    self._start(shard, products)
+                    continue
+                try:
+                    worker[1].send(('load', snapshot.version, products))
+                except (OSError, ValueError):
+                    self._stop(shard)
+                    self._start(shard, products)
+
+        logger.info(f"Sharded search: catalog v{snapshot.version} split over {self.processes} shard processes")
+        return snapshot.version
+
+    def apply_change(self, version: int, change) -> int:
+        """Send only the changed products to the shards that own them (snapshot.derive() updater)"""
+        upserts = [[] for _ in range(self.processes)]
+        deleted = [[] for _ in range(self.processes)]
+        for product in change.added:
+            upserts[self._shard_of(product['id'])].append(product.to_dict())
+        added_ids = {product['id'] for product in change.added}
+        for product in change.removed:
+            if product['id'] not in added_ids:
+                deleted[self._shard_of(product['id'])].append(product['id'])
+
+        with self._lock:
+            self._snapshot = change.snapshot
+            self.version = change.snapshot.version
+            for shard in range(self.processes):
+                worker = self._workers[shard]
+                if worker is None:
+                    continue
+                try:
+                    worker[1].send(('changes', self.version, upserts[shard], deleted[shard]))
+                except (OSError, ValueError):
+                    # Restarted with the full shard by the supervisor
+                    self._retire(shard)
+
+        return change.snapshot.version
+
+    def search(self, query: str, user_preferences: Optional[Dict] = None,
+               limit: Optional[int] = None) -> Optional[List[Tuple[int, float]]]:
+        """(product id, relevance) pairs, best first if limited, or None if no shard answered"""
+        search = _PendingSearch()
+        with self._lock:
+            self.stats['queries'] += 1
+            if any(worker is None or not worker[0].is_alive() for worker in self._workers):
+                self.stats['shards_down'] += 1
+                self._request_restart()
+                return None
+            request_id = next(self._request_ids)
+            self._pending[request_id] = search
+            for shard, worker in enumerate(self._workers):
+                if worker is None:
+                    continue
+                try:
+                    worker[1].send(('search', request_id, query, user_preferences, limit))
+                    search.waiting[shard] = worker[1]
+                except (OSError, ValueError):
+                    self.stats['shard_errors'] += 1
+                    self._retire(shard)
+            if not search.waiting:
+                search.done.set()
+
+        search.done.wait(self.timeout)
+
+        with self._lock:
+            del self._pending[request_id]
+            self.stats['shard_timeouts'] += len(search.waiting)
+            results, answered = search.results, search.answered
+            if answered < self.processes:
+                self.stats['partial' if answered else 'failed'] += 1
+
+        if answered < self.processes:
+            logger.warning(f"Sharded search for '{query}': {answered}/{self.processes} shards answered")
+        if not answered:
+            return None
+        if limit:
+            return top_k(results, limit, key=lambda result: result[1], tie_breaker=lambda result: result[0])
+        return results
+
+    def _request_restart(self):
+        """Wake the supervisor thread, starting it on first use (lock held)"""
+        if self._closed:
+            return
+        if self._supervisor is None:
+            self._supervisor = threading.Thread(target=self._supervise, name='search-shard-supervisor', daemon=True)
+            self._supervisor.start()
+        self._restart_requested.set()
+
+    def _supervise(self):
+        while True:
+            self._restart_requested.wait()
+            self._restart_requested.clear()
+            if self._closed:
+                return
+            try:
+                self._restart_dead()
+            except Exception as e:
+                logger.error(f"Restarting search shards failed: {e}")
+
+    def _restart_dead(self):
+        """Restart crashed or stopped workers with their shard of the current snapshot
+
+        Runs on the supervisor thread. Reaping, spawning and partitioning happen
+        without the lock, which is only taken to swap the workers in; if the
+        catalog changed meanwhile, the shards are partitioned again from the
+        new snapshot.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            dead = [shard for shard, worker in enumerate(self._workers) if worker is None or not worker[0].is_alive()]
+            for shard in dead:
+                if self._workers[shard] is not None:
+                    self._retired.append(self._workers[shard])
+                    self._workers[shard] = None
+            retired, self._retired = self._retired, []
+
+        for worker in retired:
+            self._reap(worker)
+        if not dead or snapshot is None:
+            return
+
+        spawned = {shard: self._spawn(shard) for shard in dead}
+        unused = []
+        while True:
+            shards = self._partition(snapshot.products)
+            with self._lock:
+                if self._snapshot is not snapshot:
+                    snapshot = self._snapshot
+                    continue
+                for shard, worker in spawned.items():
+                    # load() starts empty slots itself; a worker it started wins
+                    if self._workers[shard] is not None or self._closed:
+                        unused.append(worker)
+                        continue
+                    self._install(shard, worker, shards[shard])
+                    self.stats['restarts'] += 1
+                    logger.warning(f"Restarted search shard {shard}")
+                break
+
+        for worker in unused:
+            self._reap(worker)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            alive = sum(1 for worker in self._workers if worker is not None and worker[0].is_alive())
+            return {**self.stats, 'shards': self.processes, 'alive': alive, 'version': self.version,
+                    'timeout_seconds': self.timeout, 'in_flight': len(self._pending)}
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._restart_requested.set()
+            for shard in range(self.processes):
+                self._stop(shard)
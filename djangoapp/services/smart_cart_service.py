@@ -33,16 +33,17 @@ class SmartCartService:
             4. Alternative products with better value
             """
             
+            # Get smart bundles
+            bundles = self._suggest_smart_bundles(cart_items)
+            current_total = self._calculate_cart_total(cart_items)
+            
             optimization_suggestions = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a shopping optimization expert.'},
                 {'role': 'user', 'content': optimization_prompt}
-            ])
-            
-            # Get smart bundles
-            bundles = self._suggest_smart_bundles(cart_items)
+            ], fallback=lambda e: self._optimization_fallback(cart_items, current_total, bundles))
             
             return {
-                'current_total': self._calculate_cart_total(cart_items),
+                'current_total': current_total,
                 'optimization_suggestions': optimization_suggestions,
                 'smart_bundles': bundles,
                 'potential_savings': self._calculate_potential_savings(cart_items, bundles),
@@ -53,7 +54,7 @@ class SmartCartService:
             return {'status': 'error', 'message': 'Cart not found'}
         except Exception as e:
             logger.error(f"Cart optimization error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Cart optimization unavailable'}
     
     def suggest_smart_bundles(self, user_id: int) -> List[Dict]:
         """Suggest smart product bundles"""
@@ -120,13 +121,13 @@ class SmartCartService:
             4. Value proposition highlights
             """
             
+            # Calculate suggested incentives
+            incentives = self._calculate_recovery_incentives(cart_value)
+            
             recovery_strategy = ai_service.chat_completion([
                 {'role': 'system', 'content': 'You are a cart recovery specialist.'},
                 {'role': 'user', 'content': recovery_prompt}
-            ])
-            
-            # Calculate suggested incentives
-            incentives = self._calculate_recovery_incentives(cart_value)
+            ], fallback=lambda e: self._recovery_fallback(items_list, incentives))
             
             return {
                 'cart_value': cart_value,
@@ -139,7 +140,7 @@ class SmartCartService:
             
         except Exception as e:
             logger.error(f"Cart recovery error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Cart recovery unavailable'}
     
     def apply_dynamic_pricing(self, user_id: int, product_id: int) -> Dict:
         """Apply dynamic pricing based on user behavior"""
@@ -166,15 +167,15 @@ class SmartCartService:
             4. Time-sensitive offers
             """
             
-            pricing_strategy = ai_service.chat_completion([
-                {'role': 'system', 'content': 'You are a dynamic pricing expert.'},
-                {'role': 'user', 'content': pricing_prompt}
-            ])
-            
             # Calculate personalized price
             discount_factor = min(0.15, purchase_count * 0.02)  # Max 15% discount
             personalized_price = base_price * (1 - discount_factor)
             
+            pricing_strategy = ai_service.chat_completion([
+                {'role': 'system', 'content': 'You are a dynamic pricing expert.'},
+                {'role': 'user', 'content': pricing_prompt}
+            ], fallback=lambda e: self._pricing_fallback(purchase_count, discount_factor))
+            
             return {
                 'base_price': base_price,
                 'personalized_price': personalized_price,
@@ -186,7 +187,28 @@ class SmartCartService:
             
         except Exception as e:
             logger.error(f"Dynamic pricing error: {str(e)}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': 'error', 'message': 'Dynamic pricing unavailable'}
+    
+    def _optimization_fallback(self, cart_items, current_total: float, bundles: List[Dict]) -> str:
+        """Cart summary and best bundle when the model is unavailable"""
+        suggestion = f"Your cart holds {cart_items.count()} items totalling ${current_total:.2f}."
+        if bundles:
+            best = max(bundles, key=lambda bundle: bundle['savings'])
+            suggestion += f" {best['name']} saves ${best['savings']:.2f}."
+        return suggestion
+    
+    def _recovery_fallback(self, items_list: List[str], incentives: List[Dict]) -> str:
+        """Recovery message from the cart contents and incentives when the model is unavailable"""
+        message = f"Your {', '.join(items_list[:3])} {'is' if len(items_list) == 1 else 'are'} still waiting in your cart."
+        if incentives:
+            message += f" Complete your order today: {'; '.join(i['description'] for i in incentives)}."
+        return message
+    
+    def _pricing_fallback(self, purchase_count: int, discount_factor: float) -> str:
+        """Pricing summary from the loyalty discount when the model is unavailable"""
+        if not discount_factor:
+            return "No loyalty discount yet; offer a first-purchase incentive."
+        return f"Loyalty discount of {discount_factor * 100:.0f}% for {purchase_count} previous purchases."
     
     def _analyze_cart_contents(self, cart_items) -> str:
         """Analyze cart contents for optimization"""
@@ -0,0 +1,205 @@
+import copy
+import logging
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .search_index import InvertedIndex, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return min(previous[-1], max_distance + 1)
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SpellingCorrector:
+    """SymSpell-style typo correction over the catalog vocabulary
+
+    Every vocabulary word is stored under all strings obtained by deleting up to
+    max_distance characters from its first prefix_length characters. A query
+    token is corrected by generating its own (equally bounded) deletes and
+    verifying only the words they point to, so lookup cost depends on the token
+    length, not on the vocabulary size. Longer tokens with more typos than that
+    fall back to a character trigram index.
+    """
+
+    MIN_TOKEN_LENGTH = 4
+    # Trigrams shared by more words than this carry no signal and are skipped
+    MAX_TRIGRAM_POSTINGS = 500
+    MIN_TRIGRAM_SIMILARITY = 0.5
+
+    def __init__(self, frequencies: Dict[str, int], max_distance: int = 2, prefix_length: int = 7):
+        self.frequencies = frequencies
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.deletes: Dict[str, List[str]] = {}
+        self.trigram_index: Dict[str, List[str]] = {}
+
+        for word in frequencies:
+            if not self._indexed(word):
+                continue
+            for variant in self._deletes(word):
+                self.deletes.setdefault(variant, []).append(word)
+            for trigram in trigrams(word):
+                self.trigram_index.setdefault(trigram, []).append(word)
+
+        logger.info(f"Spelling index: {len(frequencies)} words, {len(self.deletes)} deletes")
+
+    @staticmethod
+    def product_words(product: Dict) -> Set[str]:
+        """Distinct words of a product's searchable fields"""
+        words = set()
+        for field in InvertedIndex.FIELD_WEIGHTS:
+            value = product.get(field) or ''
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            words.update(tokenize(value))
+        return words
+
+    @classmethod
+    def from_products(cls, products: Iterable[Dict], **options) -> 'SpellingCorrector':
+        """Vocabulary of every searchable field, weighted by how many products use a word"""
+        frequencies: Counter = Counter()
+        for product in products:
+            frequencies.update(cls.product_words(product))
+        return cls(dict(frequencies), **options)
+
+    def _indexed(self, word: str) -> bool:
+        return len(word) >= self.MIN_TOKEN_LENGTH and not word.isdigit()
+
+    def with_changes(self, change) -> 'SpellingCorrector':
+        """Copy with the words of change.removed uncounted and those of change.added counted
+
+        Only the delete and trigram lists of words entering or leaving the
+        vocabulary are copied; every other list is shared with this corrector.
+        """
+        corrector = copy.copy(self)
+        corrector.frequencies = frequencies = dict(self.frequencies)
+        touched = set()
+        for product in change.removed:
+            for word in self.product_words(product):
+                frequencies[word] = frequencies.get(word, 0) - 1
+                touched.add(word)
+        for product in change.added:
+            for word in self.product_words(product):
+                frequencies[word] = frequencies.get(word, 0) + 1
+                touched.add(word)
+
+        dropped, entered = [], []
+        for word in touched:
+            if frequencies[word] <= 0:
+                del frequencies[word]
+                if word in self.frequencies and self._indexed(word):
+                    dropped.append(word)
+            elif word not in self.frequencies and self._indexed(word):
+                entered.append(word)
+        if not dropped and not entered:
+            return corrector
+
+        corrector.deletes = dict(self.deletes)
+        corrector.trigram_index = dict(self.trigram_index)
+        for table, keys_of in ((corrector.deletes, self._deletes), (corrector.trigram_index, trigrams)):
+            for word in dropped:
+                for key in keys_of(word):
+                    words = [w for w in table[key] if w != word]
+                    if words:
+                        table[key] = words
+                    else:
+                        del table[key]
+            for word in entered:
+                for key in keys_of(word):
+                    table[key] = table.get(key, []) + [word]
+        return corrector
+
+    def _deletes(self, word: str) -> Set[str]:
+        prefix = word[:self.prefix_length]
+        variants = {prefix}
+        for distance in range(1, min(self.max_distance, len(prefix) - 1) + 1):
+            for removed in combinations(range(len(prefix)), distance):
+                variants.add(''.join(c for i, c in enumerate(prefix) if i not in removed))
+        return variants
+
+    def _max_distance_for(self, token: str) -> int:
+        # One typo in a short word already changes a large share of it
+        return 1 if len(token) <= 6 else self.max_distance
+
+    def _symspell_candidates(self, token: str, max_distance: int) -> List[Tuple[int, str]]:
+        candidates = set()
+        for variant in self._deletes(token):
+            candidates.update(self.deletes.get(variant, ()))
+
+        verified = []
+        for word in candidates:
+            distance = edit_distance(token, word, max_distance)
+            if distance <= max_distance:
+                verified.append((distance, word))
+        return verified
+
+    def _trigram_candidates(self, token: str) -> List[Tuple[int, str]]:
+        token_trigrams = trigrams(token)
+        shared: Counter = Counter()
+        for trigram in token_trigrams:
+            words = self.trigram_index.get(trigram, ())
+            if len(words) <= self.MAX_TRIGRAM_POSTINGS:
+                shared.update(words)
+
+        max_distance = max(self.max_distance, len(token) // 3)
+        verified = []
+        for word, count in shared.most_common(20):
+            similarity = 2 * count / (len(token_trigrams) + len(trigrams(word)))
+            if similarity < self.MIN_TRIGRAM_SIMILARITY:
+                break
+            distance = edit_distance(token, word, max_distance)
+            if distance <= max_distance:
+                verified.append((distance, word))
+        return verified
+
+    def correct(self, token: str) -> Optional[str]:
+        """Closest known word for a misspelled token, None if it is known or hopeless"""
+        if token in self.frequencies or len(token) < self.MIN_TOKEN_LENGTH or token.isdigit():
+            return None
+
+        candidates = self._symspell_candidates(token, self._max_distance_for(token))
+        if not candidates and len(token) > self.prefix_length:
+            candidates = self._trigram_candidates(token)
+        if not candidates:
+            return None
+
+        # Fewest edits first, then the word more products use
+        distance, word = min(candidates, key=lambda item: (item[0], -self.frequencies[item[1]], item[1]))
+        return word
+
+    def correct_query(self, query: str, min_length: Optional[int] = None) -> Optional[str]:
+        """Query with every correctable token replaced, or None when nothing changed"""
+        min_length = min_length or self.MIN_TOKEN_LENGTH
+        tokens = tokenize(query)
+        corrected = [
+            (self.correct(token) if len(token) >= min_length else None) or token
+            for token in tokens
+        ]
+        if corrected == tokens:
+            return None
+        return ' '.join(corrected)
@@ -0,0 +1,34 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _call(func, args, kwargs):
+    # Pool threads outlive requests: open and close database connections the
+    # way Django does around each sync request
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run blocking code (ORM queries, SQLite) from an async view on the bounded sync pool
+
+    Unlike sync_to_async's default single thread, independent requests run
+    concurrently, but never on more than ASYNC_SYNC_THREADS threads (and
+    database connections) at once.
+    """
+    return await sync_to_async(_call, thread_sensitive=False, executor=sync_executor)(func, args, kwargs)
+
+
+# Global instance
+sync_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_SYNC_THREADS', 16), thread_name_prefix='sync-pool'
+)
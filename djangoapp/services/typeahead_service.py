@@ -0,0 +1,281 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import UserBehavior
+from .catalog_store import CatalogSnapshot, catalog_store
+from .query_analytics import query_analytics
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = '\x00'
+
+
+def normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+class PrefixIndex:
+    """Immutable sorted-array prefix index with popularity-ranked completions
+
+    Every phrase is stored once per word start ("chanel coco noir", "coco noir",
+    "noir"), so typing any word of a product name finds it. A prefix lookup is
+    two binary searches; only the matching key range is ranked. Changes build a
+    new index (with_weights), so readers need no lock. Results for very short
+    prefixes are cached until a phrase is added or removed (weight changes
+    alone may leave them briefly stale).
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Tuple[str, float]]] = None,
+                 keys: Optional[List[str]] = None, cache: Optional[Dict] = None,
+                 cached_prefix_length: int = 2):
+        self.entries = entries or {}  # phrase key -> (display text, weight)
+        self.keys = keys or []
+        self.cached_prefix_length = cached_prefix_length
+        self._cache: Dict[Tuple[str, int], List[str]] = {} if cache is None else cache
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _suffix_keys(phrase: str) -> List[str]:
+        words = phrase.split(' ')
+        return [f"{' '.join(words[i:])}{SEPARATOR}{phrase}" for i in range(len(words))]
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, float]]) -> 'PrefixIndex':
+        """Index of (text, weight) pairs, sorting the keys once"""
+        entries: Dict[str, Tuple[str, float]] = {}
+        for text, weight in items:
+            phrase = normalize(text)
+            if not phrase:
+                continue
+            if phrase in entries:
+                entries[phrase] = (entries[phrase][0], entries[phrase][1] + weight)
+            else:
+                entries[phrase] = (text.strip(), weight)
+
+        keys = sorted(key for phrase in entries for key in cls._suffix_keys(phrase))
+        return cls(entries, keys)
+
+    def with_weights(self, changes: Iterable[Tuple[str, float]]) -> 'PrefixIndex':
+        """New index with (text, weight change) pairs applied
+
+        Phrases whose weight drops to zero are removed. The keys of added and
+        removed phrases are merged into a copy of the sorted keys in one pass,
+        rather than inserted one by one.
+        """
+        entries = dict(self.entries)
+        touched = set()
+        for text, change in changes:
+            phrase = normalize(text)
+            if not phrase:
+                continue
+            entry = entries.get(phrase)
+            weight = (entry[1] if entry else 0.0) + change
+            if weight <= 1e-9:
+                entries.pop(phrase, None)
+            else:
+                entries[phrase] = (entry[0] if entry else text.strip(), weight)
+            touched.add(phrase)
+
+        added = [phrase for phrase in touched if phrase in entries and phrase not in self.entries]
+        removed = [phrase for phrase in touched if phrase not in entries and phrase in self.entries]
+        if not added and not removed:
+            return PrefixIndex(entries, self.keys, self._cache, self.cached_prefix_length)
+
+        keys = list(self.keys)
+        for phrase in removed:
+            for key in self._suffix_keys(phrase):
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    del keys[position]
+        # Two sorted runs: the sort merges them in linear time
+        keys.extend(sorted(key for phrase in added for key in self._suffix_keys(phrase)))
+        keys.sort()
+        return PrefixIndex(entries, keys, None, self.cached_prefix_length)
+
+    def complete(self, prefix: str, limit: int = 5) -> List[str]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        cacheable = len(prefix) <= self.cached_prefix_length
+        if cacheable and (prefix, limit) in self._cache:
+            return self._cache[(prefix, limit)]
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff')
+        phrases = {key.split(SEPARATOR, 1)[1] for key in self.keys[start:end]}
+        best = heapq.nlargest(limit, phrases, key=lambda phrase: (self.entries[phrase][1], phrase))
+        completions = [self.entries[phrase][0] for phrase in best]
+
+        if cacheable:
+            self._cache[(prefix, limit)] = completions
+        return completions
+
+
+class TypeaheadService:
+    """Search-as-you-type completions from catalog terms and logged searches
+
+    Live searches are counted by query_analytics; its popular queries (minus
+    those that keep returning nothing) are synced in every QUERY_SYNC_INTERVAL
+    seconds, so the index holds a bounded number of query phrases.
+
+    `index` is immutable and read without locking. Updates (the first load of
+    logged searches included) build the next index off to the side under
+    `_update_lock` and swap it in; keystrokes meanwhile are answered from the
+    previous index instead of waiting.
+    """
+
+    BRAND_WEIGHT = 0.5
+    CATEGORY_WEIGHT = 0.2
+    QUERY_WEIGHT = 10.0
+    LOGGED_QUERY_LIMIT = 10000
+    POPULAR_QUERY_LIMIT = 500
+    QUERY_SYNC_INTERVAL = 30
+    # Above this share of changed products a full re-sort beats incremental merges
+    REBUILD_RATIO = 0.1
+
+    def __init__(self):
+        self.index = PrefixIndex()
+        self._update_lock = threading.Lock()
+        self._catalog_version = None
+        self._catalog_products: Dict[int, Dict] = {}
+        self._product_terms: Dict[int, List[Tuple[str, float]]] = {}
+        self._query_weights: Dict[str, float] = {}  # query phrase -> weight currently in the index
+        self._logged_weights: Dict[str, float] = {}
+        self._queries_loaded = False
+        self._queries_synced_at = None
+
+    def _terms_for(self, product: Dict, snapshot: CatalogSnapshot) -> List[Tuple[str, float]]:
+        popularity = product.get('popularity_score', 0) or 1.0
+        terms = [(product['name'], popularity)]
+        if product.get('brand'):
+            terms.append((product['brand'], popularity * self.BRAND_WEIGHT))
+        category = snapshot.categories.get(product.get('category_id'))
+        if category:
+            terms.append((category['name'], popularity * self.CATEGORY_WEIGHT))
+        return terms
+
+    def _sync_catalog(self, snapshot: CatalogSnapshot) -> Optional[List[Tuple[str, float]]]:
+        """Bring the product terms up to the catalog snapshot
+
+        Returns the (text, weight change) pairs of the products that were
+        added, removed or replaced since the last sync, or None when most of
+        the catalog changed and the index should be rebuilt from the terms.
+        """
+        if snapshot.version == self._catalog_version:
+            return []
+
+        removed = [
+            product_id for product_id, product in self._catalog_products.items()
+            if snapshot.by_id.get(product_id) is not product
+        ]
+        added = [
+            product for product in snapshot.products
+            if self._catalog_products.get(product['id']) is not product
+        ]
+        logger.info(f"Typeahead synced to catalog v{snapshot.version} "
+                    f"(+{len(added)}/-{len(removed)} products)")
+
+        rebuild = self._catalog_version is None or len(added) + len(removed) > len(snapshot) * self.REBUILD_RATIO
+        self._catalog_version = snapshot.version
+        if rebuild:
+            self._catalog_products = dict(snapshot.by_id)
+            self._product_terms = {p['id']: self._terms_for(p, snapshot) for p in snapshot.products}
+            return None
+
+        changes = []
+        for product_id in removed:
+            changes.extend((text, -weight) for text, weight in self._product_terms.pop(product_id, []))
+            del self._catalog_products[product_id]
+        for product in added:
+            terms = self._terms_for(product, snapshot)
+            changes.extend(terms)
+            self._product_terms[product['id']] = terms
+            self._catalog_products[product['id']] = product
+        return changes
+
+    def _load_logged_queries(self):
+        """Seed query completions from SEARCH actions recorded in UserBehavior"""
+        self._queries_loaded = True
+        try:
+            metadata = UserBehavior.objects.filter(action='SEARCH').order_by('-timestamp').values_list(
+                'metadata', flat=True
+            )[:self.LOGGED_QUERY_LIMIT]
+            counts = Counter(normalize(m.get('query', '')) for m in metadata if isinstance(m, dict))
+            counts.pop('', None)
+            self._logged_weights = {query: count * self.QUERY_WEIGHT for query, count in counts.items()}
+            self._queries_synced_at = None
+            logger.info(f"Typeahead loaded {len(counts)} logged search queries")
+        except Exception as e:
+            logger.warning(f"Could not load logged search queries: {e}")
+
+    def _sync_queries(self) -> List[Tuple[str, float]]:
+        """(text, weight change) pairs that make the query phrases match logged plus currently popular searches"""
+        now = time.monotonic()
+        if self._queries_synced_at is not None and now - self._queries_synced_at < self.QUERY_SYNC_INTERVAL:
+            return []
+        self._queries_synced_at = now
+
+        zero_results = {entry['query'] for entry in query_analytics.top('zero_results', self.POPULAR_QUERY_LIMIT)}
+        weights = dict(self._logged_weights)
+        for entry in query_analytics.top('queries', self.POPULAR_QUERY_LIMIT):
+            if entry['query'] not in zero_results:
+                weights[entry['query']] = weights.get(entry['query'], 0.0) + entry['count'] * self.QUERY_WEIGHT
+
+        changes = []
+        for query in set(self._query_weights) | set(weights):
+            change = weights.get(query, 0.0) - self._query_weights.get(query, 0.0)
+            if change:
+                changes.append((query, change))
+        self._query_weights = weights
+        return changes
+
+    def _is_stale(self) -> bool:
+        return (catalog_store.snapshot.version != self._catalog_version
+                or self._queries_synced_at is None
+                or time.monotonic() - self._queries_synced_at >= self.QUERY_SYNC_INTERVAL)
+
+    def _update(self):
+        """Build the next index from the catalog and search queries and swap it in"""
+        if not self._queries_loaded:
+            self._load_logged_queries()
+        changes = self._sync_queries()
+        catalog_changes = self._sync_catalog(catalog_store.snapshot)
+
+        if catalog_changes is None:
+            items = [term for terms in self._product_terms.values() for term in terms]
+            items.extend(self._query_weights.items())
+            self.index = PrefixIndex.build(items)
+        elif changes or catalog_changes:
+            self.index = self.index.with_weights(changes + catalog_changes)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """Top completions for a prefix, ranked by popularity"""
+        # Only one request updates a stale index; the others don't wait for it
+        if self._is_stale() and self._update_lock.acquire(blocking=False):
+            try:
+                self._update()
+            finally:
+                self._update_lock.release()
+        return self.index.complete(prefix, limit)
+
+    def refresh(self, snapshot: Optional[CatalogSnapshot] = None):
+        """Sync with the current catalog now rather than on the next keystroke"""
+        # Nothing to refresh before the first suggestion builds the index
+        if self._catalog_version is None:
+            return
+        with self._update_lock:
+            self._update()
+
+
+# Global instance
+typeahead_service = TypeaheadService()
+catalog_store.add_listener(typeahead_service.refresh)
@@ -0,0 +1,182 @@
+import logging
+import math
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann_index import ANN_BACKENDS, ExactIndex, build_ann_index
+from .search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def product_text(product: Dict) -> str:
+    """Text used to embed a product for semantic search"""
+    return " ".join([
+        product.get('name', ''),
+        product.get('description', ''),
+        product.get('category', ''),
+        product.get('brand', ''),
+    ])
+
+
+class HashingEncoder:
+    """Deterministic local text encoder: hashed TF-IDF features reduced with a truncated SVD
+
+    Words and character trigrams are hashed into a fixed number of buckets with
+    crc32 (stable across processes, unlike hash()). fit() learns IDF weights and
+    the SVD projection from a sample of documents; encode() needs no network or
+    model download and always maps the same text to the same vector.
+    """
+
+    TRIGRAM_WEIGHT = 0.5
+    STOP_WORDS = frozenset([
+        'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+        'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with', 'your',
+    ])
+
+    def __init__(self, n_features: int = 4096, dimensions: int = 128):
+        self.n_features = n_features
+        self.dimensions = dimensions
+        self.idf: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    def _features(self, text: str) -> Dict[int, float]:
+        features: Dict[int, float] = {}
+        for token in tokenize(text):
+            if token in self.STOP_WORDS:
+                continue
+            grams = [(token, 1.0)]
+            padded = f"#{token}#"
+            grams.extend((padded[i:i + 3], self.TRIGRAM_WEIGHT) for i in range(len(padded) - 2))
+            for gram, weight in grams:
+                digest = zlib.crc32(gram.encode('utf-8'))
+                bucket = digest % self.n_features
+                sign = -1.0 if digest & 0x80000000 else 1.0
+                features[bucket] = features.get(bucket, 0.0) + sign * weight
+        return features
+
+    def _hashed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, value in self._features(text).items():
+                # Sublinear term frequency, keeping the hash sign
+                if abs(value) > 1:
+                    value = math.copysign(1.0 + math.log(abs(value)), value)
+                matrix[row, bucket] = value
+        return matrix
+
+    def fit(self, texts: Sequence[str], sample_size: int = 20000, seed: int = 0) -> 'HashingEncoder':
+        """Learn IDF weights and the SVD projection from (a sample of) the corpus"""
+        if len(texts) > sample_size:
+            rng = np.random.default_rng(seed)
+            texts = [texts[i] for i in rng.choice(len(texts), sample_size, replace=False)]
+
+        matrix = self._hashed_matrix(texts)
+        doc_freq = np.count_nonzero(matrix, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        weighted = self._normalize(matrix * self.idf)
+        _, _, vt = np.linalg.svd(weighted, full_matrices=False)
+        self.components = vt[:min(self.dimensions, vt.shape[0])].astype(np.float32)
+        return self
+
+    def encode(self, texts: Sequence[str], batch_size: int = 1024) -> np.ndarray:
+        """Encode texts into L2-normalized dense vectors"""
+        if self.components is None:
+            raise ValueError("Encoder must be fitted before encoding")
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            weighted = self._normalize(self._hashed_matrix(texts[start:start + batch_size]) * self.idf)
+            batches.append(self._normalize(weighted @ self.components.T))
+
+        if not batches:
+            return np.zeros((0, self.components.shape[0]), dtype=np.float32)
+        return np.vstack(batches)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class VectorIndex:
+    """Product embeddings searchable through an ANN backend, plus the encoder that produced them"""
+
+    def __init__(self, encoder: HashingEncoder, ann: ExactIndex, positions: Optional[Dict[int, int]] = None):
+        self.encoder = encoder
+        self.ann = ann
+        if positions is None:
+            positions = {int(product_id): i for i, product_id in enumerate(ann.ids)}
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.ann)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.ann.ids
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self.ann.vectors
+
+    @classmethod
+    def build(cls, products: Sequence[Dict], n_features: int = 4096, dimensions: int = 128,
+              backend: str = 'exact', **ann_options) -> 'VectorIndex':
+        """Offline build step: fit the encoder on the catalog and embed every product"""
+        texts = [product_text(p) for p in products]
+        encoder = HashingEncoder(n_features, dimensions).fit(texts)
+        ids = [p['id'] for p in products]
+        return cls(encoder, build_ann_index(ids, encoder.encode(texts), backend, **ann_options))
+
+    def with_products(self, products: Sequence[Dict]) -> 'VectorIndex':
+        """New index that also holds the given products, embedded without refitting the encoder
+
+        This index is left unchanged, so it can keep serving searches meanwhile.
+        """
+        vectors = self.encoder.encode([product_text(p) for p in products])
+        ann, rows = self.ann.with_added([p['id'] for p in products], vectors)
+        positions = dict(self.positions)
+        for product, row in zip(products, rows):
+            positions[product['id']] = int(row)
+        return VectorIndex(self.encoder, ann, positions)
+
+    def save(self, path: str):
+        ann_state = {f'ann_{key}': value for key, value in self.ann.state().items()}
+        np.savez_compressed(
+            path,
+            idf=self.encoder.idf,
+            components=self.encoder.components,
+            n_features=np.int64(self.encoder.n_features),
+            backend=np.array(self.ann.name),
+            **ann_state,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'VectorIndex':
+        with np.load(path, allow_pickle=False) as data:
+            components = data['components']
+            encoder = HashingEncoder(int(data['n_features']), components.shape[0])
+            encoder.idf = data['idf']
+            encoder.components = components
+
+            ann_state = {key[4:]: data[key] for key in data.files if key.startswith('ann_')}
+            ann = ANN_BACKENDS[str(data['backend'])].from_state(ann_state)
+            return cls(encoder, ann)
+
+    def search(self, query: str, limit: int = 20, candidate_ids: Optional[Iterable[int]] = None,
+               **search_params) -> List[Tuple[int, float]]:
+        """Top-k products by cosine similarity to the query text"""
+        return self.search_vector(self.encoder.encode([query])[0], limit, candidate_ids, **search_params)
+
+    def search_vector(self, query_vector: np.ndarray, limit: int = 20,
+                      candidate_ids: Optional[Iterable[int]] = None, **search_params) -> List[Tuple[int, float]]:
+        """Top-k products by cosine similarity; search_params (e.g. nprobe) go to the ANN backend"""
+        allowed_ids = None
+        if candidate_ids is not None:
+            allowed_ids = np.fromiter(candidate_ids, dtype=np.int64)
+        return self.ann.search(query_vector, limit, allowed_ids, **search_params)
@@ -0,0 +1,67 @@
+import logging
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Product
+from .services.catalog_journal import catalog_journal, category_to_dict, product_to_dict
+from .services.catalog_store import catalog_store
+
+logger = logging.getLogger(__name__)
+
+
+def _publish(using: str, kind: str, object_id: int, **changes):
+    """Journal a catalog change and apply it here once the surrounding transaction commits
+
+    The journal entry commits with the edit, so other processes (server
+    workers, or this one when it is a management command) pick it up from
+    catalog_journal. Rolled back changes are never published; in autocommit
+    mode the change is applied right away.
+    """
+    entry_id = catalog_journal.record(kind, object_id, using)
+
+    def apply():
+        try:
+            catalog_store.apply_changes(**changes)
+            catalog_journal.mark_applied(entry_id)
+        except Exception as e:
+            logger.error(f"Failed to apply catalog change {list(changes)}: {e}")
+
+    transaction.on_commit(apply, using=using)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    if instance.is_active:
+        _publish(using, 'product', instance.pk, upserts=[product_to_dict(instance)])
+    else:
+        _publish(using, 'product', instance.pk, deleted_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, using='default', **kwargs):
+    _publish(using, 'product', instance.pk, deleted_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, raw=False, using='default', **kwargs):
+    if not raw:
+        _publish(using, 'category', instance.pk, categories=[category_to_dict(instance)])
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, using='default', **kwargs):
+    _publish(using, 'category', instance.pk, deleted_category_ids=[instance.pk])
+
+
+@receiver(request_started, dispatch_uid='catalog_store_start_watching')
+def start_catalog_watcher(sender, **kwargs):
+    # Only processes that serve requests watch the catalog files and journal:
+    # not management commands, nor the runserver autoreloader parent
+    request_started.disconnect(dispatch_uid='catalog_store_start_watching')
+    catalog_store.start_watching(getattr(settings, 'CATALOG_RELOAD_INTERVAL', 0))
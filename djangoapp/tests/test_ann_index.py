@@ -0,0 +1,48 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from djangoapp.services.ann_index import ExactIndex, IVFFlatIndex, build_ann_index
+
+
+def unit_vectors(count, dimensions=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class WithAddedTests(SimpleTestCase):
+    def _check(self, index):
+        added = unit_vectors(3, seed=1)
+        ids, vectors = index.ids.copy(), index.vectors.copy()
+
+        grown, rows = index.with_added([101, 102, 103], added)
+
+        # The original keeps serving exactly what it had
+        self.assertEqual(len(index), 50)
+        np.testing.assert_array_equal(index.ids, ids)
+        np.testing.assert_array_equal(index.vectors, vectors)
+        self.assertNotIn(101, [product_id for product_id, _ in index.search(added[0], 50)])
+
+        self.assertEqual(len(grown), 53)
+        self.assertEqual(list(grown.ids[rows]), [101, 102, 103])
+        self.assertEqual(grown.search(added[0], 1)[0][0], 101)
+
+    def test_exact(self):
+        self._check(build_ann_index(range(50), unit_vectors(50)))
+
+    def test_ivf(self):
+        index = build_ann_index(range(50), unit_vectors(50), 'ivf', n_lists=4, nprobe=4)
+        assignments = index.assignments().copy()
+        self._check(index)
+        np.testing.assert_array_equal(index.assignments(), assignments)
+
+    def test_search_leaves_ivf_lists_unchanged(self):
+        index = build_ann_index(range(50), unit_vectors(50), 'ivf', n_lists=4, nprobe=2)
+        lists = list(index._list_rows)
+        index.search(unit_vectors(1, seed=2)[0], 5)
+        self.assertTrue(all(a is b for a, b in zip(lists, index._list_rows)))
+
+    def test_state_round_trip(self):
+        index, _ = build_ann_index(range(50), unit_vectors(50), 'ivf', n_lists=4).with_added([107], unit_vectors(1))
+        restored = IVFFlatIndex.from_state(index.state())
+        np.testing.assert_array_equal(restored.assignments(), index.assignments())
+        self.assertIsInstance(ExactIndex.from_state(index.state()), ExactIndex)
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from djangoapp.models import CatalogChangeLog, Category, Product
+from djangoapp.services.catalog_journal import CatalogJournal
+from djangoapp.services.catalog_store import CatalogStore
+
+
+class CatalogJournalTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        products_file = os.path.join(directory.name, 'products.json')
+        categories_file = os.path.join(directory.name, 'categories.json')
+        with open(products_file, 'w') as f:
+            json.dump([{'id': 100, 'name': 'File Sofa', 'description': '', 'price': 100, 'category_id': 1}], f)
+        with open(categories_file, 'w') as f:
+            json.dump([{'id': 1, 'name': 'Furniture'}], f)
+
+        self.store = CatalogStore(products_file, categories_file)
+        self.journal = CatalogJournal()
+        for target in ('djangoapp.services.catalog_journal.catalog_store', 'djangoapp.signals.catalog_store'):
+            patcher = mock.patch(target, self.store)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('djangoapp.signals.catalog_journal', self.journal)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Furniture')
+            self.product = Product.objects.create(
+                name='Oak Chair', description='Solid oak', price=80, category=self.category
+            )
+
+    def test_save_applies_here_and_is_journaled(self):
+        self.assertEqual(self.store.snapshot.by_id[self.product.pk]['name'], 'Oak Chair')
+        self.assertTrue(CatalogChangeLog.objects.filter(kind='product', object_id=self.product.pk).exists())
+        # Already applied by the signal: polling doesn't apply it again
+        version = self.store.snapshot.version
+        self.assertEqual(self.journal.poll(), 0)
+        self.assertEqual(self.store.snapshot.version, version)
+
+    def test_edit_from_another_process(self):
+        other = CatalogJournal()
+        # queryset.update() sends no signals, like an edit made in another process
+        Product.objects.filter(pk=self.product.pk).update(name='Walnut Chair')
+        other.record('product', self.product.pk)
+
+        with mock.patch('djangoapp.services.catalog_journal.catalog_store', self.store):
+            self.assertEqual(other.poll(), 2)  # the category and the latest product entry
+            self.assertEqual(self.store.snapshot.by_id[self.product.pk]['name'], 'Walnut Chair')
+            self.assertEqual(other.poll(), 0)
+
+    def test_deactivated_product_is_removed(self):
+        Product.objects.filter(pk=self.product.pk).update(is_active=False)
+        self.journal.record('product', self.product.pk)
+        self.journal.poll()
+        self.assertNotIn(self.product.pk, self.store.snapshot.by_id)
+
+    def test_only_the_latest_entry_of_an_object_is_kept(self):
+        self.journal.record('product', self.product.pk)
+        self.journal.record('product', self.product.pk)
+        self.assertEqual(CatalogChangeLog.objects.filter(kind='product', object_id=self.product.pk).count(), 1)
+
+    def test_file_reload_keeps_database_changes(self):
+        with open(self.store.products_file, 'w') as f:
+            json.dump([{'id': 100, 'name': 'New File Sofa', 'description': '', 'price': 90, 'category_id': 1}], f)
+        self.assertTrue(self.store.reload())
+
+        snapshot = self.store.snapshot
+        self.assertEqual(snapshot.by_id[100]['name'], 'New File Sofa')
+        self.assertEqual(snapshot.by_id[self.product.pk]['name'], 'Oak Chair')
@@ -0,0 +1,109 @@
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from djangoapp.services.catalog_columns import ColumnarCatalog
+from djangoapp.services.catalog_store import CatalogStore
+from djangoapp.services.facet_index import FacetIndex
+from djangoapp.services.spelling import SpellingCorrector
+
+WORDS = ['lipstick', 'mascara', 'perfume', 'sofa', 'chair', 'velvet', 'golden', 'matte', 'ocean', 'amber']
+BRANDS = ['Chanel', 'Dior', 'Essence', 'Ikea', '']
+
+
+def make_product(rnd, product_id):
+    return {
+        'id': product_id,
+        'name': ' '.join(rnd.sample(WORDS, 2)),
+        'description': ' '.join(rnd.sample(WORDS, 3)),
+        'price': rnd.choice([5, 25, 99, 150, 1000]),
+        'rating': rnd.choice([3.5, 4.0, 4.5, 5.0]),
+        'stock_quantity': rnd.randint(0, 80),
+        'discount_percentage': rnd.choice([0, 10]),
+        'category_id': rnd.randint(1, 3),
+        'brand': rnd.choice(BRANDS),
+        'availability_status': rnd.choice(['In Stock', 'Low Stock']),
+    }
+
+
+class CatalogStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.rnd = random.Random(7)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        directory = directory.name
+        products_file = os.path.join(directory, 'products.json')
+        categories_file = os.path.join(directory, 'categories.json')
+        with open(products_file, 'w') as f:
+            json.dump([make_product(self.rnd, product_id) for product_id in range(1, 41)], f)
+        with open(categories_file, 'w') as f:
+            json.dump([{'id': i, 'name': f'Category {i}'} for i in range(1, 4)], f)
+        self.store = CatalogStore(products_file, categories_file)
+
+    def _derive(self, snapshot):
+        return (
+            snapshot.derive('columns', ColumnarCatalog),
+            snapshot.derive('facets', FacetIndex),
+            snapshot.derive('spelling', lambda s: SpellingCorrector.from_products(s.products)),
+        )
+
+    def test_upsert_and_delete(self):
+        previous = self.store.snapshot
+        updated = {**make_product(self.rnd, 5), 'name': 'Velvet Sofa Deluxe'}
+        snapshot = self.store.apply_changes(upserts=[updated, make_product(self.rnd, 100)], deleted_ids=[7, 999])
+
+        self.assertEqual(snapshot.version, previous.version + 1)
+        self.assertEqual(len(snapshot), 40)
+        self.assertEqual(snapshot.by_id[5]['name'], 'Velvet Sofa Deluxe')
+        self.assertIn(100, snapshot.by_id)
+        self.assertNotIn(7, snapshot.by_id)
+        self.assertEqual(sorted(p['id'] for p in snapshot.products), sorted(snapshot.by_id))
+        # Readers of the previous snapshot keep their view
+        self.assertIn(7, previous.by_id)
+        self.assertNotEqual(previous.by_id[5]['name'], 'Velvet Sofa Deluxe')
+
+    def test_delete_keeps_other_slots(self):
+        before = [p['id'] for p in self.store.snapshot.products]
+        after = [p['id'] for p in self.store.apply_changes(deleted_ids=[before[3]]).products]
+        # The last product fills the hole; everything else stays in place
+        self.assertEqual(after, before[:3] + [before[-1]] + before[4:-1])
+
+    def test_derived_structures_match_a_rebuild(self):
+        self._derive(self.store.snapshot)
+        next_id = 1000
+        for step in range(40):
+            ids = list(self.store.snapshot.by_id)
+            deleted = self.rnd.sample(ids, self.rnd.randint(0, 3))
+            upserts = [make_product(self.rnd, product_id)
+                       for product_id in self.rnd.sample([i for i in ids if i not in deleted], 2)]
+            upserts.append(make_product(self.rnd, next_id))
+            next_id += 1
+            categories = [{'id': 2, 'name': f'Renamed {step}'}] if step % 10 == 0 else ()
+            snapshot = self.store.apply_changes(upserts, deleted, categories)
+
+            columns, facets, spelling = (snapshot._derived[name] for name in ('columns', 'facets', 'spelling'))
+            rebuilt = ColumnarCatalog(snapshot), FacetIndex(snapshot), SpellingCorrector.from_products(snapshot.products)
+
+            for attr in ColumnarCatalog.COLUMNS:
+                np.testing.assert_array_equal(getattr(columns, attr), getattr(rebuilt[0], attr))
+            for key in columns.orders:
+                np.testing.assert_array_equal(columns.orders[key], rebuilt[0].orders[key])
+
+            filters = {'brand': ['chanel', 'dior'], 'category': ['1', '2']}
+            mask = np.ones(len(snapshot), dtype=bool)
+            self.assertEqual(facets.counts(mask, filters), rebuilt[1].counts(mask, filters))
+            np.testing.assert_array_equal(facets.mask(filters), rebuilt[1].mask(filters))
+
+            self.assertEqual(spelling.frequencies, rebuilt[2].frequencies)
+            self.assertEqual({k: sorted(v) for k, v in spelling.deletes.items()},
+                             {k: sorted(v) for k, v in rebuilt[2].deletes.items()})
+
+    def test_listeners_get_the_new_snapshot(self):
+        seen = []
+        self.store.add_listener(seen.append)
+        snapshot = self.store.apply_changes(deleted_ids=[1])
+        self.assertEqual(seen, [snapshot])
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from djangoapp.models import Cart, CartItem, Category, Product
+from djangoapp.services.ai_service import ai_service
+from djangoapp.services.llm_resilience import LLMUnavailable
+from djangoapp.services.notification_service import notification_service
+from djangoapp.services.predictive_service import predictive_service
+from djangoapp.services.smart_cart_service import smart_cart_service
+
+MESSAGES = [{'role': 'user', 'content': 'Forecast demand'}]
+
+
+def model_down():
+    return mock.patch('djangoapp.services.ai_service.llm_client.generate',
+                      side_effect=LLMUnavailable('circuit open for chat_completion'))
+
+
+class ChatCompletionTests(SimpleTestCase):
+    def test_fallback_gets_the_error(self):
+        with model_down():
+            text = ai_service.chat_completion(MESSAGES, fallback=lambda e: f"local ({type(e).__name__})")
+        self.assertEqual(text, 'local (LLMUnavailable)')
+
+    def test_raises_without_fallback(self):
+        with model_down(), self.assertRaises(LLMUnavailable):
+            ai_service.chat_completion(MESSAGES)
+
+
+class CallerFallbackTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper')
+        category = Category.objects.create(name='Furniture')
+        self.sofa = Product.objects.create(name='Velvet Sofa', description='', price=400, category=category)
+        Product.objects.create(name='Oak Table', description='', price=200, category=category)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.sofa, quantity=1)
+
+    def assertNoError(self, result):
+        self.assertEqual(result['status'], 'success')
+        self.assertNotIn('circuit open', str(result))
+
+    def test_price_analysis(self):
+        with model_down():
+            result = predictive_service.analyze_price_trends(self.sofa.pk)
+        self.assertNoError(result)
+        self.assertIn('above the category average of $300.00', result['analysis'])
+
+    def test_demand_forecast(self):
+        with model_down():
+            result = predictive_service.forecast_demand(self.sofa.pk)
+        self.assertNoError(result)
+        self.assertIn('Expected daily demand', result['ai_forecast'])
+
+    def test_cart_recovery(self):
+        with model_down():
+            result = smart_cart_service.recover_abandoned_cart(self.user.pk)
+        self.assertNoError(result)
+        self.assertIn('Velvet Sofa is still waiting in your cart', result['recovery_strategy'])
+
+    def test_cart_notification(self):
+        with model_down():
+            notifications = notification_service._check_abandoned_cart(self.user.pk)
+        self.assertIn('Velvet Sofa', notifications[0]['message'])
+
+    def test_missing_product_is_not_an_exception_string(self):
+        result = predictive_service.analyze_price_trends(999)
+        self.assertEqual(result, {'status': 'error', 'message': 'Product not found'})
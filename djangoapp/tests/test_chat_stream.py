@@ -0,0 +1,74 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from djangoapp.services.professional_ai_service import professional_ai_service
+from djangoapp.views import _sse_event
+
+PRODUCT = {
+    'id': 1, 'name': 'Velvet Sofa', 'price': 499.0, 'image_url': '', 'category_id': 3,
+    'rating': 4.5, 'brand': 'Ikea', 'availability_status': 'In Stock',
+}
+
+
+def parse_events(body):
+    """(event, data) pairs of a server-sent-events body"""
+    events = []
+    for block in body.split('\n\n'):
+        if not block:
+            continue
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+# Requests through the test client must not start the catalog file watcher
+@override_settings(CATALOG_RELOAD_INTERVAL=0)
+class ChatStreamTests(SimpleTestCase):
+    async def _stream(self, events):
+        async def astream_user_query(message, session_id, user_id=None):
+            for event in events:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+
+        with mock.patch.object(professional_ai_service, 'astream_user_query', astream_user_query):
+            response = await self.async_client.post(
+                '/api/assistant/chat/', {'message': 'a sofa', 'session_id': 's1', 'stream': True},
+                content_type='application/json'
+            )
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        return response, body
+
+    def test_event_format(self):
+        self.assertEqual(_sse_event('token', {'text': 'Hi\nthere'}),
+                         'event: token\ndata: {"text": "Hi\\nthere"}\n\n')
+
+    async def test_products_tokens_then_done(self):
+        done = {'response': 'Try the Velvet Sofa.', 'products': [PRODUCT], 'suggestions': ['More sofas'],
+                'actions': []}
+        response, body = await self._stream([
+            ('products', {'products': [PRODUCT], 'suggestions': ['More sofas'], 'actions': []}),
+            ('token', {'text': 'Try the '}),
+            ('token', {'text': 'Velvet Sofa.'}),
+            ('done', done),
+        ])
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        events = parse_events(body)
+        self.assertEqual([event for event, _ in events], ['products', 'token', 'token', 'done'])
+        self.assertEqual(events[0][1]['products'][0]['name'], 'Velvet Sofa')
+        self.assertEqual(''.join(data['text'] for event, data in events if event == 'token'),
+                         events[-1][1]['response'])
+        self.assertEqual(events[-1][1]['suggestions'], ['More sofas'])
+
+    async def test_error_ends_with_a_done_event(self):
+        response, body = await self._stream([
+            ('token', {'text': 'Partial'}),
+            RuntimeError('stream broke'),
+        ])
+        events = parse_events(body)
+        self.assertEqual([event for event, _ in events], ['token', 'done'])
+        self.assertEqual(events[-1][1]['products'], [])
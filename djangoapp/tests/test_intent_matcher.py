@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from djangoapp.services.intent_matcher import IntentMatcher, intent_matcher
+
+
+class IntentMatcherTests(SimpleTestCase):
+    def test_whole_words_and_phrases(self):
+        matches = intent_matcher.match("Hello, I'm looking for a cheap sofa")
+        self.assertEqual(matches['greeting'], ['hello'])
+        self.assertEqual(matches['product_search'], ['looking for'])
+        self.assertIn('price', matches)
+        self.assertEqual(intent_matcher.category(matches), ('furniture', 3))
+
+    def test_inflected_keywords(self):
+        self.assertIn('price', intent_matcher.match("cheapest mascara"))
+        self.assertIn('price', intent_matcher.match("something cheaper"))
+        self.assertIn('recommendation', intent_matcher.match("any recommendations?"))
+        self.assertIn('recommendation', intent_matcher.match("what is recommended"))
+        self.assertIn('product_search', intent_matcher.match("searching for a sofa"))
+        self.assertIn('comparison', intent_matcher.match("comparing these two"))
+        self.assertIn('comparison', intent_matcher.match("a quick comparison"))
+        self.assertIn('furniture', intent_matcher.match("two chairs"))
+
+    def test_no_match_inside_other_words(self):
+        self.assertNotIn('furniture', intent_matcher.match("a new tablet"))
+        self.assertNotIn('greeting', intent_matcher.match("this is his"))
+        self.assertNotIn('furniture', intent_matcher.match("chairman"))
+        self.assertEqual(intent_matcher.match("compar"), {})
+
+    def test_keyword_shared_by_intents(self):
+        matcher = IntentMatcher({'a': ['deal'], 'b': ['deal', 'sale']})
+        self.assertEqual(matcher.match("great deals on sale"), {'a': ['deal'], 'b': ['deal', 'sale']})
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from djangoapp.services.llm_client import LLMClient
+from djangoapp.services.llm_resilience import CircuitBreaker
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel; calls block until `release` is set"""
+
+    def __init__(self, text='answer', error=None):
+        self.text = text
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def _respond(self):
+        with self._lock:
+            self.calls += 1
+        if self.error:
+            raise self.error
+        return FakeResponse(self.text)
+
+    def generate_content(self, prompt, **kwargs):
+        self.release.wait(5)
+        return self._respond()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        while not self.release.is_set():
+            await asyncio.sleep(0.01)
+        return self._respond()
+
+
+def make_client(model, **options):
+    client = LLMClient(api_key='test', **options)
+    client._model = lambda name: model
+    return client
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_identical_calls_share_one_api_call(self):
+        model = FakeModel()
+        client = make_client(model)
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(client.generate, 'same prompt', 'chat_response') for _ in range(5)]
+            while client.stats.get('chat_response', {}).get('coalesced', 0) < 4:
+                time.sleep(0.01)
+            model.release.set()
+            results = [future.result(5) for future in futures]
+
+        self.assertEqual(results, ['answer'] * 5)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(client.stats['chat_response']['misses'], 1)
+
+    def test_async_waiters_share_one_api_call(self):
+        model = FakeModel()
+        client = make_client(model)
+
+        async def run():
+            tasks = [asyncio.create_task(client.agenerate('same prompt', 'chat_response')) for _ in range(4)]
+            while client.stats.get('chat_response', {}).get('coalesced', 0) < 3:
+                await asyncio.sleep(0.01)
+            model.release.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(run()), ['answer'] * 4)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(client.stats['chat_response']['coalesced'], 3)
+
+    def test_waiters_get_the_leaders_error(self):
+        model = FakeModel(error=RuntimeError('backend down'))
+        client = make_client(model)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(client.generate, 'same prompt', 'chat_response') for _ in range(3)]
+            while client.stats.get('chat_response', {}).get('coalesced', 0) < 2:
+                time.sleep(0.01)
+            model.release.set()
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(5)
+        self.assertEqual(model.calls, 1)
+
+    def test_responses_are_cached(self):
+        model = FakeModel()
+        model.release.set()
+        client = make_client(model)
+        client.generate('a prompt', 'chat_response')
+        # Whitespace differences hit the same cache entry
+        self.assertEqual(client.generate('a   prompt ', 'chat_response'), 'answer')
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(client.stats['chat_response']['memory_hits'], 1)
+
+    def test_refresh_bypasses_and_replaces_the_cached_response(self):
+        model = FakeModel(text='first')
+        model.release.set()
+        client = make_client(model)
+        client.generate('a prompt', 'product_faq')
+
+        model.text = 'second'
+        self.assertEqual(client.generate('a prompt', 'product_faq', refresh=True), 'second')
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(client.generate('a prompt', 'product_faq'), 'second')
+        self.assertEqual(model.calls, 2)
+
+
+class CancellationTests(SimpleTestCase):
+    def test_cancelled_trial_call_releases_the_breaker(self):
+        model = FakeModel()
+        client = make_client(model, breaker=CircuitBreaker(min_calls=1, open_seconds=30.0))
+        client.breaker.record(False, 0.1)
+        client.breaker._opened_at -= 30  # due for its half-open trial
+
+        async def run():
+            task = asyncio.create_task(client.agenerate('a prompt', 'chat_response'))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        # The half-open trial slot is free again for the next call
+        self.assertTrue(client.breaker.allow())
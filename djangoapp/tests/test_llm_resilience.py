@@ -0,0 +1,93 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from djangoapp.services.llm_resilience import (
+    CircuitBreaker, LLMUnavailable, call_timeout, remaining, request_deadline
+)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('djangoapp.services.llm_resilience.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, slow_seconds=2.0, open_seconds=30.0)
+
+    def _open(self):
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+
+    def test_opens_at_the_failure_rate(self):
+        self.breaker.record(True, 0.1)
+        self.breaker.record(True, 0.1)
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record(True, 5.0)  # slow calls count as failures
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats['rejected'], 1)
+
+    def test_needs_min_calls(self):
+        for _ in range(3):
+            self.breaker.record(False, 0.1)
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self._open()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_opens_again(self):
+        self._open()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_released_trial_frees_the_slot(self):
+        self._open()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_trial_is_replaced(self):
+        self._open()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
+
+
+class DeadlineTests(SimpleTestCase):
+    def test_no_deadline(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(call_timeout(10), 10)
+
+    def test_call_timeout_is_capped_by_the_deadline(self):
+        with request_deadline(3):
+            self.assertLessEqual(call_timeout(10), 3)
+            self.assertEqual(call_timeout(1), 1)
+        self.assertIsNone(remaining())
+
+    def test_nested_deadlines_keep_the_earlier_one(self):
+        with request_deadline(2):
+            with request_deadline(60):
+                self.assertLessEqual(remaining(), 2)
+
+    def test_no_call_too_close_to_the_deadline(self):
+        with request_deadline(0.2):
+            with self.assertRaises(LLMUnavailable):
+                call_timeout(10)
@@ -0,0 +1,69 @@
+from django.test import SimpleTestCase, override_settings
+
+from djangoapp.services.pagination import (
+    InvalidCursor, RankedListing, decode_cursor, encode_cursor
+)
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor('rating', 4.5, 17)
+        self.assertEqual(decode_cursor(cursor, 'rating'), (4.5, 17))
+
+    def test_cursor_of_another_listing(self):
+        cursor = encode_cursor('rating', 4.5, 17)
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(cursor, 'price')
+
+    def test_malformed_cursor(self):
+        for cursor in ('not-a-cursor', '', 'e30'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor, 'rating')
+
+
+class RankedListingTests(SimpleTestCase):
+    def setUp(self):
+        # Many ties on score, so pages have to break them by id
+        ids = [9, 3, 7, 1, 5, 2, 8, 4, 6, 10, 11]
+        scores = [1.0, 2.0, 2.0, 3.0, 2.0, 1.0, 2.0, 3.0, 1.0, 0.5, 2.0]
+        self.ids = ids
+        self.listing = RankedListing.from_scored('rating', range(len(ids)), ids, scores, facets={})
+        self.order = [1, 4, 3, 5, 7, 8, 11, 2, 6, 9, 10]
+
+    def _ids(self, page):
+        return [self.ids[position] for position, _ in page]
+
+    def test_order(self):
+        self.assertEqual(list(self.listing.ids), self.order)
+
+    def test_cursor_pages_cover_the_listing_once(self):
+        seen, cursor = [], None
+        while True:
+            after = decode_cursor(cursor, 'rating') if cursor else None
+            page, cursor = self.listing.page(3, after=after)
+            seen.extend(self._ids(page))
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.order)
+
+    def test_cursor_and_offset_pages_agree(self):
+        first, cursor = self.listing.page(4)
+        by_cursor, _ = self.listing.page(4, after=decode_cursor(cursor, 'rating'))
+        by_offset, _ = self.listing.page(4, offset=4)
+        self.assertEqual(by_cursor, by_offset)
+
+    def test_last_page_has_no_cursor(self):
+        page, cursor = self.listing.page(20)
+        self.assertEqual(len(page), len(self.order))
+        self.assertIsNone(cursor)
+
+
+# Requests through the test client must not start the catalog file watcher
+@override_settings(CATALOG_RELOAD_INTERVAL=0)
+class PageParameterTests(SimpleTestCase):
+    def test_bad_limit_and_offset_are_rejected(self):
+        for query in ('limit=ten', 'offset=1.5', 'limit=-1', 'offset=-20'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/products/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
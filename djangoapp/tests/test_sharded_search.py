@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from djangoapp.services.catalog_store import CatalogStore
+from djangoapp.services.sharded_search import ShardedSearch
+
+
+def wait_for(condition, seconds=20):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.05)
+
+
+class ShardRestartTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        products_file = os.path.join(directory.name, 'products.json')
+        categories_file = os.path.join(directory.name, 'categories.json')
+        with open(products_file, 'w') as f:
+            json.dump([{'id': i, 'name': f'velvet sofa {i}', 'description': '', 'price': 100, 'category_id': 1}
+                       for i in range(1, 9)], f)
+        with open(categories_file, 'w') as f:
+            json.dump([{'id': 1, 'name': 'Furniture'}], f)
+        self.snapshot = CatalogStore(products_file, categories_file).snapshot
+
+        self.sharded = ShardedSearch(2, timeout=10)
+        self.addCleanup(self.sharded.close)
+        self.sharded.load(self.snapshot)
+
+    def test_dead_shard_is_restarted_off_the_query_path(self):
+        self.assertEqual(len(self.sharded.search('sofa')), 8)
+
+        process, _ = self.sharded._workers[1]
+        process.terminate()
+        process.join()
+
+        # Served in-process (None) without waiting for the restart
+        started = time.monotonic()
+        self.assertIsNone(self.sharded.search('sofa'))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.sharded.stats['shards_down'], 1)
+
+        wait_for(lambda: self.sharded.get_stats()['alive'] == 2)
+        self.assertEqual(len(self.sharded.search('sofa')), 8)
+        self.assertEqual(self.sharded.stats['restarts'], 1)
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+from djangoapp.services.spelling import SpellingCorrector, edit_distance
+
+
+class SpellingCorrectorTests(SimpleTestCase):
+    def setUp(self):
+        self.corrector = SpellingCorrector({
+            'lipstick': 5, 'mascara': 3, 'perfume': 4, 'perfect': 1, 'velvet': 2, 'waterproof': 2, 'sofa': 1,
+        })
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('mascara', 'mascarra', 2), 1)
+        self.assertEqual(edit_distance('sofa', 'sfoa', 2), 1)  # transposition
+        self.assertGreater(edit_distance('lipstick', 'perfume', 2), 2)
+
+    def test_corrects_typos(self):
+        self.assertEqual(self.corrector.correct('lipstik'), 'lipstick')
+        self.assertEqual(self.corrector.correct('mascarra'), 'mascara')
+        self.assertEqual(self.corrector.correct('velvte'), 'velvet')
+
+    def test_prefers_the_more_common_word(self):
+        # One edit from both 'perfume' and 'perfect'
+        self.assertEqual(self.corrector.correct('perfue'), 'perfume')
+
+    def test_long_word_beyond_the_delete_prefix(self):
+        self.assertEqual(self.corrector.correct('watreprouf'), 'waterproof')
+
+    def test_known_short_and_hopeless_tokens(self):
+        self.assertIsNone(self.corrector.correct('mascara'))
+        self.assertIsNone(self.corrector.correct('sfo'))
+        self.assertIsNone(self.corrector.correct('zzzzzzz'))
+
+    def test_correct_query(self):
+        self.assertEqual(self.corrector.correct_query('red lipstik and mascarra'), 'red lipstick and mascara')
+        self.assertIsNone(self.corrector.correct_query('red lipstick'))
@@ -21,6 +21,7 @@ urlpatterns = [
     path('products/<int:product_id>', views.get_product_detail, name='get_product_detail_no_slash'),
     path('categories/', views.get_categories, name='get_categories'),
     path('categories', views.get_categories, name='get_categories_no_slash'),
+    path('metrics/search/', views.search_metrics, name='search_metrics'),
     
     # Cart endpoints
     path('cart/', views.get_cart, name='get_cart'),
@@ -83,5 +84,6 @@ urlpatterns = [
     path('ai/marketing/', ai_endpoints.generate_marketing_content, name='ai_marketing'),
     path('ai/sentiment/', ai_endpoints.analyze_product_sentiment, name='ai_sentiment'),
     path('ai/description/', ai_endpoints.generate_product_description, name='ai_description'),
+    path('ai/faq/', ai_endpoints.generate_product_faq, name='ai_faq'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
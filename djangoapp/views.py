@@ -1,4 +1,4 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate, logout
 from django.views.decorators.csrf import csrf_exempt
@@ -7,6 +7,7 @@ from django.shortcuts import get_object_or_404
 from django.db import models
 import json
 import logging
+from datetime import datetime
 from decimal import Decimal
 
 from .models import Category, Product, Cart, CartItem, Order, OrderItem, UserProfile, UserBehavior, ConversationHistory
@@ -19,9 +20,16 @@ from .services.notification_service import notification_service
 from .services.personalization_service import personalization_service
 from .services.smart_cart_service import smart_cart_service
 from .services.gemini_service import gemini_service
+from .services.typeahead_service import typeahead_service
+from .services.query_analytics import query_analytics
+from .services.llm_client import llm_client
+from .services.sync_pool import run_sync
 
 logger = logging.getLogger(__name__)
 
+# Largest page of products one request can ask for
+MAX_PRODUCTS_PER_PAGE = 100
+
 
 @csrf_exempt
 def registration(request):
@@ -83,12 +91,18 @@ def logout_request(request):
 def get_products(request):
     """Get products using intelligent product service"""
     from .services.product_intelligence_service import product_intelligence_service
+    from .services.pagination import InvalidCursor
+    from .services.product_fragments import render_object
     
-    category = request.GET.get('category')
     search = request.GET.get('search')
-    brand = request.GET.get('brand')
-    limit = int(request.GET.get('limit', 20))
-    offset = int(request.GET.get('offset', 0))
+    cursor = request.GET.get('cursor')
+    try:
+        limit = min(int(request.GET.get('limit', 20)), MAX_PRODUCTS_PER_PAGE)
+        offset = int(request.GET.get('offset', 0))
+    except ValueError:
+        return JsonResponse({"error": "limit and offset must be integers"}, status=400)
+    if limit < 0 or offset < 0:
+        return JsonResponse({"error": "limit and offset must not be negative"}, status=400)
     
     try:
         # Get user preferences if authenticated
@@ -112,58 +126,48 @@ def get_products(request):
                     }
                 }
         
-        # Use intelligent product service
-        if search:
-            products = product_intelligence_service.intelligent_search(
-                query=search,
-                limit=limit + offset,
-                user_preferences=user_preferences
-            )
-        elif category:
-            products = product_intelligence_service.get_products_by_category(
-                category_id=int(category),
-                limit=limit + offset
-            )
-        else:
-            products = product_intelligence_service.get_trending_products(limit + offset)
-        
-        # Apply offset
-        products = products[offset:offset + limit]
+        # Facet filters accept comma-separated values, e.g. ?brand=chanel,dior
+        filters = {
+            name: [value for value in request.GET.get(name, '').split(',') if value]
+            for name in ('category', 'brand', 'availability', 'price_tier')
+        }
         
-        # Transform for frontend compatibility
-        products_data = []
-        category_names = {1: 'Beauty', 2: 'Fragrances', 3: 'Furniture'}
+        # Use intelligent product service
+        listing = product_intelligence_service.list_products(
+            query=search,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            user_preferences=user_preferences,
+            cursor=cursor,
+            encoded=True
+        )
+        products = listing['products']
         
-        for product in products:
-            category_name = category_names.get(product.get('category_id'), 'General')
-            
-            products_data.append({
-                'id': product['id'],
-                'title': product['name'],
-                'name': product['name'],
-                'description': product['description'],
-                'price': product['price'],
-                'discountPercentage': product.get('discount_percentage', 0),
-                'rating': product.get('rating', 0),
-                'stock': product.get('stock_quantity', 0),
-                'brand': product.get('brand', ''),
-                'category': category_name,
-                'thumbnail': product.get('image_url', ''),
-                'images': product.get('images', []),
-                'availabilityStatus': product.get('availability_status', 'In Stock'),
-                'sku': product.get('sku', f'SKU-{product["id"]}'),
-                'popularityScore': product.get('popularity_score', 0),
-                'valueScore': product.get('value_score', 0)
-            })
+        # Popular / zero-result query analytics and the user's search history;
+        # later pages of a search are not counted again
+        if search and not cursor and not offset:
+            query_analytics.record(search, listing['total'])
+            if products and request.user.is_authenticated:
+                UserBehavior.objects.create(
+                    user=request.user,
+                    action='SEARCH',
+                    metadata={'query': search[:100], 'results': listing['total']}
+                )
         
-        return JsonResponse({
-            "products": products_data,
-            "total": len(products_data),
+        # Products arrive as pre-encoded JSON fragments of the frontend listing shape
+        return HttpResponse(render_object({"products": products}, {
+            "total": listing['total'],
             "skip": offset,
             "limit": limit,
+            "next_cursor": listing['next_cursor'],
+            "did_you_mean": listing['did_you_mean'],
+            "facets": listing['facets'],
             "intelligent": True
-        })
+        }), content_type='application/json')
         
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Exception as e:
         logger.error(f"Intelligent products service error: {e}")
         return JsonResponse({
@@ -175,6 +179,28 @@ def get_products(request):
         })
 
 
+def search_metrics(request):
+    """Search cache and catalog counters (staff only)"""
+    from .services.product_intelligence_service import product_intelligence_service
+    
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+    
+    snapshot = product_intelligence_service.snapshot
+    sharded_search = product_intelligence_service.sharded_search
+    return JsonResponse({
+        "catalog": {
+            "version": snapshot.version,
+            "products": len(snapshot),
+            "loaded_at": snapshot.loaded_at.isoformat()
+        },
+        "result_cache": product_intelligence_service.result_cache.get_stats(),
+        "queries": query_analytics.get_stats(int(request.GET.get('limit', 20))),
+        "sharded_search": sharded_search.get_stats() if sharded_search else None,
+        "llm_cache": llm_client.get_stats()
+    })
+
+
 def get_product_detail(request, product_id):
     """Get detailed information about a specific product with fallback to local DB"""
     # Try external database service first
@@ -514,9 +540,113 @@ def update_profile(request):
         return JsonResponse({"error": "Error updating profile"}, status=500)
 
 
+def _chat_products(products):
+    """Assistant product cards in the shape the frontend expects"""
+    return [{
+        'id': product['id'],
+        'name': product['name'],
+        'price': product['price'],
+        'image': product.get('image_url', ''),
+        'category': product.get('category_id'),
+        'rating': product.get('rating', 0),
+        'brand': product.get('brand', ''),
+        'availability': product.get('availability_status', 'In Stock')
+    } for product in products]
+
+
+def _chat_payload(response):
+    return {
+        "response": response['response'],
+        "products": _chat_products(response.get('products', [])),
+        "suggestions": response.get('suggestions', []),
+        "actions": response.get('actions', [])
+    }
+
+
+def _chat_error_payload():
+    return {
+        "response": "I'm experiencing technical difficulties. Please try again.",
+        "products": [],
+        "suggestions": ["Browse Products", "View Categories", "Contact Support"],
+        "actions": []
+    }
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _track_chat(user, message, session_id):
+    """Track user behavior"""
+    if not user.is_authenticated:
+        return
+    try:
+        await run_sync(
+            UserBehavior.objects.create,
+            user=user,
+            action='AI_CHAT',
+            metadata={
+                'message': message[:100],  # Truncate for privacy
+                'session_id': session_id,
+                'timestamp': datetime.now().isoformat()
+            },
+            session_id=session_id
+        )
+    except Exception as e:
+        logger.warning(f"Behavior tracking failed: {e}")
+
+
+async def _save_conversation(user, session_id, message, response):
+    """Save conversation history"""
+    if not user.is_authenticated:
+        return
+    try:
+        await run_sync(
+            ConversationHistory.objects.create,
+            user=user,
+            session_id=session_id,
+            message=message,
+            response=response['response'],
+            context={
+                'products_count': len(response.get('products', [])),
+                'suggestions_count': len(response.get('suggestions', [])),
+                'actions_count': len(response.get('actions', []))
+            }
+        )
+    except Exception as e:
+        logger.warning(f"Conversation history save failed: {e}")
+
+
+async def _chat_events(user, message, session_id):
+    """Server-sent events of one assistant turn: products, model text tokens, done"""
+    from .services.professional_ai_service import professional_ai_service
+    
+    try:
+        async for event, data in professional_ai_service.astream_user_query(
+            message=message,
+            session_id=session_id,
+            user_id=user.id if user.is_authenticated else None
+        ):
+            if event == 'products':
+                data = {**data, "products": _chat_products(data['products'])}
+            elif event == 'done':
+                await _save_conversation(user, session_id, message, data)
+                professional_ai_service.cleanup_expired_sessions()
+                data = _chat_payload(data)
+            yield _sse_event(event, data)
+    except Exception as e:
+        logger.error(f"AI chat stream error: {str(e)}")
+        yield _sse_event('done', _chat_error_payload())
+
+
 @csrf_exempt
-def ai_chat(request):
-    """Professional AI Assistant chat endpoint"""
+async def ai_chat(request):
+    """Professional AI Assistant chat endpoint (async: a Gemini round trip holds no worker thread)
+    
+    With "stream": true in the body (or Accept: text/event-stream) the reply is
+    sent as server-sent events: 'products' right away, 'token' events as the
+    model writes, and 'done' with the complete response.
+    """
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
     
@@ -528,80 +658,36 @@ def ai_chat(request):
         session_id = data.get('session_id', '')
         
         # Get user ID if authenticated
-        user_id = request.user.id if request.user.is_authenticated else None
+        user = await request.auser()
+        user_id = user.id if user.is_authenticated else None
         
-        # Track user behavior
-        if request.user.is_authenticated:
-            try:
-                UserBehavior.objects.create(
-                    user=request.user,
-                    action='AI_CHAT',
-                    metadata={
-                        'message': message[:100],  # Truncate for privacy
-                        'session_id': session_id,
-                        'timestamp': datetime.now().isoformat()
-                    },
-                    session_id=session_id
-                )
-            except Exception as e:
-                logger.warning(f"Behavior tracking failed: {e}")
+        await _track_chat(user, message, session_id)
+        
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            response = StreamingHttpResponse(
+                _chat_events(user, message, session_id), content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # don't let a proxy hold the events back
+            return response
         
         # Process query with professional AI service
-        response = professional_ai_service.process_user_query(
+        response = await professional_ai_service.aprocess_user_query(
             message=message,
             session_id=session_id,
             user_id=user_id
         )
         
-        # Save conversation history
-        if request.user.is_authenticated:
-            try:
-                ConversationHistory.objects.create(
-                    user=request.user,
-                    session_id=session_id,
-                    message=message,
-                    response=response['response'],
-                    context={
-                        'products_count': len(response.get('products', [])),
-                        'suggestions_count': len(response.get('suggestions', [])),
-                        'actions_count': len(response.get('actions', []))
-                    }
-                )
-            except Exception as e:
-                logger.warning(f"Conversation history save failed: {e}")
+        await _save_conversation(user, session_id, message, response)
         
         # Periodic cleanup
         professional_ai_service.cleanup_expired_sessions()
         
-        # Transform products for frontend
-        products = []
-        for product in response.get('products', []):
-            products.append({
-                'id': product['id'],
-                'name': product['name'],
-                'price': product['price'],
-                'image': product.get('image_url', ''),
-                'category': product.get('category_id'),
-                'rating': product.get('rating', 0),
-                'brand': product.get('brand', ''),
-                'availability': product.get('availability_status', 'In Stock')
-            })
-        
-        return JsonResponse({
-            "response": response['response'],
-            "products": products,
-            "suggestions": response.get('suggestions', []),
-            "actions": response.get('actions', [])
-        })
+        return JsonResponse(_chat_payload(response))
         
     except Exception as e:
         logger.error(f"AI chat error: {str(e)}")
-        return JsonResponse({
-            "response": "I'm experiencing technical difficulties. Please try again.",
-            "products": [],
-            "suggestions": ["Browse Products", "View Categories", "Contact Support"],
-            "actions": []
-        })
+        return JsonResponse(_chat_error_payload())
 
 
 @csrf_exempt
@@ -628,6 +714,7 @@ def semantic_search(request):
     } for p in products]
     
     results = search_service.semantic_search(query, products_data)
+    query_analytics.record(query, len(results))
     return JsonResponse({"products": results})
 
 
@@ -660,28 +747,30 @@ def get_recommendations(request):
 
 
 def search_suggestions(request):
-    """Get intelligent search suggestions"""
+    """Get typeahead search suggestions"""
     query = request.GET.get('q', '')
+    limit = min(int(request.GET.get('limit', 5)), 20)
     if query:
-        suggestions = search_service.generate_search_suggestions(query)
+        suggestions = typeahead_service.suggest(query, limit)
         return JsonResponse({'suggestions': suggestions})
     return JsonResponse({'suggestions': []})
 
 
 @csrf_exempt
-def create_shopping_list(request):
+async def create_shopping_list(request):
     """Create AI-powered shopping list"""
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
     
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     try:
         data = json.loads(request.body)
         items = data.get('items', [])
         
-        result = conversational_service.create_shopping_list(request.user.id, items)
+        result = await conversational_service.acreate_shopping_list(user.id, items)
         return JsonResponse(result)
         
     except Exception as e:
@@ -689,30 +778,32 @@ def create_shopping_list(request):
         return JsonResponse({"error": "Failed to create shopping list"}, status=500)
 
 
-def get_shopping_guidance(request):
+async def get_shopping_guidance(request):
     """Get personalized shopping journey guidance"""
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     intent = request.GET.get('intent', 'general_shopping')
-    result = conversational_service.get_shopping_journey_guidance(request.user.id, intent)
+    result = await conversational_service.aget_shopping_journey_guidance(user.id, intent)
     return JsonResponse(result)
 
 
 @csrf_exempt
-def voice_query(request):
+async def voice_query(request):
     """Process voice-to-text shopping queries"""
     if request.method != 'POST':
         return JsonResponse({"error": "POST method required"}, status=405)
     
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     try:
         data = json.loads(request.body)
         voice_text = data.get('voice_text', '')
         
-        result = conversational_service.handle_voice_query(request.user.id, voice_text)
+        result = await conversational_service.ahandle_voice_query(user.id, voice_text)
         return JsonResponse(result)
         
     except Exception as e:
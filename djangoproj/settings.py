@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'djangoapp.middleware.RequestDeadlineMiddleware',
 ]
 
 ROOT_URLCONF = 'djangoproj.urls'
@@ -96,6 +98,67 @@ DATABASES = {
 # MongoDB Database API Configuration
 DATABASE_API_URL = os.environ.get('DATABASE_API_URL', 'http://localhost:3031/api')
 
+# Semantic search vector index, built offline with `manage.py build_vector_index`
+SEMANTIC_INDEX_PATH = os.environ.get(
+    'SEMANTIC_INDEX_PATH', os.path.join(BASE_DIR, 'database', 'data', 'product_vectors.npz')
+)
+# Inverted lists probed per query when the index was built with --backend ivf
+# (higher = better recall, slower queries)
+SEMANTIC_INDEX_NPROBE = int(os.environ.get('SEMANTIC_INDEX_NPROBE', 8))
+
+# Seconds between checks of the catalog JSON files for changes (0 disables hot reload)
+CATALOG_RELOAD_INTERVAL = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 5))
+
+# Product listing result cache (entries are also dropped whenever the catalog changes)
+SEARCH_RESULT_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+SEARCH_RESULT_CACHE_TTL = int(os.environ.get('SEARCH_RESULT_CACHE_TTL', 300))
+
+# Sharded search for very large catalogs: number of shard worker processes
+# (0 or 1 searches in-process) and how long a query waits for the shards
+SEARCH_SHARDS = int(os.environ.get('SEARCH_SHARDS', 0))
+SEARCH_SHARD_TIMEOUT = float(os.environ.get('SEARCH_SHARD_TIMEOUT', 0.5))
+
+# Popular / zero-result query analytics: counters kept per window, window length
+# in seconds and number of windows kept, and how many popular queries are
+# pre-ranked into the result cache after every catalog change
+QUERY_ANALYTICS_CAPACITY = int(os.environ.get('QUERY_ANALYTICS_CAPACITY', 1000))
+QUERY_ANALYTICS_WINDOW = int(os.environ.get('QUERY_ANALYTICS_WINDOW', 300))
+QUERY_ANALYTICS_WINDOWS = int(os.environ.get('QUERY_ANALYTICS_WINDOWS', 12))
+SEARCH_CACHE_WARM_QUERIES = int(os.environ.get('SEARCH_CACHE_WARM_QUERIES', 50))
+
+# Gemini response cache: in-memory size, optional SQLite file shared by the
+# workers ('' keeps the cache in memory only) and per call site TTL overrides
+# in seconds as JSON, e.g. {"chat_response": 0} (see llm_client.CALL_SITE_TTLS)
+LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', '')
+LLM_CACHE_TTLS = json.loads(os.environ.get('LLM_CACHE_TTLS', '{}'))
+
+# Threads (and database connections) async views use for blocking ORM work
+ASYNC_SYNC_THREADS = int(os.environ.get('ASYNC_SYNC_THREADS', 16))
+
+# Gemini resilience: end-to-end budget of a request for its model calls, timeout
+# of a single call, and the circuit breaker (opens for LLM_BREAKER_OPEN_SECONDS
+# once LLM_BREAKER_FAILURE_RATE of the last LLM_BREAKER_WINDOW calls, at least
+# LLM_BREAKER_MIN_CALLS, failed or took over LLM_BREAKER_SLOW_SECONDS)
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', 20))
+LLM_CALL_TIMEOUT = float(os.environ.get('LLM_CALL_TIMEOUT', 10))
+LLM_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW', 20))
+LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', 5))
+LLM_BREAKER_FAILURE_RATE = float(os.environ.get('LLM_BREAKER_FAILURE_RATE', 0.5))
+LLM_BREAKER_SLOW_SECONDS = float(os.environ.get('LLM_BREAKER_SLOW_SECONDS', 8))
+LLM_BREAKER_OPEN_SECONDS = float(os.environ.get('LLM_BREAKER_OPEN_SECONDS', 30))
+
+# Stored AI product content (generate_ai_content command): target audiences
+# whose marketing content is stored (comma separated; others are generated
+# live), batch worker threads, model requests per second, and the checkpoint
+# file an interrupted run resumes from
+AI_CONTENT_AUDIENCES = os.environ.get('AI_CONTENT_AUDIENCES', 'general').split(',')
+AI_CONTENT_WORKERS = int(os.environ.get('AI_CONTENT_WORKERS', 4))
+AI_CONTENT_RATE = float(os.environ.get('AI_CONTENT_RATE', 2))
+AI_CONTENT_CHECKPOINT = os.environ.get(
+    'AI_CONTENT_CHECKPOINT', os.path.join(BASE_DIR, 'database', 'data', 'ai_content_checkpoint.json')
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -29,6 +29,6 @@ except Exception as e:
     print(f'Data already exists or error: {e}')
 EOF
 
-# Start the server
+# Start the server (ASGI, so assistant chat can stream server-sent events)
 echo "Starting server..."
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+exec uvicorn djangoproj.asgi:application --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-2}"
\ No newline at end of file